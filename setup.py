@@ -46,8 +46,14 @@ setup(
         # Imported by http submodule. Required for metrics demo.
         'aiohttp',
         # Required for metrics demo.
-        'prometheus_client'
+        'prometheus_client',
+        # Used to precompile message templates to JSON.
+        'PyYAML'
     ],
+    extras_require={
+        # Required for the pktring service.
+        'pktring': ['numpy']
+    },
 
     # See https://pypi.python.org/pypi?%3Aaction=list_classifiers
     classifiers=[
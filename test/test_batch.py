@@ -0,0 +1,68 @@
+import asyncio
+from zof.batch import Batch
+from zof.controller import Controller
+from zof.exception import BatchException, ErrorException
+from .asynctestcase import AsyncTestCase
+
+
+class _MockConnection:
+    def __init__(self):
+        self.output = []
+
+    def write(self, data):
+        self.output.append(data)
+
+    def is_closed(self):  # pylint: disable=no-self-use
+        return False
+
+
+class BatchTestCase(AsyncTestCase):
+    def setUp(self):
+        self.controller = Controller()
+        self.controller.conn = _MockConnection()
+
+    def _error(self, xid):
+        return {'type': 'ERROR', 'xid': xid, 'datapath_id': '1', 'msg': {}}
+
+    async def test_errors(self):
+        batch = Batch(datapath_id='1', controller=self.controller)
+        for _ in range(3):
+            batch._track(self.controller.next_xid())
+        self.assertEqual(len(batch), 3)
+
+        event = self._error(batch.xids[1])
+        known = self.controller._handle_xid(event, event['xid'],
+                                            ErrorException)
+        self.assertTrue(known)
+        self.assertEqual(len(batch.errors), 1)
+        index, exc = batch.errors[0]
+        self.assertEqual(index, 1)
+        self.assertEqual(exc.xid, batch.xids[1])
+
+        # Resolve the barrier.
+        reply = asyncio.Future()
+        reply.set_result({'type': 'BARRIER_REPLY', 'xid': 99})
+        with self.assertRaises(BatchException) as ctxt:
+            await batch._wait(reply)
+        self.assertEqual(ctxt.exception.xid, 99)
+        self.assertEqual(ctxt.exception.errors, batch.errors)
+
+        # Messages are no longer tracked after the barrier.
+        for xid in batch.xids:
+            self.assertFalse(
+                self.controller._handle_xid(
+                    self._error(xid), xid, ErrorException))
+
+    async def test_no_errors(self):
+        batch = Batch(datapath_id='1', controller=self.controller)
+        batch._track(self.controller.next_xid())
+
+        # A reply for a message in the batch is ignored.
+        event = {'type': 'BARRIER_REPLY', 'xid': batch.xids[0]}
+        self.controller._handle_xid(event, batch.xids[0])
+
+        reply = asyncio.Future()
+        reply.set_result({'type': 'BARRIER_REPLY', 'xid': 99})
+        result = await batch._wait(reply)
+        self.assertEqual(result['xid'], 99)
+        self.assertEqual(batch.errors, [])
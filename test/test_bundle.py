@@ -0,0 +1,258 @@
+import asyncio
+import json
+import unittest
+from zof.api_compile import CompiledString, CompiledObject
+from zof.bundle import Bundle, _bundle_message
+from zof.controller import Controller
+from zof.exception import BatchException, ErrorException, RPCException
+from .asynctestcase import AsyncTestCase
+
+
+class _MockConnection:
+    def __init__(self):
+        self.output = []
+
+    def write(self, data):
+        self.output.append(data)
+
+    def is_closed(self):  # pylint: disable=no-self-use
+        return False
+
+
+class BundleTestCase(unittest.TestCase):
+    def test_bundle_string(self):
+        ofmsg = CompiledString(None, '''
+            type: FLOW_MOD
+            msg:
+              command: ADD
+              match:
+                - field: ETH_DST
+                  value: $eth_dst
+            ''')
+        bundle_msg = _bundle_message(ofmsg, 12, ['ATOMIC'], 1000)
+        self.assertIs(_bundle_message(ofmsg, 13, [], 1001), bundle_msg)
+        self.assertEqual(bundle_msg.msg_type, 'BUNDLE_ADD_MESSAGE')
+
+        task_locals = dict(datapath_id=None, conn_id=7)
+        actual = bundle_msg._complete(
+            dict(
+                xid=1000,
+                bundle_id=12,
+                bundle_flags=['ATOMIC'],
+                eth_dst='00:00:00:00:00:01'), task_locals)
+        expected = (
+            '{"method":"OFP.SEND","params":{"xid":1000,"datapath_id":null,'
+            '"conn_id":7,"type":"BUNDLE_ADD_MESSAGE","msg":{"bundle_id":12,'
+            '"flags":["ATOMIC"],"message":{"xid":1000,"type":"FLOW_MOD",'
+            '"msg":{"command":"ADD","match":[{"field":"ETH_DST",'
+            '"value":"00:00:00:00:00:01"}]}}}}}')
+        self.assertEqual(expected, actual)
+
+    def test_bundle_object(self):
+        ofmsg = CompiledObject(None, {'type': 'FLOW_MOD', 'msg': {}})
+        bundle_msg = _bundle_message(ofmsg, 12, ['ATOMIC'], 1000)
+        self.assertEqual(bundle_msg._obj, {
+            'type': 'BUNDLE_ADD_MESSAGE',
+            'msg': {
+                'bundle_id': 12,
+                'flags': ['ATOMIC'],
+                'message': {
+                    'type': 'FLOW_MOD',
+                    'msg': {},
+                    'xid': 1000
+                }
+            }
+        })
+
+    def test_bundle_invalid(self):
+        with self.assertRaises(ValueError):
+            _bundle_message(object(), 12, [], 1000)
+
+
+class BundleRequestTestCase(AsyncTestCase):
+    def setUp(self):
+        self.controller = Controller()
+        self.controller.conn = _MockConnection()
+        self.flow_mod = CompiledObject(self.controller, {
+            'type': 'FLOW_MOD',
+            'msg': {
+                'command': 'DELETE'
+            }
+        })
+
+    def _start(self, coro):
+        """Run coroutine in a task that is cleaned up after the test."""
+        task = asyncio.ensure_future(coro)
+        self.addCleanup(_finish, task)
+        return task
+
+    async def _sent(self):
+        """Return the next message sent to the mock connection."""
+        for _ in range(10):
+            if self.controller.conn.output:
+                break
+            await asyncio.sleep(0)
+        else:
+            self.fail('No message sent')
+        data = self.controller.conn.output.pop(0)
+        return json.loads(data.decode('utf-8'))['params']
+
+    async def _reply(self, ctrl_type=None):
+        """Reply to the next message sent, checking its control type."""
+        params = await self._sent()
+        if ctrl_type is not None:
+            self.assertEqual(params['msg']['type'], ctrl_type)
+        self.controller._handle_xid({'xid': params['xid']}, params['xid'])
+
+    async def _error(self, ctrl_type):
+        params = await self._sent()
+        self.assertEqual(params['msg']['type'], ctrl_type)
+        event = {'type': 'ERROR', 'xid': params['xid'], 'msg': {}}
+        self.controller._handle_xid(event, params['xid'], ErrorException)
+
+    async def test_commit(self):
+        bundle = Bundle(datapath_id='1', controller=self.controller)
+        opened = self._start(bundle.open())
+        await self._reply('OPEN_REQUEST')
+        await opened
+
+        xids = [bundle.add(self.flow_mod), bundle.add(self.flow_mod)]
+        self.assertEqual(bundle.xids, xids)
+        self.assertEqual(len(bundle), 2)
+        for xid in xids:
+            params = await self._sent()
+            self.assertEqual(params['xid'], xid)
+            self.assertEqual(params['type'], 'BUNDLE_ADD_MESSAGE')
+            self.assertEqual(params['msg']['bundle_id'], bundle.bundle_id)
+            self.assertEqual(params['msg']['message']['xid'], xid)
+
+        committed = self._start(bundle.commit())
+        params = await self._sent()
+        self.assertEqual(params['type'], 'BARRIER_REQUEST')
+        self.controller._handle_xid({'xid': params['xid']}, params['xid'])
+        await self._reply('COMMIT_REQUEST')
+        await committed
+        self.assertEqual(bundle.errors, [])
+
+        # Inner messages are no longer tracked.
+        for xid in xids:
+            self.assertFalse(self.controller._handle_xid({}, xid))
+
+    async def test_inner_error(self):
+        bundle = Bundle(datapath_id='1', controller=self.controller)
+        opened = self._start(bundle.open())
+        await self._reply('OPEN_REQUEST')
+        await opened
+
+        xids = [bundle.add(self.flow_mod) for _ in range(3)]
+        for _ in xids:
+            await self._sent()
+        event = {'type': 'ERROR', 'xid': xids[1], 'msg': {}}
+        self.controller._handle_xid(event, xids[1], ErrorException)
+
+        # The bundle is discarded and the error is attributed to the second
+        # inner message.
+        committed = self._start(bundle.commit())
+        await self._reply()
+        await self._reply('DISCARD_REQUEST')
+        with self.assertRaises(BatchException) as ctxt:
+            await committed
+        self.assertEqual(ctxt.exception.xid, bundle.bundle_id)
+        self.assertEqual(len(ctxt.exception.errors), 1)
+        index, exc = ctxt.exception.errors[0]
+        self.assertEqual(index, 1)
+        self.assertEqual(exc.xid, xids[1])
+
+    async def test_commit_error(self):
+        bundle = Bundle(datapath_id='1', controller=self.controller)
+        opened = self._start(bundle.open())
+        await self._reply('OPEN_REQUEST')
+        await opened
+        bundle.add(self.flow_mod)
+        await self._sent()
+
+        committed = self._start(bundle.commit())
+        await self._reply()
+        await self._error('COMMIT_REQUEST')
+        with self.assertRaises(BatchException) as ctxt:
+            await committed
+        # With no inner errors, the commit error itself is reported.
+        index, exc = ctxt.exception.errors[0]
+        self.assertIsNone(index)
+        self.assertIsInstance(exc, ErrorException)
+        self.assertEqual(exc.xid, ctxt.exception.xid)
+
+    async def test_discard(self):
+        bundle = Bundle(datapath_id='1', controller=self.controller)
+
+        async def _run():
+            async with bundle:
+                bundle.add(self.flow_mod)
+                raise ValueError('abort')
+
+        task = self._start(_run())
+        await self._reply('OPEN_REQUEST')
+        await self._sent()
+        await self._reply('DISCARD_REQUEST')
+        with self.assertRaisesRegex(ValueError, 'abort'):
+            await task
+        self.assertFalse(self.controller._handle_xid({}, bundle.xids[0]))
+
+    async def test_fallback(self):
+        # An OpenFlow 1.3 switch: oftr can't encode the BUNDLE_CONTROL.
+        bundle = Bundle(
+            datapath_id='1', fallback=True, controller=self.controller)
+        opened = self._start(bundle.open())
+        params = await self._sent()
+        self.controller._handle_rpc_reply({
+            'id': params['xid'],
+            'error': {
+                'message': 'unsupported',
+                'code': 1
+            }
+        })
+        await opened
+        self.assertIsNotNone(bundle.batch)
+
+        # Messages are sent as they are, followed by a barrier.
+        xid = bundle.add(self.flow_mod)
+        params = await self._sent()
+        self.assertEqual(params['type'], 'FLOW_MOD')
+        self.assertEqual(params['xid'], xid)
+        committed = self._start(bundle.commit())
+        params = await self._sent()
+        self.assertEqual(params['type'], 'BARRIER_REQUEST')
+        self.controller._handle_xid({'xid': params['xid']}, params['xid'])
+        await committed
+
+        # A switch that rejects the bundle is also handled.
+        bundle = Bundle(
+            datapath_id='1', fallback=True, controller=self.controller)
+        opened = self._start(bundle.open())
+        await self._error('OPEN_REQUEST')
+        await opened
+        self.assertIsNotNone(bundle.batch)
+
+    async def test_no_fallback(self):
+        bundle = Bundle(datapath_id='1', controller=self.controller)
+        opened = self._start(bundle.open())
+        params = await self._sent()
+        self.controller._handle_rpc_reply({
+            'id': params['xid'],
+            'error': {
+                'message': 'unsupported',
+                'code': 1
+            }
+        })
+        with self.assertRaises(RPCException):
+            await opened
+        self.assertIsNone(bundle.batch)
+
+
+def _finish(task):
+    if task.done():
+        # Retrieve the exception, so a failed test doesn't log it later.
+        if not task.cancelled():
+            task.exception()
+    else:
+        task.cancel()
@@ -0,0 +1,176 @@
+import io
+import json
+import struct
+import tempfile
+import unittest
+from unittest import mock
+from zof.capture import Framer, main, read_events, read_messages, _load_msg
+from zof.jsontemplate import yaml_loader
+
+HELLO = bytes.fromhex('0400000800000001')
+ECHO = bytes.fromhex('0402000c00000002') + b'abcd'
+
+
+def _tcp_frame(seq, payload, *, sport=40000, dport=6653, flags=0x18):
+    tcp = struct.pack('!HHLLBBHHH', sport, dport, seq, 0, 5 << 4, flags,
+                      65535, 0, 0)
+    ip_len = 20 + len(tcp) + len(payload)
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, ip_len, 0, 0, 64, 6, 0,
+                     bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2]))
+    eth = b'\x00' * 12 + b'\x08\x00'
+    return eth + ip + tcp + payload
+
+
+def _pcap(frames):
+    data = struct.pack('<IHHiIII', 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)
+    for i, frame in enumerate(frames):
+        data += struct.pack('<IIII', 100 + i, 5, len(frame), len(frame))
+        data += frame
+    return io.BytesIO(data)
+
+
+class FramerTestCase(unittest.TestCase):
+    def test_feed(self):
+        framer = Framer()
+        stream = HELLO + ECHO
+        self.assertEqual(framer.feed(stream[:5]), [])
+        self.assertEqual(framer.feed(stream[5:14]), [HELLO])
+        self.assertEqual(framer.feed(stream[14:]), [ECHO])
+        self.assertEqual(framer.errors, 0)
+
+    def test_bad_header(self):
+        framer = Framer()
+        self.assertEqual(framer.feed(b'\x00' * 16), [])
+        self.assertEqual(framer.errors, 1)
+        self.assertEqual(framer.feed(HELLO), [HELLO])
+
+
+class ReadMessagesTestCase(unittest.TestCase):
+    def test_raw_stream(self):
+        stream = io.BytesIO(HELLO + ECHO + HELLO)
+        result = list(read_messages(stream, chunk_size=3))
+        self.assertEqual([msg.data for msg in result], [HELLO, ECHO, HELLO])
+        self.assertIsNone(result[0].time)
+
+    def test_pcap(self):
+        data = HELLO + ECHO
+        frames = [
+            _tcp_frame(999, b'', flags=0x02),
+            _tcp_frame(1000, data[:10]),
+            # Retransmission of the first segment.
+            _tcp_frame(1000, data[:10]),
+            _tcp_frame(1010, data[10:]),
+            # Not OpenFlow.
+            _tcp_frame(1, HELLO, dport=80),
+        ]
+        result = list(read_messages(_pcap(frames)))
+        self.assertEqual([msg.data for msg in result], [HELLO, ECHO])
+        self.assertEqual(result[0].time, '101.000005000')
+        self.assertEqual(result[1].time, '103.000005000')
+        self.assertEqual(result[0].conn_id, result[1].conn_id)
+
+    def test_pcap_gap(self):
+        frames = [
+            _tcp_frame(1000, HELLO + ECHO[:4]),
+            # Segment containing the rest of ECHO is missing.
+            _tcp_frame(1020, HELLO),
+        ]
+        result = list(read_messages(_pcap(frames)))
+        self.assertEqual([msg.data for msg in result], [HELLO, HELLO])
+
+
+def _decode_many(binaries, *, threads=None):
+    """Stand-in for `oftr decode` that only knows HELLO and ECHO_REQUEST."""
+    names = {0: 'HELLO', 2: 'ECHO_REQUEST'}
+    return ['type: %s\nmsg: {}\n' % names[data[1]] for data in binaries]
+
+
+@mock.patch('zof.capture.decode_many', _decode_many)
+class ReadEventsTestCase(unittest.TestCase):
+    # HELLO, ECHO, HELLO, ECHO starting at seq 1000.
+    DATA = HELLO + ECHO + HELLO + ECHO
+
+    def _frames(self):
+        data = self.DATA
+        return [
+            _tcp_frame(999, b'', flags=0x02),
+            _tcp_frame(1000, data[:12]),
+            # Retransmission that overlaps the end of the last segment and
+            # carries new data.
+            _tcp_frame(1004, data[4:22]),
+            # The rest of the second HELLO (1022-1027) is missing.
+            _tcp_frame(1028, data[28:]),
+        ]
+
+    def test_retransmit_and_gap(self):
+        events = list(read_events(_pcap(self._frames())))
+        params = [event['params'] for event in events]
+        self.assertEqual([p['type'] for p in params],
+                         ['HELLO', 'ECHO_REQUEST', 'ECHO_REQUEST'])
+        self.assertEqual([p['xid'] for p in params], [1, 2, 2])
+        self.assertEqual(len({p['conn_id'] for p in params}), 1)
+        self.assertEqual(params[0]['time'], '101.000005000')
+        self.assertEqual(params[2]['time'], '103.000005000')
+        self.assertEqual(events[0]['method'], 'OFP.MESSAGE')
+
+    def test_main(self):
+        with tempfile.NamedTemporaryFile(suffix='.pcap') as pcap:
+            pcap.write(_pcap(self._frames()).getvalue())
+            pcap.flush()
+            with mock.patch('sys.stdout', new_callable=io.StringIO) as out:
+                self.assertEqual(main([pcap.name]), 0)
+        lines = [line.split() for line in out.getvalue().splitlines()]
+        self.assertEqual(lines, [['ECHO_REQUEST', '2', '24'],
+                                 ['HELLO', '1', '8']])
+
+
+# PACKET_IN as printed by `oftr decode`.
+PACKET_IN_YAML = """
+type:            PACKET_IN
+xid:             0x00000000
+version:         0x04
+msg:
+  buffer_id:       NO_BUFFER
+  total_len:       0x0004
+  in_port:         0x00000002
+  in_phy_port:     0x00000002
+  metadata:        0x0000000000000000
+  reason:          APPLY_ACTION
+  table_id:        0x03
+  cookie:          0x000000005ADC15C0
+  match:
+    - field:       IN_PORT
+      value:       0x00000002
+  data:            12345678
+  _pkt:
+    - field:       ETH_SRC
+      value:       12:34:56:12:34:56
+    - field:       X_LLDP_TTL
+      value:       0x0078
+    - field:       X_LLDP_PORT_DESCR
+      value:       on
+"""
+
+# The same PACKET_IN as received by the controller.
+PACKET_IN_JSON = """
+{"buffer_id":"NO_BUFFER","total_len":4,"in_port":2,"in_phy_port":2,
+ "metadata":0,"reason":"APPLY_ACTION","table_id":3,"cookie":1524372928,
+ "match":[{"field":"IN_PORT","value":2}],"data":"12345678",
+ "_pkt":[{"field":"ETH_SRC","value":"12:34:56:12:34:56"},
+         {"field":"X_LLDP_TTL","value":120},
+         {"field":"X_LLDP_PORT_DESCR","value":"on"}]}
+"""
+
+
+class LoadMsgTestCase(unittest.TestCase):
+    def test_types(self):
+        loader = yaml_loader()
+        if loader is None:
+            self.skipTest('PyYAML is not installed')
+        # Packet data, MAC addresses and `on` stay strings.
+        msg = _load_msg(PACKET_IN_YAML, loader)
+        self.assertEqual(msg, json.loads(PACKET_IN_JSON))
+
+        msg = _load_msg('msg: [ 1.5, 1e3, 0x1F, -2, null, true, yes ]',
+                        loader)
+        self.assertEqual(msg, [1.5, 1000.0, 31, -2, None, True, 'yes'])
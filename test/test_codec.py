@@ -1,7 +1,8 @@
 import unittest
 import zof
 import codecs
-from zof.codec import encode, decode, OFTR_ENCODE, _oftr_call
+from zof.codec import (encode, decode, encode_many, decode_many, OFTR_ENCODE,
+                       _oftr_call, _buffer, _map)
 from zof.exception import CodecError
 
 
@@ -114,3 +115,26 @@ msg:
         except ValueError as ex:
             self.assertIsNone(ex.__cause__)
             self.assertIsInstance(ex, CodecError)
+
+    def test_encode_many(self):
+        texts = ['type: HELLO\nversion: 1', {'type': 'HELLO', 'version': 4}]
+        for threads in (None, 2):
+            result = encode_many(texts * 3, threads=threads)
+            self.assertEqual(result, [encode(text) for text in texts] * 3)
+
+        self.assertEqual(
+            decode_many(result, threads=2), [decode(data) for data in result])
+
+        with self.assertRaises(CodecError):
+            encode_many(['type: HELLO', 'type: HELO'], threads=2)
+
+    def test_map(self):
+        self.assertEqual(_map(str, range(5), None), ['0', '1', '2', '3', '4'])
+        self.assertEqual(_map(str, range(5), 3), ['0', '1', '2', '3', '4'])
+        self.assertEqual(_map(str, [], 3), [])
+
+    def test_buffer(self):
+        buf = _buffer(5000)
+        self.assertEqual(len(buf), 8192)
+        self.assertIs(_buffer(100), buf)
+        self.assertEqual(len(_buffer(9000)), 16384)
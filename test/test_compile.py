@@ -1,5 +1,19 @@
+import json
 import unittest
 import zof
+from zof.api_compile import CompiledString, _columns_to_rows
+from zof.controller import Controller
+
+
+class _MockConnection:
+    def __init__(self):
+        self.output = []
+
+    def write(self, data):
+        self.output.append(data)
+
+    def is_closed(self):  # pylint: disable=no-self-use
+        return False
 
 
 class CompileTestCase(unittest.TestCase):
@@ -64,3 +78,100 @@ params:
     "method": "OFP.DESCRIPTION"
 }
 </zof.CompiledObjectRPC>''', repr(rpc_msg))
+
+    def test_compile_msg_type(self):
+        """Test that the message type is known after compiling.
+        """
+        ofmsg = zof.compile('''
+            # Comment
+            type: flow_mod
+            msg:
+              command: ADD
+            ''')
+        self.assertEqual(ofmsg.msg_type, 'FLOW_MOD')
+        ofmsg = zof.compile({'type': 'REQUEST.PORT_STATS'})
+        self.assertEqual(ofmsg.msg_type, 'REQUEST.PORT_STATS')
+        ofmsg = zof.compile('type: $type_')
+        self.assertIsNone(ofmsg.msg_type)
+
+
+class SendManyTestCase(unittest.TestCase):
+    def test_send_many(self):
+        controller = Controller()
+        controller.conn = _MockConnection()
+        sent = []
+
+        def _hook(ofmsg, kwds, xid, datapath_id, conn_id):
+            sent.append((ofmsg, ofmsg.message(kwds), xid, datapath_id,
+                         conn_id))
+
+        controller.add_send_hook('FLOW_MOD', _hook)
+        ofmsg = CompiledString(controller, '''
+            type: FLOW_MOD
+            msg:
+              command: ADD
+              match:
+                - field: ETH_DST
+                  value: $eth_dst
+              instructions:
+                - instruction: APPLY_ACTIONS
+                  actions:
+                    - action: OUTPUT
+                      port_no: $out_port
+            ''')
+        xids = ofmsg.send_many(
+            {
+                'eth_dst': [1, 2, 3],
+                'out_port': [4, 5, 6]
+            },
+            datapath_id='00:00:00:00:00:00:00:01')
+        self.assertEqual(len(xids), 3)
+        self.assertEqual(list(xids), list(range(xids[0], xids[0] + 3)))
+
+        # All messages are written in one buffer, one frame per row.
+        self.assertEqual(len(controller.conn.output), 1)
+        frames = controller.conn.output[0].split(b'\x00')
+        self.assertEqual(len(frames), 3)
+        for i, (xid, frame) in enumerate(zip(xids, frames)):
+            params = json.loads(frame.decode('utf-8'))['params']
+            self.assertEqual(params['xid'], xid)
+            self.assertEqual(params['datapath_id'], '00:00:00:00:00:00:00:01')
+            msg = params['msg']
+            self.assertEqual(msg['match'][0]['value'],
+                             '00:00:00:00:00:0%d' % (i + 1))
+            port_no = msg['instructions'][0]['actions'][0]['port_no']
+            self.assertEqual(port_no, i + 4)
+
+            # Send hooks are called for each message.
+            self.assertIs(sent[i][0], ofmsg)
+            self.assertEqual(sent[i][1]['msg'], msg)
+            self.assertEqual(sent[i][2:],
+                             (xid, '00:00:00:00:00:00:00:01', None))
+        self.assertEqual(len(sent), 3)
+
+        # Rows may also be a sequence of dicts.
+        xids = ofmsg.send_many(
+            [dict(eth_dst='00:00:00:00:00:0a')],
+            out_port=1,
+            datapath_id='00:00:00:00:00:00:00:01')
+        self.assertEqual(len(controller.conn.output), 2)
+        params = json.loads(controller.conn.output[1].decode('utf-8'))['params']
+        self.assertEqual(params['xid'], xids[0])
+        self.assertEqual(params['msg']['match'][0]['value'],
+                         '00:00:00:00:00:0a')
+
+    def test_columns_to_rows(self):
+        rows = _columns_to_rows({
+            'eth_dst': [1, '00:00:00:00:00:02'],
+            'out_port': (3, 4)
+        })
+        self.assertEqual(rows, [{
+            'eth_dst': '00:00:00:00:00:01',
+            'out_port': 3
+        }, {
+            'eth_dst': '00:00:00:00:00:02',
+            'out_port': 4
+        }])
+
+        with self.assertRaises(ValueError):
+            _columns_to_rows({'eth_dst': [1], 'out_port': [1, 2]})
@@ -0,0 +1,51 @@
+import unittest
+from zof.api_compile import CompiledObject
+from zof.objectview import ObjectView, from_json
+
+
+class CompiledObjectTestCase(unittest.TestCase):
+    def test_complete(self):
+        obj = {'type': 'ECHO_REQUEST', 'msg': {'data': b'AB'}}
+        cmsg = CompiledObject(None, obj)
+        task_locals = dict(datapath_id='dpid_1', conn_id=7)
+
+        expected = (
+            '{"method":"OFP.SEND","params":{"xid":1,"datapath_id":"dpid_1",'
+            '"conn_id":7,"type":"ECHO_REQUEST","msg":{"data":"4142"}}}')
+        self.assertEqual(expected, cmsg._complete(dict(xid=1), task_locals))
+
+        # Later sends do not reuse the first xid or datapath_id.
+        actual = from_json(
+            cmsg._complete(dict(xid=2, datapath_id='dpid_2'), dict()))
+        self.assertEqual(actual['params'], {
+            'xid': 2,
+            'datapath_id': 'dpid_2',
+            'type': 'ECHO_REQUEST',
+            'msg': {
+                'data': '4142'
+            }
+        })
+
+        # The template is not modified.
+        self.assertEqual(obj, {'type': 'ECHO_REQUEST', 'msg': {'data': b'AB'}})
+        self.assertNotIn('xid', cmsg._obj)
+
+    def test_fixed_fields(self):
+        cmsg = CompiledObject(None,
+                              ObjectView({
+                                  'type': 'BARRIER_REQUEST',
+                                  'datapath_id': 'dpid_1',
+                                  'xid': 99
+                              }))
+        actual = from_json(cmsg._complete(dict(xid=1, conn_id=5), dict()))
+        self.assertEqual(actual['params'], {
+            'xid': 99,
+            'datapath_id': 'dpid_1',
+            'conn_id': 5,
+            'type': 'BARRIER_REQUEST'
+        })
+
+    def test_missing_target(self):
+        cmsg = CompiledObject(None, {'type': 'BARRIER_REQUEST'})
+        with self.assertRaises(ValueError):
+            cmsg._complete(dict(xid=1), dict())
@@ -27,15 +27,9 @@ params:
 
         task_locals = dict(datapath_id='dpid_1', conn_id=7)
 
-        expected = '''\
-method: OFP.SEND
-params:
-  xid: 1000
-  datapath_id: "dpid_1"
-  conn_id: 7
-  type: ECHO_REQUEST
-  msg:
-    data: DEADBEEF'''
+        expected = (
+            '{"method":"OFP.SEND","params":{"xid":1000,"datapath_id":"dpid_1",'
+            '"conn_id":7,"type":"ECHO_REQUEST","msg":{"data":"DEADBEEF"}}}')
 
         actual = cmsg._complete(dict(xid=1000), task_locals)
         self.assertEqual(expected, actual)
@@ -48,14 +42,10 @@ params:
         cmsg = CompiledString(None, template)
         task_locals = dict(datapath_id=None, conn_id=None)
 
-        expected = '''\
-method: OFP.SEND
-params:
-  xid: 1
-  datapath_id: null
-  conn_id: 13
-  type: "ECHO_REQUEST"
-  msg: {"data":"414243444546"}'''
+        expected = (
+            '{"method":"OFP.SEND","params":{"xid":1,"datapath_id":null,'
+            '"conn_id":13,"type":"ECHO_REQUEST","msg":{"data":"414243444546"}}}'
+        )
 
         # Test with msg as a dictionary.
         msg = dict(data=b'ABCDEF')
@@ -94,3 +84,77 @@ params:
         with self.assertRaisesRegex(ValueError,
                                     'Unknown keyword argument "x"'):
             cmsg._complete(dict(x=5), task_locals)
+
+    def test_comment_argument(self):
+        msg = '''
+        type: ECHO_REQUEST  # $old
+        msg:
+          # data: $data
+          data: DEADBEEF
+        '''
+        cmsg = CompiledString(None, msg)
+        self.assertEqual(cmsg._template_args, {'xid', 'datapath_id', 'conn_id'})
+        task_locals = dict(datapath_id='dpid_1', conn_id=7)
+
+        with self.assertRaisesRegex(ValueError,
+                                    'Unknown keyword argument "data"'):
+            cmsg._complete(dict(xid=1, data=b'1'), task_locals)
+
+    def test_missing_template_argument(self):
+        cmsg = CompiledString(None, 'type: $type_')
+        task_locals = dict(datapath_id='dpid_1', conn_id=7)
+
+        with self.assertRaisesRegex(LookupError, r'Missing \$\{type_\}'):
+            cmsg._complete(dict(xid=1), task_locals)
+
+    def test_json_values(self):
+        msg = '''
+        type: FLOW_MOD
+        msg:
+          table_id: 0x10
+          priority: 5
+          match:
+          cookie: ${prefix}-$$-$port
+          flags: [ $flag ]
+          data: '$data'
+        '''
+        cmsg = CompiledString(None, msg)
+        task_locals = dict(datapath_id=None, conn_id=7)
+
+        expected = (
+            '{"method":"OFP.SEND","params":{"xid":1,"datapath_id":null,'
+            '"conn_id":7,"type":"FLOW_MOD","msg":{"table_id":"0x10",'
+            '"priority":5,"match":null,"cookie":"a\\"b-$-3","flags":[true],'
+            '"data":"0102"}}}')
+
+        actual = cmsg._complete(
+            dict(xid=1, prefix='a"b', port=3, flag=True, data=b'\x01\x02'),
+            task_locals)
+        self.assertEqual(expected, actual)
+
+    def test_bytes_like_values(self):
+        msg = '''
+        type: PACKET_OUT
+        msg:
+          data: $data
+          extra: x-$data
+        '''
+        cmsg = CompiledString(None, msg)
+        task_locals = dict(datapath_id=None, conn_id=7)
+        for data in (memoryview(b'\x00\x01\x02')[1:], bytearray(b'\x01\x02')):
+            actual = cmsg._complete(dict(xid=1, data=data), task_locals)
+            self.assertIn('"msg":{"data":"0102","extra":"x-0102"}', actual)
+
+    def test_yaml_fallback(self):
+        # A template argument used as a key can't be precompiled to JSON.
+        msg = '''
+        type: ECHO_REQUEST
+        msg:
+          $key: DEADBEEF
+        '''
+        cmsg = CompiledString(None, msg)
+        self.assertIsNone(cmsg._json)
+
+        task_locals = dict(datapath_id='dpid_1', conn_id=7)
+        actual = cmsg._complete(dict(xid=1, key='data'), task_locals)
+        self.assertIn('"data": DEADBEEF', actual)
@@ -0,0 +1,96 @@
+from zof.controller import Controller
+from zof.exception import RPCException
+from .asynctestcase import AsyncTestCase
+
+
+class _MockConnection:
+    def __init__(self):
+        self.output = []
+
+    def write(self, data):
+        self.output.append(data)
+
+    def is_closed(self):  # pylint: disable=no-self-use
+        return False
+
+
+class ControllerTestCase(AsyncTestCase):
+    def setUp(self):
+        self.controller = Controller()
+        self.controller.conn = _MockConnection()
+
+    async def test_rpc_batch(self):
+        batch = self.controller.rpc_batch([('OFP.DESCRIPTION', {}),
+                                           ('OFP.CLOSE', {
+                                               'conn_id': 7
+                                           })])
+        self.assertEqual(len(batch), 2)
+
+        # Both requests are sent in one write.
+        self.assertEqual(len(self.controller.conn.output), 1)
+        frames = self.controller.conn.output[0].split(b'\x00')
+        self.assertEqual(frames, [
+            b'{"id":10001,"method":"OFP.DESCRIPTION","params":{}}',
+            b'{"id":10002,"method":"OFP.CLOSE","params":{"conn_id":7}}'
+        ])
+
+        self.controller._handle_rpc_reply({'id': 10002, 'result': {'b': 2}})
+        self.controller._handle_rpc_reply({'id': 10001, 'result': {'a': 1}})
+
+        results = await batch
+        self.assertEqual(results, [{'a': 1}, {'b': 2}])
+
+    async def test_rpc_batch_error(self):
+        batch = self.controller.rpc_batch([('OFP.DESCRIPTION', {}),
+                                           ('OFP.FOO', {})])
+        self.controller._handle_rpc_reply({'id': 10001, 'result': {}})
+        self.controller._handle_rpc_reply({
+            'id': 10002,
+            'error': {
+                'code': -32601,
+                'message': 'unknown method'
+            }
+        })
+
+        results = await batch.gather(return_exceptions=True)
+        self.assertEqual(results[0], {})
+        self.assertIsInstance(results[1], RPCException)
+
+    async def test_rpc_batch_empty(self):
+        batch = self.controller.rpc_batch([])
+        self.assertEqual(len(batch), 0)
+        self.assertEqual(await batch, [])
+        self.assertEqual(self.controller.conn.output, [])
+
+    def test_next_xids(self):
+        xids = self.controller.next_xids(3)
+        self.assertEqual(list(xids), [10001, 10002, 10003])
+        self.assertEqual(self.controller.next_xid(), 10004)
+
+        # A block of xids never wraps around.
+        self.controller._xid = 0xFFFFFFFE
+        self.assertEqual(list(self.controller.next_xids(2)), [10000, 10001])
+
+    def test_write_many(self):
+        self.controller.write_many(['{"a":1}', {'b': 2}])
+        self.controller.write_many([])
+        self.assertEqual(self.controller.conn.output,
+                         [b'{"a":1}\x00{"b":2}'])
+
+    def test_recv_hook(self):
+        received = []
+        self.controller.add_recv_hook('barrier_reply', received.append)
+        message = {'type': 'BARRIER_REPLY', 'xid': 5, 'datapath_id': '1'}
+        self.controller._handle_message(message)
+        self.assertEqual(received, [message])
+
+        # An exception in one hook is logged; later hooks still run.
+        def _fail(_message):
+            raise ValueError('hook failed')
+
+        self.controller.add_recv_hook('barrier_reply', _fail)
+        self.controller.add_recv_hook('barrier_reply', received.append)
+        with self.assertLogs('zof', 'ERROR') as logs:
+            self.controller._handle_message(message)
+        self.assertEqual(received, [message] * 3)
+        self.assertIn('hook failed', logs.output[0])
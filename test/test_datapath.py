@@ -24,6 +24,30 @@ class DatapathTestCase(unittest.TestCase):
         dps = [dp for dp in dpids]
         self.assertEqual(dps, [dp2])
 
+    def test_datapath_list_indexes(self):
+        dpids = DatapathList()
+        dp1 = dpids.add_datapath(datapath_id=0x01, conn_id=11)
+        dp2 = dpids.add_datapath(datapath_id=0x02, conn_id=12)
+        self.assertIs(dpids.find_conn_id(12), dp2)
+        self.assertIsNone(dpids.find_conn_id(13))
+        self.assertIs(dpids.get('00:00:00:00:00:00:00:01'), dp1)
+        self.assertIsNone(dpids.get(0x03))
+
+        self.assertEqual(dpids.ready_datapaths(), ())
+        dp2.ready = True
+        dp1.ready = True
+        self.assertEqual(dpids.ready_datapaths(), (dp2, dp1))
+        dp2.ready = False
+        self.assertEqual(dpids.ready_datapaths(), (dp1, ))
+
+        dpids.delete_datapath(datapath_id=0x01)
+        self.assertEqual(dpids.ready_datapaths(), ())
+        self.assertIsNone(dpids.find_conn_id(11))
+
+        # Deleted datapath no longer updates the list.
+        dp1.ready = True
+        self.assertEqual(dpids.ready_datapaths(), ())
+
     def test_datapath(self):
         dp1 = Datapath(datapath_id='00:00:00:00:00:00:00:01', conn_id=1001)
         self.assertEqual(dp1.datapath_id, '00:00:00:00:00:00:00:01')
@@ -148,6 +172,91 @@ class DatapathTestCase(unittest.TestCase):
         self.assertEqual(port1.curr_speed, 1e6)
         self.assertEqual(port1.max_speed, 2e6)
 
+    def test_port_flags(self):
+        dp1 = Datapath(datapath_id='00:00:00:00:00:00:00:01', conn_id=1001)
+        port1 = dp1.add_port(port_no=1)
+        self.assertEqual(port1.state, [])
+        self.assertEqual(port1.config, [])
+
+        port1.state = ['LIVE', 'LINK_DOWN']
+        self.assertEqual(port1.state_flags, 0x05)
+        self.assertEqual(port1.state, ['LINK_DOWN', 'LIVE'])
+        self.assertFalse(port1.up)
+
+        port1.config = ['NO_FWD', '0x00000100']
+        self.assertEqual(port1.config_flags, 0x120)
+        self.assertEqual(port1.config, ['NO_FWD', '0x00000100'])
+        self.assertFalse(port1.admin_down)
+
+        # Unknown names are kept, and only logged the first time.
+        with self.assertLogs('zof', 'INFO') as logs:
+            port1.state = ['STP_LEARN', 'LIVE', 'STP_LEARN']
+            port1.state = ['LIVE', 'STP_LEARN']
+        self.assertEqual(len(logs.output), 1)
+        self.assertEqual(port1.state_flags, 0x04)
+        self.assertEqual(port1.state, ['LIVE', 'STP_LEARN'])
+        port_desc = port1.desc()
+        port_desc['state'] = ['STP_FORWARD', 'LIVE']
+        self.assertEqual(port1.update(port_desc),
+                         {'state': ['LIVE', 'STP_LEARN']})
+        self.assertEqual(port1.state, ['LIVE', 'STP_FORWARD'])
+        self.assertEqual(port1.update(port1.desc()), {})
+        port1.state = 0
+        self.assertEqual(port1.state, [])
+
+        with self.assertRaises(AttributeError):
+            port1.extra = 1
+
+    def test_user_data(self):
+        dp1 = Datapath(datapath_id='00:00:00:00:00:00:00:01', conn_id=1001)
+        dp1.user_data['x'] = 1
+        self.assertEqual(dp1.user_data, {'x': 1})
+
+    def test_add_ports_changes(self):
+        dp1 = Datapath(datapath_id='00:00:00:00:00:00:00:01', conn_id=1001)
+        port_desc = {
+            'port_no': 1,
+            'hw_addr': '00:00:00:00:00:01',
+            'name': 'eth1',
+            'state': [],
+            'config': [],
+            'curr_speed': 0,
+            'max_speed': 0
+        }
+        changed = dp1.add_ports([port_desc])
+        self.assertEqual(changed, [(dp1[1], {
+            'hw_addr': None,
+            'name': None
+        })])
+        self.assertEqual(dp1.add_ports([port_desc]), [])
+
+        port_desc['state'] = ['LINK_DOWN']
+        changed = dp1.add_ports([port_desc])
+        self.assertEqual(changed, [(dp1[1], {'state': []})])
+        self.assertFalse(dp1[1].up)
+
+    def test_port_indexes(self):
+        dp1 = Datapath(datapath_id='00:00:00:00:00:00:00:01', conn_id=1001)
+        port1 = dp1.add_port(port_no=1)
+        port1.name = 'eth1'
+        port1.hw_addr = '00:00:00:00:00:0A'
+        self.assertIs(dp1.find_port_by_name('eth1'), port1)
+        self.assertIs(dp1.find_port_by_hw_addr('00:00:00:00:00:0a'), port1)
+        self.assertIsNone(dp1.find_port_by_name('eth2'))
+
+        # Indexes follow changes after they are built.
+        port1.name = 'eth2'
+        port2 = dp1.add_port(port_no=2)
+        port2.name = 'eth1'
+        self.assertIs(dp1.find_port_by_name('eth2'), port1)
+        self.assertIs(dp1.find_port_by_name('eth1'), port2)
+
+        dp1.delete_port(port_no=1)
+        self.assertIsNone(dp1.find_port_by_name('eth2'))
+        self.assertIsNone(dp1.find_port_by_hw_addr('00:00:00:00:00:0a'))
+        port1.name = 'eth3'
+        self.assertIsNone(dp1.find_port_by_name('eth3'))
+
     def test_normalize_datapath(self):
         dpid = normalize_datapath_id('00:00:00:00:00:00:00:01')
         self.assertEqual(dpid, 1)
@@ -0,0 +1,200 @@
+import unittest
+from zof.api_compile import CompiledObject, CompiledString
+from zof.flowtable import FlowTable
+
+
+def _flow_mod(command, eth_dst, port=1, **kwds):
+    msg = {
+        'command': command,
+        'table_id': 0,
+        'priority': 10,
+        'match': [{
+            'field': 'ETH_DST',
+            'value': eth_dst
+        }],
+        'instructions': [{
+            'instruction': 'APPLY_ACTIONS',
+            'actions': [{
+                'action': 'OUTPUT',
+                'port_no': port
+            }]
+        }]
+    }
+    msg.update(kwds)
+    return msg
+
+
+class FlowTableTestCase(unittest.TestCase):
+    def setUp(self):
+        self.table = FlowTable()
+        self.table.apply_flow_mod(_flow_mod('ADD', '00:00:00:00:00:01'))
+        self.table.apply_flow_mod(
+            _flow_mod('ADD', '00:00:00:00:00:02', port=2, cookie=7))
+        self.table.apply_flow_mod(
+            _flow_mod('ADD', '00:00:00:00:00:03', table_id=1))
+
+    def test_find(self):
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(len(self.table.find(table_id=0)), 2)
+        self.assertEqual(len(self.table.find(out_port=1)), 2)
+        self.assertEqual(len(self.table.find(out_port='2')), 1)
+        self.assertEqual(len(self.table.find(cookie=7, out_port=1)), 0)
+        entries = self.table.find(match={'eth_dst': '00:00:00:00:00:02'})
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0].cookie, 7)
+
+        entry = self.table.get(_flow_mod('ADD', '00:00:00:00:00:01'))
+        self.assertEqual(entry.instructions[0]['actions'][0]['port_no'], 1)
+
+    def test_modify(self):
+        self.table.apply_flow_mod(
+            _flow_mod('MODIFY_STRICT', '00:00:00:00:00:01', port=5))
+        self.assertEqual(len(self.table.find(out_port=5)), 1)
+        self.assertEqual(len(self.table.find(out_port=1)), 1)
+
+        self.table.apply_flow_mod({
+            'command': 'MODIFY',
+            'table_id': 0,
+            'instructions': []
+        })
+        self.assertEqual(self.table.find(out_port=5), [])
+        self.assertEqual(self.table.find(out_port=2), [])
+
+    def test_delete(self):
+        self.table.apply_flow_mod(
+            _flow_mod('DELETE_STRICT', '00:00:00:00:00:01'))
+        self.assertEqual(len(self.table), 2)
+
+        self.table.apply_flow_mod({
+            'command': 'DELETE',
+            'table_id': 'ALL',
+            'out_port': 1
+        })
+        self.assertEqual(len(self.table), 1)
+
+        self.table.apply_flow_removed(_flow_mod('', '00:00:00:00:00:02'))
+        self.assertEqual(len(self.table), 0)
+        self.assertEqual(self.table.find(cookie=7), [])
+
+    def test_undo(self):
+        undo = self.table.apply_flow_mod(
+            _flow_mod('MODIFY', '00:00:00:00:00:01', port=5))
+        undo += self.table.apply_flow_mod(
+            _flow_mod('ADD', '00:00:00:00:00:04'))
+        undo += self.table.apply_flow_mod({
+            'command': 'DELETE',
+            'table_id': 'ALL',
+            'out_port': 2
+        })
+        self.assertEqual(len(self.table), 3)
+        self.table.undo(undo)
+        self.assertEqual(len(self.table), 3)
+        self.assertEqual(len(self.table.find(out_port=1)), 2)
+        self.assertEqual(self.table.find(out_port=5), [])
+        self.assertEqual(len(self.table.find(cookie=7)), 1)
+
+
+class FlowTableAppTestCase(unittest.TestCase):
+    def setUp(self):
+        from zof.service.flowtable import APP
+        self.app = APP
+        self.table = FlowTable()
+        self.app.tables[0xabc] = self.table
+
+    def tearDown(self):
+        self.app.forget(0xabc)
+
+    def _send(self, xid, msg):
+        ofmsg = CompiledObject(None, {'type': 'FLOW_MOD', 'msg': msg})
+        self.app._sent_flow_mod(ofmsg, {'xid': xid}, xid,
+                                '00:00:00:00:00:00:0a:bc', None)
+
+    def test_optimistic(self):
+        self._send(10, _flow_mod('ADD', '00:00:00:00:00:01'))
+        self._send(11, _flow_mod('ADD', '00:00:00:00:00:02'))
+        self.assertEqual(len(self.table), 2)
+
+        # The switch rejects the second flow.
+        self.app._error({'datapath_id': 0xabc, 'xid': 11})
+        self.assertEqual(len(self.table), 1)
+
+        # After the barrier reply, the first flow can't be rolled back.
+        self.app._sent_barrier(None, {}, 12, 0xabc, None)
+        self.app._barrier_reply({'xid': 12})
+        self.app._error({'datapath_id': 0xabc, 'xid': 10})
+        self.assertEqual(len(self.table), 1)
+
+    def test_unconfirmed_limit(self):
+        from zof.service.flowtable import MAX_UNCONFIRMED
+        for xid in range(MAX_UNCONFIRMED + 10):
+            self._send(xid, _flow_mod('ADD', '00:00:00:00:00:01', port=xid))
+        self.assertEqual(len(self.app._pending[0xabc]), MAX_UNCONFIRMED)
+        self.assertEqual(len(self.table), 1)
+
+    def test_fetching(self):
+        table = self.app.new_table(0xabc)
+        self._send(10, _flow_mod('ADD', '00:00:00:00:00:01', port=3))
+        self._send(11, _flow_mod('DELETE', '00:00:00:00:00:02'))
+        self._send(12, _flow_mod('ADD', '00:00:00:00:00:04'))
+        self.assertEqual(len(table), 0)
+
+        # The switch rejects a FLOW_MOD that is still held back.
+        self.app._error({'datapath_id': 0xabc, 'xid': 12})
+
+        # FLOW_MODs sent during the fetch are applied on top of its result.
+        self.app.fetched(0xabc, table, [
+            _flow_mod('ADD', '00:00:00:00:00:01'),
+            _flow_mod('ADD', '00:00:00:00:00:02')
+        ])
+        self.assertEqual(len(table), 1)
+        self.assertEqual(len(table.find(out_port=3)), 1)
+
+        # A FLOW_MOD sent after the fetch is applied immediately.
+        self._send(13, _flow_mod('ADD', '00:00:00:00:00:02'))
+        self.assertEqual(len(table), 2)
+
+        # A fetch that finishes after the datapath disconnected is ignored.
+        table = self.app.new_table(0xabc)
+        self.app.forget(0xabc)
+        self.app.fetched(0xabc, table, [_flow_mod('ADD', '00:00:00:00:00:01')])
+        self.assertEqual(len(table), 0)
+        self.assertIsNone(self.app.flow_table(0xabc))
+
+    def test_message(self):
+        ofmsg = CompiledString(None, '''
+            type: FLOW_MOD
+            msg:
+              command: ADD
+              table_id: 0
+              priority: 10
+              match:
+                - field: ETH_DST
+                  value: $eth_dst
+              instructions: $instructions
+            ''')
+        kwds = dict(xid=5, datapath_id='00:00:00:00:00:00:0a:bc',
+                    eth_dst='00:00:00:00:00:01', instructions=[])
+        ofmsg._complete(kwds, {})
+        self.app._sent_flow_mod(ofmsg, kwds, 5, kwds['datapath_id'], None)
+        self.assertEqual(len(self.table.find(
+            match=[{'field': 'ETH_DST', 'value': '00:00:00:00:00:01'}])), 1)
+
+        # A template argument used as a key is sent with the YAML template.
+        ofmsg = CompiledString(None, '''
+            type: FLOW_MOD
+            msg:
+              command: DELETE
+              table_id: 0
+              $key: 10
+              match:
+                - field: ETH_DST
+                  value: 00:00:00:00:00:01
+            ''')
+        self.assertIsNone(ofmsg._json)
+        dpid = '00:00:00:00:00:00:0a:bc'
+        kwds = dict(xid=6, datapath_id=dpid, key='priority')
+        ofmsg._complete(kwds, {})
+        self.assertEqual(ofmsg.message(kwds)['msg']['match'][0]['value'],
+                         '00:00:00:00:00:01')
+        self.app._sent_flow_mod(ofmsg, kwds, 6, dpid, None)
+        self.assertEqual(len(self.table), 0)
@@ -0,0 +1,18 @@
+import unittest
+from zof.packetout import buffer_id, is_complete
+
+
+class PacketOutTestCase(unittest.TestCase):
+    def test_buffer_id(self):
+        self.assertEqual(buffer_id({'buffer_id': 343}), 343)
+        self.assertIsNone(buffer_id({'buffer_id': 'NO_BUFFER'}))
+        self.assertIsNone(buffer_id({'buffer_id': 0xFFFFFFFF}))
+        self.assertIsNone(buffer_id({}))
+
+    def test_is_complete(self):
+        msg = {'buffer_id': 'NO_BUFFER', 'data': b'abc', 'total_len': 3}
+        self.assertTrue(is_complete(msg))
+        msg['total_len'] = 64
+        self.assertFalse(is_complete(msg))
+        msg['buffer_id'] = 343
+        self.assertTrue(is_complete(msg))
@@ -0,0 +1,104 @@
+import struct
+import unittest
+from zof.pktdecode import decode_packet
+
+ETH = bytes.fromhex('000000000002' '000000000001')
+
+
+def _ipv4(proto, payload, frag=0):
+    return struct.pack('!BBHHHBBH4s4s', 0x45, 0x2e, 20 + len(payload), 0,
+                       frag, 64, proto, 0, bytes([10, 0, 0, 1]),
+                       bytes([10, 0, 0, 2])) + payload
+
+
+def _ipv6(proto, payload):
+    src = bytes.fromhex('fe800000000000000000000000000001')
+    dst = bytes.fromhex('ff020000000000000000000000000001')
+    return struct.pack('!LHBB16s16s', 0x60012345, len(payload), proto, 255,
+                       src, dst) + payload
+
+
+class PktDecodeTestCase(unittest.TestCase):
+    def test_tcp_vlan(self):
+        tcp = struct.pack('!HHLLBBHHH', 49152, 80, 1, 0, 0x50, 0x12, 0, 0, 0)
+        data = ETH + b'\x81\x00\x20\x0a\x08\x00' + _ipv4(6, tcp + b'xyz')
+        fields = decode_packet(data)
+        self.assertEqual(fields, {
+            'eth_dst': '00:00:00:00:00:02',
+            'eth_src': '00:00:00:00:00:01',
+            'vlan_vid': 0x100a,
+            'vlan_pcp': 1,
+            'eth_type': 0x0800,
+            'ip_dscp': 11,
+            'ip_ecn': 2,
+            'ip_proto': 6,
+            'ipv4_src': '10.0.0.1',
+            'ipv4_dst': '10.0.0.2',
+            'nx_ip_ttl': 64,
+            'tcp_src': 49152,
+            'tcp_dst': 80,
+            'tcp_flags': 0x12,
+            'x_pkt_pos': 58
+        })
+        self.assertEqual(data[fields['x_pkt_pos']:], b'xyz')
+
+    def test_ipv4_fragment(self):
+        data = ETH + b'\x08\x00' + _ipv4(17, b'\x00' * 8, frag=100)
+        fields = decode_packet(data)
+        self.assertEqual(fields['ip_proto'], 17)
+        self.assertNotIn('udp_src', fields)
+        self.assertEqual(fields['x_pkt_pos'], 34)
+
+    def test_arp(self):
+        arp = struct.pack('!HHBBH6s4s6s4s', 1, 0x0800, 6, 4, 1,
+                          bytes.fromhex('000000000001'), bytes([10, 0, 0, 1]),
+                          bytes(6), bytes([10, 0, 0, 2]))
+        fields = decode_packet(ETH + b'\x08\x06' + arp)
+        self.assertEqual(fields['arp_op'], 1)
+        self.assertEqual(fields['arp_spa'], '10.0.0.1')
+        self.assertEqual(fields['arp_tpa'], '10.0.0.2')
+        self.assertEqual(fields['arp_sha'], '00:00:00:00:00:01')
+        self.assertEqual(fields['arp_tha'], '00:00:00:00:00:00')
+        self.assertEqual(fields['x_pkt_pos'], 42)
+
+    def test_ipv6_udp_exthdr(self):
+        hop_by_hop = bytes([17, 0]) + bytes(6)
+        udp = struct.pack('!HHHH', 546, 547, 8, 0)
+        data = ETH + b'\x86\xdd' + _ipv6(0, hop_by_hop + udp)
+        fields = decode_packet(data)
+        self.assertEqual(fields['ipv6_src'], 'fe80::1')
+        self.assertEqual(fields['ipv6_dst'], 'ff02::1')
+        self.assertEqual(fields['ipv6_flabel'], 0x12345)
+        self.assertEqual(fields['ipv6_exthdr'], 0x40)
+        self.assertEqual(fields['ip_proto'], 17)
+        self.assertEqual(fields['nx_ip_ttl'], 255)
+        self.assertEqual(fields['udp_src'], 546)
+        self.assertEqual(fields['udp_dst'], 547)
+        self.assertEqual(fields['x_pkt_pos'], len(data))
+
+    def test_icmpv6_nd(self):
+        target = bytes.fromhex('fe800000000000000000000000000002')
+        sll = bytes([1, 1]) + bytes.fromhex('000000000001')
+        icmp = bytes([135, 0, 0, 0]) + bytes(4) + target + sll
+        fields = decode_packet(ETH + b'\x86\xdd' + _ipv6(58, icmp))
+        self.assertEqual(fields['icmpv6_type'], 135)
+        self.assertEqual(fields['icmpv6_code'], 0)
+        self.assertEqual(fields['ipv6_nd_target'], 'fe80::2')
+        self.assertEqual(fields['ipv6_nd_sll'], '00:00:00:00:00:01')
+
+    def test_lldp(self):
+        lldp = (b'\x02\x07\x04' + bytes.fromhex('000000000001') +
+                b'\x04\x03\x07' + b'\x31\x33' + b'\x06\x02\x00\x78' +
+                b'\x00\x00')
+        fields = decode_packet(bytes.fromhex('0180c200000e') + ETH[6:] +
+                               b'\x88\xcc' + lldp)
+        self.assertEqual(fields['x_lldp_chassis_id'], 'mac 00:00:00:00:00:01')
+        self.assertEqual(fields['x_lldp_port_id'], 'local 13')
+        self.assertEqual(fields['x_lldp_ttl'], 120)
+
+    def test_truncated(self):
+        data = ETH + b'\x08\x00' + _ipv4(6, b'')[:10]
+        fields = decode_packet(data)
+        self.assertEqual(fields['eth_type'], 0x0800)
+        self.assertNotIn('ipv4_src', fields)
+        self.assertEqual(decode_packet(b'\x00\x01'), {})
@@ -0,0 +1,76 @@
+import io
+import unittest
+
+try:
+    import numpy
+    from zof.pktring import PacketRing
+except ImportError:
+    numpy = None
+
+DPID = '00:00:00:00:00:00:00:01'
+
+
+def _msg(in_port, eth_src, **pkt):
+    pkt['eth_src'] = eth_src
+    pkt.setdefault('eth_dst', 'ff:ff:ff:ff:ff:ff')
+    pkt.setdefault('eth_type', 0x0800)
+    return {'in_port': in_port, 'total_len': 100, 'pkt': pkt}
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class PacketRingTestCase(unittest.TestCase):
+    def test_append(self):
+        ring = PacketRing(4)
+        ring.append(DPID, _msg(1, '00:00:00:00:00:01', ipv4_src='10.0.0.1',
+                               ip_proto=6, tcp_src=80), time='10.5')
+        self.assertEqual(len(ring), 1)
+        snap = ring.snapshot()
+        self.assertEqual(snap['time'].tolist(), [10.5])
+        self.assertEqual(snap['datapath_id'].tolist(), [1])
+        self.assertEqual(snap['eth_src'].tolist(), [1])
+        self.assertEqual(snap['eth_dst'].tolist(), [0xFFFFFFFFFFFF])
+        self.assertEqual(snap['ipv4_src'].tolist(), [0x0A000001])
+        self.assertEqual(snap['ipv4_dst'].tolist(), [0])
+        self.assertEqual(snap['tp_src'].tolist(), [80])
+        self.assertEqual(snap['ipv6_src'].tolist(), [[0, 0]])
+
+    def test_default_capacity(self):
+        # The default ring must stay small; services opt in to more rows.
+        ring = PacketRing()
+        size = sum(col.nbytes for col in ring.columns.values())
+        self.assertLess(size, 2 * 2**20)
+
+    def test_wrap(self):
+        ring = PacketRing(3, columns=['time', 'in_port'])
+        for i in range(5):
+            ring.append(DPID, _msg(i, '00:00:00:00:00:01'), time=i)
+        self.assertEqual(len(ring), 3)
+        self.assertEqual(ring.count, 5)
+        self.assertEqual(ring.snapshot()['in_port'].tolist(), [2, 3, 4])
+        self.assertEqual(
+            ring.snapshot(since=3)['in_port'].tolist(), [3, 4])
+        ring.clear()
+        self.assertEqual(len(ring), 0)
+
+    def test_queries(self):
+        ring = PacketRing(10)
+        for i in range(6):
+            eth_src = '00:00:00:00:00:0%d' % (1 if i < 4 else 2)
+            eth_type = 0x0806 if i == 5 else 0x0800
+            ring.append(
+                DPID, _msg(i % 2 + 1, eth_src, eth_type=eth_type), time=i)
+        self.assertEqual(
+            ring.top_talkers(1), [('00:00:00:00:00:01', 4)])
+        self.assertEqual(ring.eth_type_histogram(), {0x0800: 5, 0x0806: 1})
+        rates = ring.port_rates()
+        self.assertEqual(rates[(DPID, 1)], (3 / 5, 300 / 5))
+        self.assertEqual(rates[(DPID, 2)], (3 / 5, 300 / 5))
+
+    def test_export(self):
+        ring = PacketRing(2)
+        ring.append(DPID, _msg(1, '00:00:00:00:00:01'), time=1)
+        buf = io.BytesIO()
+        ring.export(buf)
+        buf.seek(0)
+        data = numpy.load(buf)
+        self.assertEqual(data['in_port'].tolist(), [1])
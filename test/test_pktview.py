@@ -1,6 +1,9 @@
+import copy
+import pickle
 import unittest
 from ipaddress import IPv4Address, IPv6Address, ip_address
-from zof.pktview import make_pktview, pktview_from_list, pktview_to_list, PktView, pktview_alias, pktview_from_ofctl, convert_slash_notation
+from zof.objectview import to_json
+from zof.pktview import make_pktview, pktview_from_list, lazy_pktview_from_list, lazy_pktview_from_data, pktview_to_list, PktView, pktview_alias, pktview_from_ofctl, convert_slash_notation, match_cache_clear
 
 
 class PktViewTestCase(unittest.TestCase):
@@ -66,6 +69,147 @@ class PktViewTestCase(unittest.TestCase):
         pkt = pktview_from_list(data, multiple_value=True, slash_notation=True)
         self.assertEqual(pkt, {'a': ['5/255', 6]})
 
+    def test_lazy_from_list(self):
+        data = [
+            dict(field='ETH_TYPE', value=0x0800),
+            dict(field='IP_PROTO', value=17),
+            dict(field='X_PKT_POS', value=2),
+            dict(field='IPV4_SRC', value='10.0.0.1'),
+            dict(field='A', value=1),
+            dict(field='A', value=2)
+        ]
+        pkt = lazy_pktview_from_list(data, b'abcd')
+        self.assertIsInstance(pkt, PktView)
+        self.assertIsNot(type(pkt), PktView)
+        pkt.b = 3
+        # The first access converts the fields and replaces the class.
+        self.assertIs(type(pkt), PktView)
+        self.assertEqual(pkt.b, 3)
+        self.assertEqual(pkt.src, '10.0.0.1')
+        self.assertEqual(pkt.payload, b'cd')
+        self.assertIsInstance(pkt.payload, bytes)
+        self.assertEqual(pkt.payload.decode('ascii'), 'cd')
+        self.assertEqual(pkt.a, [1, 2])
+        self.assertEqual(pkt.get_description(), 'UDPv4')
+
+        pkt = lazy_pktview_from_list(data)
+        self.assertTrue('ipv4_src' in lazy_pktview_from_list(data))
+        self.assertEqual(len(lazy_pktview_from_list(data)), 5)
+        self.assertEqual(pkt, {
+            'eth_type': 0x0800,
+            'ip_proto': 17,
+            'x_pkt_pos': 2,
+            'ipv4_src': '10.0.0.1',
+            'a': [1, 2]
+        })
+        self.assertEqual(
+            str(lazy_pktview_from_list(data[:1])), '{"eth_type":2048}')
+        self.assertNotIn('payload', pkt)
+
+        with self.assertRaises(ValueError):
+            lazy_pktview_from_list(dict(A='a'))
+
+    def test_lazy_memview(self):
+        data = [dict(field='X_PKT_POS', value=2)]
+        pkt = lazy_pktview_from_list(data, b'abcd', memview=True)
+        self.assertIsInstance(pkt.payload, memoryview)
+        self.assertEqual(pkt.payload, b'cd')
+        self.assertEqual(to_json(pkt.payload), '"6364"')
+
+        data = bytes.fromhex('000000000002000000000001080600')
+        pkt = lazy_pktview_from_data(data, memview=True)
+        self.assertIsInstance(pkt.payload, memoryview)
+        self.assertEqual(pkt.payload, b'\x00')
+        self.assertIsInstance(lazy_pktview_from_data(data).payload, bytes)
+
+    def test_dict_fields(self):
+        values = {'eth_type': 0x0800, 'ip_dscp': 4}
+        pkt = PktView(values)
+        pkt.tcp_dst = 80
+        pkt['x_custom'] = 'x'
+        # The view shares the dict it was constructed with.
+        self.assertIs(pkt.__dict__, values)
+        self.assertEqual(values, {
+            'eth_type': 0x0800,
+            'tcp_dst': 80,
+            'ip_dscp': 4,
+            'x_custom': 'x'
+        })
+        pkt.__dict__['udp_src'] = 53
+        self.assertEqual(pkt.udp_src, 53)
+        del pkt.__dict__['udp_src']
+
+        self.assertEqual(len(pkt), 4)
+        self.assertEqual(list(pkt), list(values))
+        self.assertEqual(repr(pkt), repr(values))
+        self.assertEqual(pkt.get('tcp_dst'), 80)
+        self.assertEqual(pkt.get('ip_dscp'), 4)
+        self.assertIsNone(pkt.get('vlan_vid'))
+        self.assertEqual(pkt('vlan_vid', default=1), 1)
+        self.assertTrue('x_custom' in pkt)
+        self.assertFalse('udp_dst' in pkt)
+        del pkt['tcp_dst']
+        del pkt['x_custom']
+        self.assertEqual(dict(pkt.items()), {'eth_type': 0x0800, 'ip_dscp': 4})
+        with self.assertRaises(KeyError):
+            del pkt['tcp_dst']
+        self.assertEqual(pickle.loads(pickle.dumps(pkt)), pkt)
+        self.assertEqual(copy.deepcopy(pkt), pkt)
+        self.assertEqual(copy.copy(pkt), pkt)
+
+        pkt.__dict__ = {'udp_src': 53}
+        self.assertEqual(pkt, {'udp_src': 53})
+
+        # Names of properties may be passed as keywords.
+        pkt = make_pktview(src='10.0.0.1', ipv4_src='10.0.0.2')
+        self.assertEqual(pkt.src, '10.0.0.2')
+        self.assertEqual(pkt['src'], '10.0.0.2')
+        self.assertEqual(pkt.__dict__['src'], '10.0.0.1')
+
+    def test_lazy_from_data(self):
+        data = bytes.fromhex('000000000002000000000001080600')
+        pkt = lazy_pktview_from_data(data)
+        self.assertEqual(len(pkt), 5)
+        self.assertIs(type(pkt), PktView)
+        self.assertEqual(pkt.eth_src, '00:00:00:00:00:01')
+        self.assertEqual(pkt.get_description(), 'ARP:None')
+        self.assertEqual(pkt.x_pkt_pos, 14)
+        self.assertEqual(pkt.payload, b'\x00')
+
+    def test_lazy_assign(self):
+        data = [dict(field='ETH_TYPE', value=0x0800)]
+        pkt = lazy_pktview_from_list(data)
+        pkt.eth_type = 0x86dd
+        self.assertEqual(pkt, {'eth_type': 0x86dd})
+        pkt = lazy_pktview_from_list(data)
+        del pkt.eth_type
+        self.assertEqual(pkt, {})
+        pkt = lazy_pktview_from_list(data)
+        pkt.__dict__ = {'udp_src': 53}
+        self.assertIs(type(pkt), PktView)
+        self.assertEqual(pkt, {'udp_src': 53})
+
+    def test_lazy_copy(self):
+        fields = [
+            dict(field='ETH_TYPE', value=0x0800),
+            dict(field='X_PKT_POS', value=1)
+        ]
+        data = bytes.fromhex('000000000002000000000001080600')
+        for make in (lambda: lazy_pktview_from_list(fields, b'ab'),
+                     lambda: lazy_pktview_from_data(data, memview=True)):
+            expected = dict(make().items())
+            expected['payload'] = bytes(expected['payload'])
+            for func in (copy.copy, copy.deepcopy,
+                         lambda pkt: pickle.loads(pickle.dumps(pkt))):
+                # Copy before and after the fields are converted.
+                loaded = make()
+                self.assertEqual(loaded.eth_type, expected['eth_type'])
+                for pkt in (make(), loaded):
+                    result = func(pkt)
+                    self.assertIs(type(result), PktView)
+                    self.assertEqual(result, expected)
+                    self.assertIsInstance(result.payload, bytes)
+
     def test_to_list_multiple(self):
         # Test converting PktView to list where key has multiple values.
         data = {'a': [1, 2]}
@@ -75,6 +219,33 @@ class PktViewTestCase(unittest.TestCase):
             dict(field='A', value=2)
         ])
 
+    def test_to_list_cached(self):
+        match_cache_clear()
+        data = {'ipv4_dst': '10.0.0.0/8', 'a': 1}
+        fields = pktview_to_list(data)
+        self.assertEqual(fields, [
+            dict(
+                field='IPV4_DST',
+                value=IPv4Address('10.0.0.0'),
+                mask=IPv4Address('255.0.0.0')),
+            dict(field='A', value=1)
+        ])
+        # Returned lists are independent of the cached entry.
+        fields[1]['value'] = 2
+        fields.append(None)
+        self.assertEqual(
+            pktview_to_list(dict(data)), [fields[0], dict(field='A', value=1)])
+        # Equal values of different types are cached separately.
+        self.assertEqual(
+            to_json(pktview_to_list({'a': True})), '[{"field":"A","value":true}]')
+        self.assertEqual(
+            to_json(pktview_to_list({'a': 1})), '[{"field":"A","value":1}]')
+        # Unhashable values are converted without caching.
+        self.assertEqual(
+            pktview_to_list({'a': {'b': 1}}), [dict(field='A', value={'b': 1})])
+        with self.assertRaises(ValueError):
+            pktview_to_list({'a': (1, 2, 3)})
+
     def test_alias_attr(self):
         pkt = make_pktview()
         pkt.hop_limit = 5
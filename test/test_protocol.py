@@ -37,6 +37,10 @@ class ProtocolTestCase(unittest.TestCase):
         proto.pipe_data_received(None, b'x"\x00')
         self.assertEqual(controller.events, [1, 2, 33, 'yx'])
         self.assertEqual(proto.buf, b'')
+        proto.pipe_data_received(None, b'"a')
+        proto.pipe_data_received(None, b'b"\x004\x005')
+        self.assertEqual(controller.events, [1, 2, 33, 'yx', 'ab', 4])
+        self.assertEqual(proto.buf, b'5')
 
 
 # Pass these args when launching oftr.
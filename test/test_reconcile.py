@@ -0,0 +1,103 @@
+import unittest
+from zof.controller import Controller
+from zof.reconcile import FlowReconciler, diff_flows, flow_key
+
+_ACTIONS = [{
+    'instruction': 'APPLY_ACTIONS',
+    'actions': [{
+        'action': 'OUTPUT',
+        'port_no': 1
+    }]
+}]
+
+
+def _flow(eth_dst, priority=10, **kwds):
+    flow = {
+        'table_id': 0,
+        'priority': priority,
+        'match': [{
+            'field': 'ETH_DST',
+            'value': eth_dst
+        }],
+        'instructions': _ACTIONS
+    }
+    flow.update(kwds)
+    return flow
+
+
+class ReconcileTestCase(unittest.TestCase):
+    def test_flow_key(self):
+        flow1 = _flow('00:00:00:00:00:0A')
+        flow2 = {
+            'table_id': 0,
+            'priority': 10,
+            'match': {
+                'eth_dst': '00:00:00:00:00:0a'
+            }
+        }
+        self.assertEqual(flow_key(flow1), flow_key(flow2))
+        self.assertNotEqual(
+            flow_key(flow1), flow_key(_flow('00:00:00:00:00:0a', 11)))
+
+    def test_diff(self):
+        desired = [
+            _flow('00:00:00:00:00:01'),
+            _flow('00:00:00:00:00:02'),
+            _flow('00:00:00:00:00:03', instructions=[]),
+            _flow('00:00:00:00:00:04', idle_timeout=60)
+        ]
+        actual = [
+            # Installed flows have extra attributes.
+            _flow('00:00:00:00:00:01', packet_count=5, cookie=0),
+            _flow('00:00:00:00:00:03'),
+            _flow('00:00:00:00:00:04'),
+            _flow('00:00:00:00:00:05')
+        ]
+        diff = diff_flows(desired, actual)
+        self.assertEqual(diff.adds, [desired[1], desired[3]])
+        self.assertEqual(diff.modifies, [desired[2]])
+        self.assertEqual(diff.deletes, [actual[3]])
+
+        diff = diff_flows(desired, desired)
+        self.assertEqual(diff, ([], [], []))
+
+    def test_reconciler(self):
+        dpid = '00:00:00:00:00:00:00:01'
+        reconciler = FlowReconciler(tables={0}, controller=Controller())
+        reconciler.set_default_flows([_flow('00:00:00:00:00:01')])
+        reconciler.add_flow(dpid, _flow('00:00:00:00:00:02'))
+        self.assertEqual(len(reconciler.desired_flows(dpid)), 2)
+        self.assertEqual(len(reconciler.desired_flows(2)), 1)
+        # Datapath ID's are normalized.
+        self.assertEqual(len(reconciler.desired_flows(1)), 2)
+
+        # Flows in unmanaged tables are left alone.
+        actual = [_flow('00:00:00:00:00:03', table_id=1)]
+        diff = reconciler.diff(dpid, actual)
+        self.assertEqual(len(diff.adds), 2)
+        self.assertEqual(diff.deletes, [])
+
+        # Kept flows are not deleted.
+        installed = [_flow('00:00:00:00:00:04'), _flow('00:00:00:00:00:05')]
+        diff = reconciler.diff(
+            dpid, installed, keep=[_flow('00:00:00:00:00:04', cookie=7)])
+        self.assertEqual(diff.deletes, [installed[1]])
+
+        reconciler.remove_flow(1, _flow('00:00:00:00:00:02'))
+        self.assertEqual(len(reconciler.desired_flows(1)), 1)
+
+        # Flows with unmanaged priorities are left alone.
+        reconciler.priorities = {0}
+        diff = reconciler.diff(1, installed)
+        self.assertEqual(diff.deletes, [])
+        self.assertEqual(len(diff.adds), 1)
+
+        ofmsg = reconciler._flow_mod('DELETE_STRICT', actual[0])
+        self.assertEqual(ofmsg._obj['msg'], {
+            'command': 'DELETE_STRICT',
+            'table_id': 1,
+            'priority': 10,
+            'match': actual[0]['match'],
+            'out_port': 'ANY',
+            'out_group': 'ANY'
+        })
@@ -0,0 +1,176 @@
+import asyncio
+import gzip
+import os
+import tempfile
+import unittest
+import zof.demo.layer2 as layer2
+import zof.service.snapshot as snapshot_service
+from zof.controller import Controller
+from zof.datapath import Datapath
+from zof.flowtable import FlowTable
+from zof.reconcile import FlowReconciler, flow_key
+from zof.service.flowtable import APP as FLOWTABLE_APP
+from zof.snapshot import (Snapshot, register_state, unregister_state,
+                          set_restored_snapshot)
+
+_PORT = {
+    'port_no': 1,
+    'hw_addr': '00:00:00:00:00:01',
+    'name': 'eth1',
+    'state': ['LIVE'],
+    'config': [],
+    'curr_speed': 1000,
+    'max_speed': 1000
+}
+
+_FLOW = {
+    'table_id': 0,
+    'priority': 10,
+    'match': [{
+        'field': 'ETH_DST',
+        'value': '00:00:00:00:00:0a',
+        'mask': 'ff:ff:ff:00:00:00'
+    }],
+    'idle_timeout': 30,
+    'instructions': [{
+        'instruction': 'APPLY_ACTIONS',
+        'actions': [{
+            'action': 'OUTPUT',
+            'port_no': 1
+        }]
+    }]
+}
+
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.state = {'x': [1, 2]}
+        register_state(
+            'test', save=lambda: self.state, restore=self._restore)
+        self.restored = None
+        fd, self.path = tempfile.mkstemp(suffix='.json.gz')
+        os.close(fd)
+
+    def tearDown(self):
+        unregister_state('test')
+        os.unlink(self.path)
+
+    def _restore(self, state):
+        self.restored = state
+
+    def test_save_load(self):
+        datapath = Datapath('00:00:00:00:00:00:00:01', 1)
+        datapath.add_ports([_PORT])
+        table = FlowTable()
+        table.add_flows([_FLOW])
+
+        Snapshot.capture([datapath], {datapath.id: table}).save(self.path)
+        snapshot = Snapshot.load(self.path)
+        self.assertEqual(snapshot.apps['test'], {'x': [1, 2]})
+        self.assertIn('test', snapshot.restore_apps())
+        self.assertEqual(self.restored, {'x': [1, 2]})
+
+        self.assertEqual(snapshot.take_ports(1), [_PORT])
+        self.assertIsNone(snapshot.take_ports(1))
+        flows = snapshot.take_flows('00:00:00:00:00:00:00:01')
+        self.assertEqual([flow_key(flow) for flow in flows],
+                         [flow_key(_FLOW)])
+        self.assertEqual(flows[0]['idle_timeout'], 30)
+        self.assertIsNone(snapshot.take_flows(2))
+
+    def test_load_invalid(self):
+        with open(self.path, 'wb') as snapshot_file:
+            snapshot_file.write(b'not gzip')
+        with self.assertRaises(ValueError):
+            Snapshot.load(self.path)
+
+        with gzip.open(self.path, 'wb') as snapshot_file:
+            snapshot_file.write(b'{"version": 0}')
+        with self.assertRaises(ValueError):
+            Snapshot.load(self.path)
+
+        with self.assertRaises(FileNotFoundError):
+            Snapshot.load(self.path + '.missing')
+
+    def test_save_error(self):
+        # Tuple keys are not JSON serializable.
+        self.state = {(1, 2): 'x'}
+        snapshot_service.APP.path = self.path
+        with self.assertLogs('zof.service.snapshot', 'ERROR'):
+            snapshot_service._save()
+
+    def test_learned_flow_survives_restart(self):
+        datapath = Datapath('00:00:00:00:00:00:00:02', 2)
+        datapath.add_ports([_PORT])
+        FLOWTABLE_APP.tables[datapath.id] = FlowTable()
+        self.addCleanup(FLOWTABLE_APP.forget, datapath.id)
+
+        # Layer2 learns a MAC address and sends a FLOW_MOD without a barrier.
+        kwds = dict(
+            xid=100,
+            datapath_id=datapath.datapath_id,
+            vlan_vid=0,
+            eth_dst='00:00:00:00:00:0b',
+            out_port=1,
+            buffer_id='NO_BUFFER')
+        layer2.LEARN_MAC_FLOW._complete(kwds, {})
+        FLOWTABLE_APP._sent_flow_mod(layer2.LEARN_MAC_FLOW, kwds, 100,
+                                     datapath.datapath_id, None)
+
+        Snapshot.capture([datapath], FLOWTABLE_APP.tables).save(self.path)
+        keep = Snapshot.load(self.path).take_flows(datapath.datapath_id)
+        self.assertEqual(len(keep), 1)
+
+        # After a restart, the switch still has the table miss flow and the
+        # learned flow.
+        installed = [layer2.TABLE_MISS_FLOW, dict(keep[0])]
+        reconciler = FlowReconciler(tables={0})
+        reconciler.set_default_flows([layer2.TABLE_MISS_FLOW])
+        diff = reconciler.diff(datapath.datapath_id, installed, keep=keep)
+        self.assertEqual(diff, ([], [], []))
+
+
+class SnapshotChannelUpTestCase(unittest.TestCase):
+    def setUp(self):
+        controller = Controller.singleton()
+        self.saved_queue = controller._event_queue
+        controller._event_queue = asyncio.Queue()
+
+    def tearDown(self):
+        Controller.singleton()._event_queue = self.saved_queue
+        set_restored_snapshot(None)
+
+    def _events(self):
+        queue = Controller.singleton()._event_queue
+        events = []
+        while not queue.empty():
+            events.append(queue.get_nowait())
+        return events
+
+    def test_port_changed(self):
+        saved = Datapath('00:00:00:00:00:00:00:03', 3)
+        saved.add_ports([_PORT, dict(_PORT, port_no=2, name='eth2')])
+        set_restored_snapshot(Snapshot.capture([saved]))
+
+        # While the controller was down, port 1 went down and port 2 was
+        # replaced by port 3.
+        datapath = Datapath('00:00:00:00:00:00:00:03', 4)
+        datapath.add_ports([
+            dict(_PORT, state=['LINK_DOWN']),
+            dict(_PORT, port_no=3, name='eth3')
+        ])
+        event = {'datapath_id': datapath.datapath_id, 'datapath': datapath}
+        snapshot_service.channel_up(event)
+
+        events = {e['port_no']: e for e in self._events()}
+        self.assertEqual(sorted(events), [1, 2, 3])
+        self.assertEqual(events[1]['reason'], 'MODIFY')
+        self.assertEqual(events[1]['changes'], {'state': ['LINK_DOWN']})
+        self.assertEqual(events[1]['previous'], {'state': ['LIVE']})
+        self.assertEqual(events[2]['reason'], 'DELETE')
+        self.assertEqual(events[3]['reason'], 'ADD')
+        self.assertIs(events[3]['port'], datapath.ports[3])
+
+        # The saved ports are taken once.
+        snapshot_service.channel_up(event)
+        self.assertEqual(self._events(), [])
@@ -0,0 +1,102 @@
+import unittest
+from zof.statscache import StatsCache, make_args_key
+
+
+class _Timer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StatsCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.timer = _Timer()
+        self.cache = StatsCache(
+            ttl={'REQUEST.PORT_STATS': 5.0}, timer=self.timer)
+
+    def test_get_put(self):
+        replies = [{'type': 'REPLY.PORT_STATS', 'msg': []}]
+        self.assertIsNone(self.cache.get(1, 'REQUEST.PORT_STATS'))
+
+        self.cache.put(1, 'REQUEST.PORT_STATS', (), replies)
+        self.assertIs(self.cache.get(1, 'REQUEST.PORT_STATS'), replies)
+        self.assertIsNone(self.cache.get(2, 'REQUEST.PORT_STATS'))
+        self.assertEqual(len(self.cache), 1)
+        self.assertGreater(self.cache.size, 0)
+
+    def test_not_cacheable(self):
+        self.assertFalse(self.cache.is_cacheable('REQUEST.FOO'))
+        self.cache.put(1, 'REQUEST.FOO', (), [{}])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_ttl(self):
+        self.cache.put(1, 'REQUEST.PORT_STATS', (), [{}])
+        self.timer.now = 4.9
+        self.assertIsNotNone(self.cache.get(1, 'REQUEST.PORT_STATS'))
+        self.timer.now = 5.0
+        self.assertIsNone(self.cache.get(1, 'REQUEST.PORT_STATS'))
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.size, 0)
+
+    def test_args(self):
+        args1 = make_args_key({'port_no': 1, 'xid': 5, 'datapath_id': 'x'})
+        args2 = make_args_key({'port_no': 2})
+        self.assertEqual(args1, (('port_no', 1), ))
+
+        self.cache.put(1, 'REQUEST.PORT_STATS', args1, [{'a': 1}])
+        self.assertIsNone(self.cache.get(1, 'REQUEST.PORT_STATS', args2))
+        self.assertEqual(
+            self.cache.get(1, 'REQUEST.PORT_STATS', args1), [{'a': 1}])
+
+        # Unhashable argument values are still usable.
+        args3 = make_args_key({'match': [1, 2]})
+        self.assertEqual(args3, (('match', '[1, 2]'), ))
+
+    def test_invalidate(self):
+        self.cache.put(1, 'REQUEST.PORT_STATS', (), [{}])
+        self.cache.put(1, 'REQUEST.FLOW_DESC', (), [{}])
+        self.cache.put(2, 'REQUEST.FLOW_DESC', (), [{}])
+
+        self.cache.invalidate(1, 'FLOW_REMOVED')
+        self.assertIsNone(self.cache.get(1, 'REQUEST.FLOW_DESC'))
+        self.assertIsNotNone(self.cache.get(1, 'REQUEST.PORT_STATS'))
+        self.assertIsNotNone(self.cache.get(2, 'REQUEST.FLOW_DESC'))
+
+        self.cache.invalidate(1, 'PORT_STATUS')
+        self.assertIsNone(self.cache.get(1, 'REQUEST.PORT_STATS'))
+
+        self.cache.put(1, 'REQUEST.PORT_STATS', (), [{}])
+        self.cache.invalidate(2)
+        self.assertIsNone(self.cache.get(2, 'REQUEST.FLOW_DESC'))
+        self.assertIsNotNone(self.cache.get(1, 'REQUEST.PORT_STATS'))
+        self.assertEqual(len(self.cache), 1)
+
+    def test_generation(self):
+        gen = self.cache.generation(1)
+        self.cache.invalidate(1, 'FLOW_MOD')
+        self.cache.put(1, 'REQUEST.FLOW_DESC', (), [{}], gen)
+        self.assertEqual(len(self.cache), 0)
+
+        gen = self.cache.generation(1)
+        self.cache.put(1, 'REQUEST.FLOW_DESC', (), [{}], gen)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_max_size(self):
+        self.cache.put(1, 'REQUEST.PORT_STATS', (), [{'a': 1}])
+        self.cache.max_size = self.cache.size * 2
+        self.cache.put(2, 'REQUEST.PORT_STATS', (), [{'a': 1}])
+        self.assertEqual(len(self.cache), 2)
+
+        # Least recently used entry is evicted.
+        self.cache.get(1, 'REQUEST.PORT_STATS')
+        self.cache.put(3, 'REQUEST.PORT_STATS', (), [{'a': 1}])
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get(2, 'REQUEST.PORT_STATS'))
+        self.assertIsNotNone(self.cache.get(1, 'REQUEST.PORT_STATS'))
+        self.assertLessEqual(self.cache.size, self.cache.max_size)
+
+        # Entry bigger than max_size is not stored.
+        self.cache.put(4, 'REQUEST.PORT_STATS', (), [{'a': 1}] * 100)
+        self.assertIsNone(self.cache.get(4, 'REQUEST.PORT_STATS'))
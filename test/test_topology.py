@@ -0,0 +1,123 @@
+import unittest
+from zof.pktdecode import decode_packet
+from zof.topology import Topology, ProbeScheduler, make_lldp, parse_lldp
+
+
+class LLDPTestCase(unittest.TestCase):
+    def test_make_lldp(self):
+        data = make_lldp('00:00:00:00:00:00:00:0a', 3, '00:00:00:00:00:01')
+        fields = decode_packet(data)
+        self.assertEqual(fields['eth_dst'], '01:80:c2:00:00:0e')
+        self.assertEqual(fields['eth_src'], '00:00:00:00:00:01')
+        self.assertEqual(fields['eth_type'], 0x88cc)
+        self.assertEqual(fields['x_lldp_chassis_id'],
+                         'local dpid:000000000000000a')
+        self.assertEqual(fields['x_lldp_port_id'], 'local 3')
+        self.assertEqual(fields['x_lldp_ttl'], 120)
+        self.assertEqual(parse_lldp(data), (10, 3))
+
+    def test_parse_other_lldp(self):
+        lldp = (b'\x02\x07\x04' + bytes.fromhex('000000000001') +
+                b'\x04\x03\x07' + b'\x31\x33' + b'\x06\x02\x00\x78' +
+                b'\x00\x00')
+        data = bytes.fromhex('0180c200000e000000000001') + b'\x88\xcc' + lldp
+        self.assertIsNone(parse_lldp(data))
+        self.assertIsNone(parse_lldp(b''))
+
+
+class TopologyTestCase(unittest.TestCase):
+    def _line(self):
+        # 1 <-> 2 <-> 3
+        topo = Topology()
+        for src, src_port, dst, dst_port in [(1, 1, 2, 1), (2, 1, 1, 1),
+                                             (2, 2, 3, 1), (3, 1, 2, 2)]:
+            self.assertTrue(topo.add_link(src, src_port, dst, dst_port, 0))
+        return topo
+
+    def test_add_link(self):
+        topo = self._line()
+        self.assertEqual(len(topo), 4)
+        self.assertFalse(topo.add_link(1, 1, 2, 1, 5))
+        self.assertEqual(topo.neighbors('00:00:00:00:00:00:00:02'), {
+            1: (1, 1),
+            2: (3, 1)
+        })
+
+    def test_paths(self):
+        topo = self._line()
+        self.assertEqual(topo.next_hop(1, 3), 1)
+        self.assertEqual(topo.next_hop(3, 1), 1)
+        self.assertIsNone(topo.next_hop(1, 1))
+        self.assertEqual(topo.distance(1, 3), 2)
+        self.assertEqual(topo.path(1, 3), [(1, 1), (2, 2)])
+        self.assertEqual(topo.path(1, 1), [])
+        self.assertIsNone(topo.path(1, 4))
+
+    def test_invalidate(self):
+        topo = self._line()
+        self.assertEqual(topo.path(1, 3), [(1, 1), (2, 2)])
+
+        # Shortcut from 1 to 3 replaces the cached path.
+        topo.add_link(1, 2, 3, 2, 0)
+        self.assertEqual(topo.path(1, 3), [(1, 2)])
+        self.assertEqual(topo.next_hop(3, 1), 1)
+
+        # Removing a link that isn't on the path keeps the path.
+        topo.remove_link(2, 1)
+        self.assertEqual(topo.path(1, 3), [(1, 2)])
+        self.assertIsNone(topo.next_hop(3, 1))
+
+        removed = topo.remove_port(3, 2)
+        self.assertEqual(removed, [(1, 2, 3, 2)])
+        self.assertEqual(topo.path(1, 3), [(1, 1), (2, 2)])
+
+        removed = topo.remove_datapath(2)
+        self.assertEqual(sorted(removed), [(1, 1, 2, 1), (2, 2, 3, 1),
+                                           (3, 1, 2, 2)])
+        self.assertEqual(len(topo), 0)
+        self.assertIsNone(topo.next_hop(1, 3))
+
+    def test_expire(self):
+        topo = self._line()
+        topo.add_link(1, 1, 2, 1, 10)
+        removed = topo.expire(5)
+        self.assertEqual(len(removed), 3)
+        self.assertEqual(list(topo.links), [(1, 1)])
+
+
+class ProbeSchedulerTestCase(unittest.TestCase):
+    def test_round(self):
+        sched = ProbeScheduler(interval=4, max_rate=100)
+        sched.set_ports(1, [1, 2], urgent=False)
+        sched.set_ports(2, [1, 2], urgent=False)
+        self.assertEqual(sched.round_time, 4)
+
+        # One probe is due every second.
+        self.assertEqual(sched.poll(0), {1: [1]})
+        self.assertEqual(sched.poll(0.5), {})
+        self.assertEqual(sched.poll(2), {1: [2], 2: [1]})
+        self.assertEqual(sched.poll(3), {2: [2]})
+        self.assertEqual(sched.poll(3.5), {})
+        self.assertEqual(sched.poll(4), {1: [1]})
+
+    def test_urgent_and_removed(self):
+        sched = ProbeScheduler(interval=10, max_rate=100)
+        sched.set_ports(1, [1, 2])
+        sched.add_port(2, 5)
+        sched.remove_port(1, 2)
+        self.assertEqual(sched.poll(0), {1: [1]})
+        # After the urgent probes, the first round starts.
+        self.assertEqual(sched.poll(0.1), {2: [5], 1: [1]})
+        sched.remove_datapath(1)
+        self.assertEqual(len(sched), 1)
+
+    def test_max_rate(self):
+        sched = ProbeScheduler(interval=1, max_rate=10)
+        sched.set_ports(1, range(100), urgent=False)
+        self.assertEqual(sched.round_time, 10)
+        total = 0
+        for i in range(21):
+            total += sum(len(ports) for ports in sched.poll(i / 10).values())
+        # At most one token at start plus 10 per second.
+        self.assertLessEqual(total, 21)
+        self.assertGreaterEqual(total, 19)
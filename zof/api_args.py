@@ -132,6 +132,15 @@ def common_args(*, under_test=False, include_x_modules=False):
         '--xp-streams',
         action='store_true',
         help='use streams implementation (deprecated)')
+    xp_group.add_argument(
+        '--xp-pkt-decode',
+        choices=['oftr', 'python'],
+        default='oftr',
+        help='decode PACKET_IN headers using oftr or python')
+    xp_group.add_argument(
+        '--xp-pkt-memoryview',
+        action='store_true',
+        help='make PACKET_IN payloads memoryviews instead of bytes')
 
     return parser
 
@@ -1,12 +1,14 @@
+import re
 import string
 import textwrap
 import asyncio
 import logging
 import zof
 from .controller import Controller
-from .objectview import ObjectView, to_json, to_json_pretty
+from .objectview import ObjectView, from_json, to_json, to_json_pretty
 from .pktview import pktview_to_list
 from .asyncmap import asyncmap
+from .jsontemplate import compile_template, yaml_loader
 
 LOGGER = logging.getLogger(__package__)
 
@@ -18,6 +20,19 @@ params:
   conn_id: $conn_id
   %s"""
 
+_JSON_TEMPLATE = '{"method":"OFP.SEND","params":%s}'
+_JSON_PREFIX = [('xid', 'xid'), ('datapath_id', 'datapath_id'),
+                ('conn_id', 'conn_id')]
+
+_ENVELOPE_KEYS = ('xid', 'datapath_id', 'conn_id')
+_ENVELOPE_ARGS = frozenset(_ENVELOPE_KEYS)
+
+_MAC_FIELDS = {
+    'eth_dst', 'eth_src', 'arp_sha', 'arp_tha', 'ipv6_nd_sll', 'ipv6_nd_tll'
+}
+
+_MSG_TYPE = re.compile(r'(?m)^type:\s*([A-Za-z_.]+)\s*(?:#.*)?$')
+
 
 # pylint: disable=redefined-builtin
 def compile(msg):
@@ -35,9 +50,11 @@ class CompiledMessage:
 
     Attributes:
         _controller (Controller): Controller object.
+        msg_type (str): OpenFlow message type, if known.
     """
 
     _controller = None
+    msg_type = None
 
     def send(self, **kwds):
         """Send an OpenFlow message (fire and forget).
@@ -46,7 +63,7 @@ class CompiledMessage:
             kwds (dict): Template argument values.
         """
         kwds.setdefault('xid', self._controller.next_xid())
-        self._controller.write(self._complete(kwds, _task_locals()))
+        self._write(kwds)
 
     def request(self, **kwds):
         """Send an OpenFlow request and receive a response.
@@ -55,8 +72,53 @@ class CompiledMessage:
             kwds (dict): Template argument values.
         """
         xid = kwds.setdefault('xid', self._controller.next_xid())
-        return self._controller.write(
-            self._complete(kwds, _task_locals()), xid)
+        return self._write(kwds, xid)
+
+    def send_many(self, rows, **common):
+        """Send an OpenFlow message once for each set of argument values.
+
+        A block of xids is allocated at once and all messages are written to
+        the oftr connection in a single buffer.
+
+        `rows` is either an iterable of dicts, or a dict that maps each
+        argument name to a column of values. Columns may be NumPy arrays;
+        a column of integers for a MAC address field is formatted as MAC
+        address strings.
+
+        Args:
+            rows (Iterable[dict]|Dict[str, Seq]): Per-message argument values.
+            common (dict): Argument values shared by all messages.
+        Returns:
+            range: xids of the messages sent, in order.
+        """
+        if isinstance(rows, (dict, ObjectView)):
+            rows = _columns_to_rows(rows)
+        elif not isinstance(rows, (list, tuple)):
+            rows = list(rows)
+
+        xids = self._controller.next_xids(len(rows))
+        task_locals = _task_locals()
+        hooks = self._controller.send_hooks.get(self.msg_type)
+        events = []
+        targets = []
+        for xid, row in zip(xids, rows):
+            kwds = common.copy()
+            kwds.update(row)
+            kwds['xid'] = xid
+            if hooks:
+                targets.append((kwds,
+                                kwds.get('datapath_id',
+                                         task_locals.get('datapath_id')),
+                                kwds.get('conn_id',
+                                         task_locals.get('conn_id'))))
+            events.append(self._complete(kwds, task_locals))
+
+        self._controller.write_many(events)
+        if hooks:
+            for xid, (kwds, datapath_id, conn_id) in zip(xids, targets):
+                for hook in hooks:
+                    hook(self, kwds, xid, datapath_id, conn_id)
+        return xids
 
     def request_all(self, *, parallelism=1, **kwds):
         """Send multiple OpenFlow requests and receive responses.
@@ -71,6 +133,37 @@ class CompiledMessage:
         conn_ids = [dp.conn_id for dp in zof.get_datapaths()]
         return asyncmap(_req, conn_ids, parallelism=parallelism)
 
+    def _write(self, kwds, xid=None):
+        """Complete the message and write it to the controller.
+
+        Send hooks registered for this message type are called after the
+        message is written.
+        """
+        task_locals = _task_locals()
+        hooks = self._controller.send_hooks.get(self.msg_type)
+        if hooks:
+            datapath_id = kwds.get('datapath_id',
+                                   task_locals.get('datapath_id'))
+            conn_id = kwds.get('conn_id', task_locals.get('conn_id'))
+        event = self._complete(kwds, task_locals)
+        result = self._controller.write(event, xid)
+        if hooks:
+            for hook in hooks:
+                hook(self, kwds, kwds['xid'], datapath_id, conn_id)
+        return result
+
+    def message(self, kwds):
+        """Return the message that was sent with argument values `kwds`.
+
+        The message is returned as plain dicts and lists, without the `xid`,
+        `datapath_id` and `conn_id` envelope fields. It may be shared; treat
+        it as read-only. Send hooks use this to inspect what was sent.
+
+        Args:
+            kwds (dict): Argument values, as passed to a send hook.
+        """
+        raise NotImplementedError()
+
     def _complete(self, kwds, task_locals):
         raise NotImplementedError()
 
@@ -80,33 +173,55 @@ class CompiledString(CompiledMessage):
 
     Attributes:
         _controller (Controller): Controller object.
-        _template (StringTemplate): Prepared message template.
+        _source (str): Dedented message source.
+        _template (StringTemplate): Prepared YAML message template.
+        _json (JsonTemplate|None): Message template precompiled to JSON. If
+            None, the YAML template is used.
     """
 
     def __init__(self, controller, msg):
         assert isinstance(msg, str)
         self._controller = controller
+        self._source = None
         self._template = None
         self._template_args = None
+        self._json = None
+        self._message = None
         self._compile(msg)
 
     def _compile(self, msg):
         """Compile OFP.SEND message and store it into `self._template`.
 
+        If possible, the message is also translated into a JSON skeleton in
+        `self._json`, so sending it only needs to splice in argument values.
+
         Args:
             msg (str): YAML message.
         """
         # Remove top-level indent.
         msg = textwrap.dedent(msg).strip()
+        self._source = msg
+        match = _MSG_TYPE.search(msg)
+        if match:
+            self.msg_type = match.group(1).upper()
         # Add indent of 2 spaces.
         msg = msg.replace('\n', '\n  ')
         self._template = MyTemplate(_TEMPLATE % msg)
-        self._template_args = self._template.args()
+        self._json = compile_template(self._source, _JSON_TEMPLATE,
+                                      _JSON_PREFIX)
+        if self._json is not None:
+            # Only count arguments that made it into the skeleton; a `$var`
+            # in a YAML comment is not an argument.
+            self._template_args = self._json.args
+        else:
+            self._template_args = self._template.args()
 
     def _complete(self, kwds, task_locals):
         """Substitute keywords into OFP.SEND template.
 
-        Translate `bytes` values to hexadecimal and escape all string values.
+        Translate bytes-like values (bytes, bytearray, memoryview) to
+        hexadecimal and escape all string values.
+        Use the precompiled JSON template when it is available.
         """
 
         dpid = kwds.setdefault('datapath_id', task_locals.get('datapath_id'))
@@ -118,9 +233,17 @@ class CompiledString(CompiledMessage):
             if not dpid:
                 raise ValueError('Must specify either datapath_id or conn_id.')
 
+        if self._json is not None:
+            try:
+                self._check(kwds)
+                return self._json.substitute(kwds)
+            except KeyError as ex:
+                error = 'Missing ${%s} argument for %r' % (ex.args[0], self)
+            raise LookupError(error)
+
         for key in kwds:
             val = kwds[key]
-            if isinstance(val, bytes):
+            if isinstance(val, (bytes, bytearray, memoryview)):
                 kwds[key] = val.hex()
             elif isinstance(val, (str, dict, ObjectView)):
                 kwds[key] = to_json(val)
@@ -134,6 +257,28 @@ class CompiledString(CompiledMessage):
             error = 'Missing ${%s} argument for %r' % (ex.args[0], self)
         raise LookupError(error)
 
+    def message(self, kwds):
+        """Return the message that was sent with argument values `kwds`.
+
+        A message without arguments besides the envelope is only parsed
+        once.
+        """
+        if self._message is not None:
+            return self._message
+        if self._json is not None:
+            params = from_json(self._json.substitute(kwds))['params']
+        else:
+            # `kwds` were already escaped for the YAML template.
+            load_yaml = yaml_loader()
+            params = load_yaml(self._template.substitute(kwds))['params']
+        result = {
+            key: value
+            for key, value in params.items() if key not in _ENVELOPE_KEYS
+        }
+        if self._template_args <= _ENVELOPE_ARGS:
+            self._message = result
+        return result
+
     def _check(self, kwds):
         """Check kwds against known template vars."""
         for key in kwds:
@@ -148,34 +293,68 @@ class CompiledString(CompiledMessage):
 
 
 class CompiledObject(CompiledMessage):
-    """Concrete class representing a compiled OpenFlow object template."""
+    """Concrete class representing a compiled OpenFlow object template.
+
+    The template is copied when compiled and never modified afterwards. Its
+    constant part is serialized once; each send only splices in the
+    `xid`, `datapath_id` and `conn_id` envelope fields.
+
+    Attributes:
+        _controller (Controller): Controller object.
+        _obj (dict): Message template.
+        _fixed (dict): Envelope fields specified by the template itself.
+        _body (str): JSON members of the template, excluding envelope fields.
+    """
 
     def __init__(self, controller, obj):
         assert isinstance(obj, (dict, ObjectView))
         assert 'type' in obj
         self._controller = controller
-        self._obj = obj
+        self._obj = {key: obj[key] for key in obj}
+        self.msg_type = str(obj['type']).upper()
         if self._obj['type'] in ('PACKET_OUT', 'PACKET_IN'):
             self._convert_pkt()
+        self._fixed = {
+            key: self._obj[key]
+            for key in _ENVELOPE_KEYS if key in self._obj
+        }
+        self._body = to_json({
+            key: value
+            for key, value in self._obj.items() if key not in _ENVELOPE_KEYS
+        })[1:-1]
+        self._message = None
 
     def _complete(self, kwds, task_locals):
-        """Substitute keywords into object template, and compile to JSON.
+        """Splice envelope fields into the serialized object template.
         """
         kwds.setdefault('datapath_id', task_locals.get('datapath_id'))
         kwds.setdefault('conn_id', task_locals.get('conn_id'))
 
-        if 'datapath_id' not in self._obj:
-            self._obj['datapath_id'] = kwds['datapath_id']
-        if 'xid' not in self._obj:
-            self._obj['xid'] = kwds['xid']
-        if 'conn_id' not in self._obj and kwds['conn_id'] is not None:
-            self._obj['conn_id'] = kwds['conn_id']
+        fixed = self._fixed
+        xid = fixed['xid'] if 'xid' in fixed else kwds['xid']
+        dpid = fixed[
+            'datapath_id'] if 'datapath_id' in fixed else kwds['datapath_id']
+        conn_id = fixed['conn_id'] if 'conn_id' in fixed else kwds['conn_id']
 
-        if self._obj['datapath_id'] is None and self._obj.get(
-                'conn_id') is None:
-            raise ValueError('Must specify either datapath_id or conn_id.')
+        if conn_id is None:
+            if dpid is None:
+                raise ValueError('Must specify either datapath_id or conn_id.')
+            envelope = '"xid":%s,"datapath_id":%s' % (xid, to_json(dpid))
+        else:
+            envelope = '"xid":%s,"datapath_id":%s,"conn_id":%s' % (
+                xid, to_json(dpid), conn_id)
+
+        return '{"method":"OFP.SEND","params":{%s,%s}}' % (envelope,
+                                                             self._body)
 
-        return to_json({'method': 'OFP.SEND', 'params': self._obj})
+    def message(self, kwds):
+        """Return the message that was sent with argument values `kwds`.
+
+        The template is constant, so it is only parsed once.
+        """
+        if self._message is None:
+            self._message = from_json('{%s}' % self._body)
+        return self._message
 
     def _convert_pkt(self):
         """Convert high level API `pkt` to low level API."""
@@ -236,6 +415,33 @@ class MyTemplate(string.Template):
         return result
 
 
+def _columns_to_rows(columns):
+    """Convert a dict of columns into a list of row dicts."""
+    names = list(columns)
+    values = [_column_values(name, columns[name]) for name in names]
+    count = len(values[0]) if values else 0
+    if any(len(column) != count for column in values):
+        raise ValueError('send_many columns must have the same length')
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def _column_values(name, column):
+    """Return column as a list of plain Python values."""
+    # NumPy arrays convert themselves to Python scalars in bulk.
+    tolist = getattr(column, 'tolist', None)
+    column = tolist() if tolist is not None else list(column)
+    if name in _MAC_FIELDS:
+        column = [
+            _int_to_mac(value) if isinstance(value, int) else value
+            for value in column
+        ]
+    return column
+
+
+def _int_to_mac(value):
+    return ':'.join('%02x' % b for b in value.to_bytes(6, 'big'))
+
+
 def _task_locals():
     task = asyncio.Task.current_task()
     task_locals = getattr(task, 'zof_task_locals', {})
@@ -0,0 +1,155 @@
+"""Implements Batch class."""
+
+from .api_compile import CompiledString
+from .controller import Controller
+from . import exception as _exc
+
+
+class Batch:
+    """Concrete class that sends a batch of OpenFlow messages to one datapath
+    followed by a single trailing barrier.
+
+    Messages are sent back to back as they are added. Each message has its own
+    xid, so an OpenFlow error reply is attributed to the message that caused
+    it. Use a batch as an async context manager:
+
+        async with Batch(datapath_id=dpid) as batch:
+            batch.add(DELETE_FLOWS)
+            batch.add(TABLE_MISS_FLOW)
+
+    When the block exits, the batch sends a BARRIER_REQUEST and waits for the
+    reply. If any message elicited an error, a BatchException is raised.
+
+    Args:
+        datapath_id (str|None): Datapath to send messages to. If None, use the
+            datapath_id of the current task.
+        conn_id (int|None): Connection to send messages to.
+
+    Attributes:
+        xids (List[int]): xid of each message in the order added.
+        errors (List[Tuple[int, ControllerException]]): Errors received so far,
+            as (index, exception).
+    """
+
+    def __init__(self, *, datapath_id=None, conn_id=None, controller=None):
+        self._controller = controller or Controller.singleton()
+        self._target = {}
+        if datapath_id is not None:
+            self._target['datapath_id'] = datapath_id
+        if conn_id is not None:
+            self._target['conn_id'] = conn_id
+        self.xids = []
+        self.errors = []
+
+    def add(self, ofmsg, **kwds):
+        """Send a compiled message as part of the batch.
+
+        Args:
+            ofmsg (CompiledMessage): Compiled message.
+            kwds (dict): Template argument values.
+        Returns:
+            int: xid of the message.
+        """
+        for key, value in self._target.items():
+            kwds.setdefault(key, value)
+        xid = kwds.setdefault('xid', self._controller.next_xid())
+        ofmsg.send(**kwds)
+        self._track(xid)
+        return xid
+
+    def barrier(self):
+        """Send the trailing barrier request.
+
+        Returns:
+            Awaitable that returns the barrier reply, or raises BatchException
+            if any message in the batch failed.
+        """
+        barrier = _barrier(self._controller)
+        try:
+            reply = barrier.request(**self._target)
+        except Exception:
+            self._untrack()
+            raise
+        return self._wait(reply)
+
+    async def _wait(self, reply):
+        try:
+            result = await reply
+        finally:
+            self._untrack()
+        if self.errors:
+            raise _exc.BatchException(result['xid'], self.errors)
+        return result
+
+    def _track(self, xid):
+        index = len(self.xids)
+        self.xids.append(xid)
+        self._controller.track_xid(xid, _BatchReply(self, index))
+
+    def _untrack(self):
+        for xid in self.xids:
+            self._controller.untrack_xid(xid)
+
+    def __len__(self):
+        return len(self.xids)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.barrier()
+        else:
+            self._untrack()
+
+
+def send_batch(msgs, *, datapath_id=None, conn_id=None):
+    """Send a sequence of compiled messages followed by a barrier.
+
+    Args:
+        msgs (Seq[CompiledMessage|Tuple[CompiledMessage, dict]]): Messages
+            to send, optionally paired with template argument values.
+    Returns:
+        Awaitable that returns the barrier reply, or raises BatchException if
+        any message failed.
+    """
+    batch = Batch(datapath_id=datapath_id, conn_id=conn_id)
+    for msg in msgs:
+        if isinstance(msg, tuple):
+            batch.add(msg[0], **msg[1])
+        else:
+            batch.add(msg)
+    return batch.barrier()
+
+
+class _BatchReply:
+    """Future-like object that records replies to a message in a batch."""
+
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+
+    def cancelled(self):  # pylint: disable=no-self-use
+        return False
+
+    def set_result(self, result):
+        pass
+
+    def set_exception(self, exc):
+        if isinstance(exc, (_exc.ErrorException, _exc.DeliveryException)):
+            self._batch.errors.append((self._index, exc))
+
+    def set_done(self):
+        pass
+
+
+_BARRIER = {}
+
+
+def _barrier(controller):
+    """Return compiled barrier request for the given controller."""
+    barrier = _BARRIER.get(controller)
+    if barrier is None:
+        barrier = CompiledString(controller, 'type: BARRIER_REQUEST')
+        _BARRIER[controller] = barrier
+    return barrier
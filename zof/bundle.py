@@ -0,0 +1,225 @@
+"""Implements Bundle class."""
+
+import weakref
+from .api_compile import CompiledString, CompiledObject
+from .batch import Batch, _BatchReply, _barrier
+from .controller import Controller
+from .objectview import ObjectView
+from . import exception as _exc
+
+_BUNDLE_CONTROL = '''
+type: BUNDLE_CONTROL
+msg:
+  bundle_id: $bundle_id
+  type: $ctrl_type
+  flags: $bundle_flags
+'''
+
+_BUNDLE_ADD_MESSAGE = '''\
+type: BUNDLE_ADD_MESSAGE
+msg:
+  bundle_id: $bundle_id
+  flags: $bundle_flags
+  message:
+    xid: $xid
+    %s'''
+
+_DEFAULT_FLAGS = ('ATOMIC', 'ORDERED')
+
+
+class Bundle:
+    """Concrete class that applies OpenFlow messages atomically using an
+    OpenFlow bundle (OpenFlow 1.4 and later).
+
+    Use a bundle as an async context manager:
+
+        async with datapath.bundle() as bundle:
+            bundle.add(FLOW_MOD, eth_dst=mac, out_port=port)
+            ...
+
+    Entering the block opens the bundle. Each `add` streams a
+    BUNDLE_ADD_MESSAGE to the switch without waiting for a reply. When the
+    block exits, the bundle is committed. If the block raises an exception,
+    the bundle is discarded.
+
+    If any inner message fails, the bundle is discarded (or the commit fails)
+    and a BatchException is raised. Each error is reported with the index of
+    the inner message that caused it. If the commit fails without an error
+    from an inner message, the commit error is reported with index None.
+
+    Args:
+        datapath_id (str|None): Datapath to send messages to. If None, use the
+            datapath_id of the current task.
+        conn_id (int|None): Connection to send messages to.
+        flags (Seq[str]): Bundle flags.
+        fallback (bool): If true and the switch does not support bundles,
+            send messages as a Batch with a trailing barrier instead. A batch
+            is not atomic. The switch is assumed to lack bundles if opening
+            the bundle elicits an error reply, or if the request can't be
+            sent or delivered (e.g. oftr can't encode it for an OpenFlow 1.3
+            connection).
+
+    Attributes:
+        bundle_id (int): Bundle ID.
+        batch (Batch|None): Fallback batch, if the switch lacks bundles.
+        xids (List[int]): xid of each inner message in the order added.
+        errors (List[Tuple[int, ControllerException]]): Errors received so far,
+            as (index, exception).
+    """
+
+    def __init__(self,
+                 *,
+                 datapath_id=None,
+                 conn_id=None,
+                 flags=_DEFAULT_FLAGS,
+                 fallback=False,
+                 controller=None):
+        self._controller = controller or Controller.singleton()
+        self._target = {}
+        if datapath_id is not None:
+            self._target['datapath_id'] = datapath_id
+        if conn_id is not None:
+            self._target['conn_id'] = conn_id
+        self._flags = list(flags)
+        self._fallback = fallback
+        self._control = CompiledString(self._controller, _BUNDLE_CONTROL)
+        self.bundle_id = self._controller.next_xid()
+        self.batch = None
+        self.xids = []
+        self.errors = []
+
+    async def open(self):
+        """Open the bundle on the switch."""
+        try:
+            await self._request_control('OPEN_REQUEST')
+        except (_exc.ErrorException, _exc.RPCException,
+                _exc.DeliveryException):
+            if not self._fallback:
+                raise
+            self.batch = Batch(controller=self._controller, **self._target)
+
+    def add(self, ofmsg, **kwds):
+        """Add a compiled message to the bundle.
+
+        Args:
+            ofmsg (CompiledMessage): Compiled message.
+            kwds (dict): Template argument values.
+        Returns:
+            int: xid of the inner message.
+        """
+        if self.batch is not None:
+            return self.batch.add(ofmsg, **kwds)
+        for key, value in self._target.items():
+            kwds.setdefault(key, value)
+        xid = kwds.setdefault('xid', self._controller.next_xid())
+        bundle_msg = _bundle_message(ofmsg, self.bundle_id, self._flags, xid)
+        bundle_msg.send(
+            bundle_id=self.bundle_id, bundle_flags=self._flags, **kwds)
+        index = len(self.xids)
+        self.xids.append(xid)
+        self._controller.track_xid(xid, _BatchReply(self, index))
+        return xid
+
+    async def commit(self):
+        """Commit the bundle.
+
+        Raises:
+            BatchException: if any inner message failed.
+        """
+        if self.batch is not None:
+            return await self.batch.barrier()
+        try:
+            # A barrier guarantees that errors from BUNDLE_ADD_MESSAGE have
+            # arrived before we decide to commit.
+            await _barrier(self._controller).request(**self._target)
+            if self.errors:
+                await self._request_control('DISCARD_REQUEST')
+                raise _exc.BatchException(self.bundle_id, self.errors)
+            try:
+                return await self._request_control('COMMIT_REQUEST')
+            except _exc.ErrorException as ex:
+                errors = self.errors or [(None, ex)]
+                raise _exc.BatchException(ex.xid, errors) from ex
+        finally:
+            self._untrack()
+
+    async def discard(self):
+        """Discard the bundle."""
+        if self.batch is not None:
+            self.batch._untrack()  # pylint: disable=protected-access
+            return None
+        try:
+            return await self._request_control('DISCARD_REQUEST')
+        finally:
+            self._untrack()
+
+    def _request_control(self, ctrl_type):
+        return self._control.request(
+            bundle_id=self.bundle_id,
+            ctrl_type=ctrl_type,
+            bundle_flags=self._flags,
+            **self._target)
+
+    def _untrack(self):
+        for xid in self.xids:
+            self._controller.untrack_xid(xid)
+
+    def __len__(self):
+        if self.batch is not None:
+            return len(self.batch)
+        return len(self.xids)
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.discard()
+
+
+_BUNDLED = weakref.WeakKeyDictionary()
+
+
+def _bundle_message(ofmsg, bundle_id, flags, xid):
+    """Return compiled BUNDLE_ADD_MESSAGE that wraps `ofmsg`.
+
+    The inner message uses the same xid as the BUNDLE_ADD_MESSAGE. The result
+    must be sent with `bundle_id` and `bundle_flags` template arguments.
+    """
+    # pylint: disable=protected-access
+    if isinstance(ofmsg, CompiledString):
+        bundle_msg = _BUNDLED.get(ofmsg)
+        if bundle_msg is None:
+            source = ofmsg._source.replace('\n', '\n    ')
+            bundle_msg = CompiledString(ofmsg._controller,
+                                        _BUNDLE_ADD_MESSAGE % source)
+            _BUNDLED[ofmsg] = bundle_msg
+        return bundle_msg
+
+    if isinstance(ofmsg, CompiledObject):
+        inner = {
+            key: value
+            for key, value in _iter_items(ofmsg._obj)
+            if key not in ('datapath_id', 'conn_id')
+        }
+        inner['xid'] = xid
+        obj = {
+            'type': 'BUNDLE_ADD_MESSAGE',
+            'msg': {
+                'bundle_id': bundle_id,
+                'flags': flags,
+                'message': inner
+            }
+        }
+        return CompiledObject(ofmsg._controller, obj)
+
+    raise ValueError('Unable to bundle message: %r' % ofmsg)
+
+
+def _iter_items(obj):
+    if isinstance(obj, ObjectView):
+        return vars(obj).items()
+    return obj.items()
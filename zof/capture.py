@@ -0,0 +1,398 @@
+"""Implements a streaming analyzer for captured OpenFlow traffic.
+
+Read a pcap file, or a raw byte stream of OpenFlow messages, and yield
+events in the same shape that the controller dispatches:
+
+    for event in read_events('capture.pcap'):
+        print(event['params']['type'])
+
+The input is processed incrementally. Memory use is bounded by the largest
+OpenFlow message and the decode batch size, not by the size of the capture.
+
+Run as a tool to summarize a capture:
+
+    python -m zof.capture capture.pcap
+"""
+
+import argparse
+import collections
+import re
+import struct
+import sys
+from .codec import decode, decode_many
+from .exception import CodecError
+from .jsontemplate import yaml_loader
+
+DEFAULT_PORTS = (6653, 6633)
+DEFAULT_BATCH_SIZE = 512
+
+_OFP_HEADER = struct.Struct('!BBHL')
+_OFP_HEADER_LEN = 8
+_OFP_MAX_VERSION = 6
+
+_PCAP_HEADER = struct.Struct('IHHiIII')
+_PCAP_RECORD = struct.Struct('IIII')
+_PCAP_MAGIC = {
+    0xA1B2C3D4: ('<', 1000000),
+    0xD4C3B2A1: ('>', 1000000),
+    0xA1B23C4D: ('<', 1000000000),
+    0x4D3CB2A1: ('>', 1000000000)
+}
+
+_LINKTYPE_ETHERNET = 1
+_LINKTYPE_RAW = (12, 101)
+_LINKTYPE_LINUX_SLL = 113
+
+_ETH_TYPE_VLAN = (0x8100, 0x88A8)
+_ETH_TYPE_IPV4 = 0x0800
+_ETH_TYPE_IPV6 = 0x86DD
+_IP_PROTO_TCP = 6
+_TCP_SYN = 0x02
+_TCP_FIN_RST = 0x05
+
+_MSG_TYPE = re.compile(r'(?m)^type:\s*(\S+)')
+
+Message = collections.namedtuple('Message', 'time conn_id data')
+
+
+class Framer:
+    """Concrete class that splits a byte stream into OpenFlow messages using
+    the length field in each message header.
+
+    Attributes:
+        errors (int): Number of times the stream was out of sync.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        """Add data to the stream and return list of complete messages."""
+        buf = self._buf
+        buf += data
+        messages = []
+        offset = 0
+        while len(buf) - offset >= _OFP_HEADER_LEN:
+            version, _, length, _ = _OFP_HEADER.unpack_from(buf, offset)
+            if (not 0 < version <= _OFP_MAX_VERSION
+                    or length < _OFP_HEADER_LEN):
+                # Not an OpenFlow header; discard the buffered data.
+                self.errors += 1
+                offset = len(buf)
+                break
+            if len(buf) - offset < length:
+                break
+            messages.append(bytes(buf[offset:offset + length]))
+            offset += length
+        del buf[:offset]
+        return messages
+
+    def reset(self):
+        """Discard any partial message."""
+        self._buf.clear()
+
+
+def read_messages(source, *, ports=DEFAULT_PORTS, chunk_size=65536):
+    """Yield OpenFlow messages from a pcap file or raw byte stream.
+
+    Args:
+        source (str|BinaryIO): File name or binary file object.
+        ports (Seq[int]): TCP ports of OpenFlow traffic in a pcap file.
+        chunk_size (int): Read size for raw streams.
+    Returns:
+        Iterator[Message]: (time, conn_id, data) for each message. `time` is
+            None for raw streams.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as stream:
+            yield from read_messages(
+                stream, ports=ports, chunk_size=chunk_size)
+        return
+
+    head = source.read(_PCAP_HEADER.size)
+    if len(head) >= 4 and struct.unpack('<I', head[:4])[0] in _PCAP_MAGIC:
+        yield from _pcap_messages(source, head, ports)
+        return
+
+    framer = Framer()
+    data = head
+    while data:
+        for msg in framer.feed(data):
+            yield Message(None, 1, msg)
+        data = source.read(chunk_size)
+
+
+def read_events(source, *, batch_size=DEFAULT_BATCH_SIZE, threads=None,
+                on_error=None, **kwds):
+    """Yield OFP.MESSAGE events from a pcap file or raw byte stream.
+
+    Messages are decoded in batches with `zof.codec.decode_many`. Each event
+    has the same shape as the events dispatched by the controller. The
+    `type`, `xid` and `version` fields are taken from the binary header. The
+    `datapath_id` of a connection is learned from its FEATURES_REPLY.
+
+    If PyYAML is installed, `msg` is parsed into nested dicts and lists.
+    Numbers, booleans and nulls have the same types as in a live event;
+    other scalars, including MAC addresses and packet data, are strings.
+    Otherwise, `msg` is the decoded YAML text.
+
+    If a batch fails to decode, its messages are decoded one at a time. A
+    message that oftr can't decode is skipped and passed to `on_error`.
+
+    Args:
+        source (str|BinaryIO): File name or binary file object.
+        batch_size (int): Number of messages decoded at a time.
+        threads (int): Number of threads used to decode each batch.
+        on_error (Callable[[Message, CodecError], None]): Called for each
+            message that can't be decoded.
+        kwds (dict): Passed to `read_messages`.
+    """
+    for _, event in _read_events(source, batch_size, threads, on_error,
+                                 kwds):
+        yield event
+
+
+def _read_events(source, batch_size, threads, on_error, kwds):
+    """Yield (message, event) for each decoded message."""
+    loader = yaml_loader()
+    datapaths = {}
+    batch = []
+    for message in read_messages(source, **kwds):
+        batch.append(message)
+        if len(batch) >= batch_size:
+            yield from _decode_batch(batch, threads, loader, datapaths,
+                                     on_error)
+            batch = []
+    if batch:
+        yield from _decode_batch(batch, threads, loader, datapaths, on_error)
+
+
+def _decode_batch(batch, threads, loader, datapaths, on_error):
+    try:
+        texts = decode_many(
+            [message.data for message in batch], threads=threads)
+    except CodecError:
+        texts = [_decode_one(message, on_error) for message in batch]
+    for message, text in zip(batch, texts):
+        if text is None:
+            continue
+        version, _, _, xid = _OFP_HEADER.unpack_from(message.data)
+        match = _MSG_TYPE.search(text)
+        msg_type = match.group(1) if match else None
+        msg = _load_msg(text, loader)
+        if msg_type == 'FEATURES_REPLY' and isinstance(msg, dict):
+            datapaths[message.conn_id] = msg.get('datapath_id')
+        params = {
+            'type': msg_type,
+            'xid': xid,
+            'version': version,
+            'conn_id': message.conn_id,
+            'msg': msg
+        }
+        datapath_id = datapaths.get(message.conn_id)
+        if datapath_id:
+            params['datapath_id'] = datapath_id
+        if message.time is not None:
+            params['time'] = message.time
+        yield message, {'method': 'OFP.MESSAGE', 'params': params}
+
+
+def _decode_one(message, on_error):
+    """Decode one message, or return None if it can't be decoded."""
+    try:
+        return decode(message.data)
+    except CodecError as ex:
+        if on_error is not None:
+            on_error(message, ex)
+        return None
+
+
+def _load_msg(text, loader):
+    if loader is None:
+        return text
+    try:
+        doc = loader(text)
+    except Exception:  # pylint: disable=broad-except
+        return text
+    if isinstance(doc, dict):
+        return doc.get('msg')
+    return text
+
+
+def _pcap_messages(stream, head, ports):
+    """Yield messages from TCP streams in a pcap file."""
+    magic = struct.unpack('<I', head[:4])[0]
+    order, scale = _PCAP_MAGIC[magic]
+    header = struct.Struct(order + _PCAP_HEADER.format)
+    record = struct.Struct(order + _PCAP_RECORD.format)
+    linktype = header.unpack(head)[6]
+    ports = set(ports)
+    streams = {}
+    conn_ids = {}
+
+    while True:
+        rec = stream.read(record.size)
+        if len(rec) < record.size:
+            return
+        secs, frac, incl_len, _ = record.unpack(rec)
+        frame = stream.read(incl_len)
+        if len(frame) < incl_len:
+            return
+        segment = _tcp_segment(linktype, frame)
+        if segment is None:
+            continue
+        src, dst, seq, flags, payload = segment
+        if src[1] not in ports and dst[1] not in ports:
+            continue
+
+        conn_key = (src, dst) if src < dst else (dst, src)
+        conn_id = conn_ids.get(conn_key)
+        if conn_id is None:
+            conn_id = conn_ids[conn_key] = len(conn_ids) + 1
+        time = '%d.%09d' % (secs, frac * (1000000000 // scale))
+
+        tcp = streams.get((src, dst))
+        if tcp is None or flags & _TCP_SYN:
+            tcp = streams[(src, dst)] = _TcpStream(seq, flags)
+        for msg in tcp.feed(seq, payload):
+            yield Message(time, conn_id, msg)
+        if flags & _TCP_FIN_RST:
+            # Connection is closing; free its state.
+            del streams[(src, dst)]
+            if (dst, src) not in streams:
+                conn_ids.pop(conn_key, None)
+
+
+class _TcpStream:
+    """One direction of a TCP connection."""
+
+    def __init__(self, seq, flags):
+        self.next_seq = (seq + 1 if flags & _TCP_SYN else seq) & 0xFFFFFFFF
+        self.framer = Framer()
+
+    def feed(self, seq, payload):
+        if not payload:
+            return ()
+        delta = (seq - self.next_seq) & 0xFFFFFFFF
+        if delta >= 0x80000000:
+            # Retransmission; skip data we have already seen.
+            overlap = 0x100000000 - delta
+            if overlap >= len(payload):
+                return ()
+            payload = payload[overlap:]
+            seq = self.next_seq
+        elif delta:
+            # Data is missing from the capture.
+            self.framer.reset()
+            self.framer.errors += 1
+        self.next_seq = (seq + len(payload)) & 0xFFFFFFFF
+        return self.framer.feed(payload)
+
+
+def _tcp_segment(linktype, frame):
+    """Return (src, dst, seq, flags, payload) for a TCP frame, or None."""
+    if linktype == _LINKTYPE_ETHERNET:
+        if len(frame) < 14:
+            return None
+        eth_type = struct.unpack_from('!H', frame, 12)[0]
+        offset = 14
+        while eth_type in _ETH_TYPE_VLAN and len(frame) >= offset + 4:
+            eth_type = struct.unpack_from('!H', frame, offset + 2)[0]
+            offset += 4
+    elif linktype == _LINKTYPE_LINUX_SLL:
+        if len(frame) < 16:
+            return None
+        eth_type = struct.unpack_from('!H', frame, 14)[0]
+        offset = 16
+    elif linktype in _LINKTYPE_RAW:
+        if not frame:
+            return None
+        eth_type = _ETH_TYPE_IPV4 if frame[0] >> 4 == 4 else _ETH_TYPE_IPV6
+        offset = 0
+    else:
+        return None
+
+    if eth_type == _ETH_TYPE_IPV4:
+        if len(frame) < offset + 20:
+            return None
+        ihl = (frame[offset] & 0x0F) * 4
+        total_len = struct.unpack_from('!H', frame, offset + 2)[0]
+        if frame[offset + 9] != _IP_PROTO_TCP:
+            return None
+        src_ip = bytes(frame[offset + 12:offset + 16])
+        dst_ip = bytes(frame[offset + 16:offset + 20])
+        end = offset + total_len
+        offset += ihl
+    elif eth_type == _ETH_TYPE_IPV6:
+        if len(frame) < offset + 40 or frame[offset + 6] != _IP_PROTO_TCP:
+            return None
+        payload_len = struct.unpack_from('!H', frame, offset + 4)[0]
+        src_ip = bytes(frame[offset + 8:offset + 24])
+        dst_ip = bytes(frame[offset + 24:offset + 40])
+        offset += 40
+        end = offset + payload_len
+    else:
+        return None
+
+    if len(frame) < offset + 20:
+        return None
+    sport, dport, seq = struct.unpack_from('!HHL', frame, offset)
+    data_offset = (frame[offset + 12] >> 4) * 4
+    flags = frame[offset + 13]
+    payload = frame[offset + data_offset:min(end, len(frame))]
+    return (src_ip, sport), (dst_ip, dport), seq, flags, payload
+
+
+def _arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='zof.capture',
+        description='Summarize OpenFlow messages in a pcap file or stream')
+    parser.add_argument('source', help='pcap file or raw OpenFlow stream')
+    parser.add_argument(
+        '--port',
+        type=int,
+        action='append',
+        help='TCP port of OpenFlow traffic (default: 6653, 6633)')
+    parser.add_argument(
+        '--events', action='store_true', help='print each event as JSON')
+    parser.add_argument(
+        '--threads', type=int, help='number of threads used to decode')
+    return parser
+
+
+def main(argv=None):
+    """Summarize a capture: message count and bytes by message type."""
+    from .objectview import to_json
+
+    args = _arg_parser().parse_args(argv)
+    ports = args.port or DEFAULT_PORTS
+    counts = collections.Counter()
+    sizes = collections.Counter()
+    errors = []
+
+    def _on_error(message, ex):
+        errors.append(message)
+        print('zof.capture: conn_id %s at %s: %s' % (message.conn_id,
+                                                    message.time, ex),
+              file=sys.stderr)
+
+    for message, event in _read_events(args.source, DEFAULT_BATCH_SIZE,
+                                       args.threads, _on_error,
+                                       {'ports': ports}):
+        msg_type = event['params']['type']
+        counts[msg_type] += 1
+        sizes[msg_type] += len(message.data)
+        if args.events:
+            print(to_json(event))
+    for msg_type, count in counts.most_common():
+        print('%-24s %8d %12d' % (msg_type, count, sizes[msg_type]))
+    if errors:
+        print('%-24s %8d %12d' % ('(undecodable)', len(errors),
+                                  sum(len(msg.data) for msg in errors)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,7 @@
 import os
 import codecs
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from ctypes import cdll, c_void_p, c_size_t, c_uint32, create_string_buffer
 from zof.connection import Connection
 from zof.objectview import to_json, ObjectView
@@ -10,6 +12,12 @@ OFTR_DLL = None
 OFTR_ENCODE = 1
 OFTR_DECODE = 2
 
+# Smallest buffer allocated for batch calls.
+_MIN_BUFLEN = 4096
+
+# Per-thread reusable result buffers for batch calls.
+_LOCAL = threading.local()
+
 
 def _dll():
     global OFTR_DLL  # pylint: disable=global-statement
@@ -71,6 +79,107 @@ def decode(binary):
     return _oftr_call(OFTR_DECODE, bytes(binary), buflen=1024).decode('utf-8')
 
 
+def encode_many(texts, version=4, *, threads=None):
+    """Encode a sequence of messages as binary.
+
+    Result buffers are reused between calls and sized from the results seen
+    so far. If `threads` is greater than 1, messages are encoded on a thread
+    pool; the ctypes call releases the GIL while oftr runs.
+
+    Args:
+        texts (Seq[str|dict]): Messages in YAML or JSON.
+        version (int): OpenFlow version.
+        threads (int): Number of threads to use.
+    Returns:
+        List[bytes]: Binary messages, in order.
+    """
+    opcode = OFTR_ENCODE + (version << 24)
+
+    def _encode(text):
+        if isinstance(text, (dict, ObjectView)):
+            text = to_json(text)
+        return _pooled_call(opcode, text.encode('utf-8'))
+
+    return _map(_encode, texts, threads)
+
+
+def decode_many(binaries, *, threads=None):
+    """Decode a sequence of binary messages as source code.
+
+    See `encode_many`.
+
+    Args:
+        binaries (Seq[bytes]): Binary messages.
+        threads (int): Number of threads to use.
+    Returns:
+        List[str]: Decoded messages, in order.
+    """
+
+    def _decode(binary):
+        return _pooled_call(OFTR_DECODE, bytes(binary)).decode('utf-8')
+
+    return _map(_decode, binaries, threads)
+
+
+def _map(func, items, threads):
+    if not isinstance(items, (list, tuple)):
+        items = list(items)
+    if not threads or threads <= 1 or len(items) < 2:
+        return [func(item) for item in items]
+
+    # Split items into one chunk per thread to keep scheduling overhead low.
+    size = -(-len(items) // threads)
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+        results = executor.map(lambda chunk: [func(item) for item in chunk],
+                               chunks)
+        return [result for chunk in results for result in chunk]
+
+
+def _pooled_call(opcode, data):
+    """Call oftr using this thread's reusable result buffer.
+
+    The buffer is sized using the largest output/input ratio seen so far, so
+    a retry with a bigger buffer is rarely needed.
+    """
+    dll = _dll()
+    ratios = getattr(_LOCAL, 'ratios', None)
+    if ratios is None:
+        ratios = _LOCAL.ratios = {}
+    kind = opcode & 0xFF
+    buflen = max(int(len(data) * ratios.get(kind, 1.0)) + 64, _MIN_BUFLEN)
+    buf = _buffer(buflen)
+
+    result = dll.oftr_call(opcode, data, len(data), buf, len(buf))
+    if result < -len(buf):
+        # Result buffer is not big enough.
+        buf = _buffer(-result)
+        result = dll.oftr_call(opcode, data, len(data), buf, len(buf))
+
+    if result >= 0:
+        if data:
+            ratio = result / len(data)
+            if ratio > ratios.get(kind, 1.0):
+                ratios[kind] = ratio
+        return buf[:result]
+
+    if result >= -len(buf):
+        # Buffer contains error message.
+        raise CodecError(buf[:-result].decode('utf-8'))
+
+    raise CodecError('_oftr_call failed: %r bytes needed' % result)
+
+
+def _buffer(buflen):
+    """Return this thread's result buffer, at least `buflen` bytes long."""
+    buf = getattr(_LOCAL, 'buf', None)
+    if buf is None or len(buf) < buflen:
+        # Grow to the next power of 2 to limit reallocations.
+        buf = create_string_buffer(1 << (buflen - 1).bit_length())
+        _LOCAL.buf = buf
+    return buf
+
+
 #-------------------------------------------------------------------------------
 
 
@@ -7,7 +7,7 @@ import functools
 import inspect
 from collections import defaultdict
 from .event import load_event, dump_event
-from .pktview import pktview_from_list
+from .pktview import lazy_pktview_from_list, lazy_pktview_from_data
 from .connection import Connection
 from .run_server import run_server
 from . import exception as _exc
@@ -30,6 +30,8 @@ class Controller(object):
         args (argparse.Namespace): Arguments parsed by argparse module.
         phase (str): Lifecycle phase.
         conn (Connection): oftr connection.
+        pkt_decode (str): Decoder for PACKET_IN headers: 'oftr' or 'python'.
+        pkt_memview (bool): If true, PACKET_IN payloads are memoryviews.
     """
 
     _singleton = None
@@ -53,6 +55,10 @@ class Controller(object):
         self._tls_id = 0
         self._tasks = defaultdict(list)
         self._exit_status = 1
+        self.send_hooks = {}
+        self.recv_hooks = {}
+        self.pkt_decode = 'oftr'
+        self.pkt_memview = False
 
     def find_app(self, name):
         """Find application object by name."""
@@ -67,6 +73,8 @@ class Controller(object):
             LOGGER.warning('No apps are loaded.')
 
         self.args = args
+        self.pkt_decode = args.xp_pkt_decode
+        self.pkt_memview = args.xp_pkt_memoryview
 
         try:
             asyncio.ensure_future(self._run())
@@ -289,10 +297,40 @@ class Controller(object):
         # Register future to track the response.
         assert xid > 0
         fut = _ReplyFuture(xid)
-        expiration = _timestamp() + _XID_TIMEOUT
-        self._reqs[xid] = (fut, expiration, _XID_TIMEOUT)
+        self.track_xid(xid, fut)
         return fut
 
+    def track_xid(self, xid, fut, timeout=_XID_TIMEOUT):
+        """Register a future-like object to receive replies for `xid`.
+
+        The object must implement the methods used by `_handle_xid`:
+        `cancelled`, `set_result`, `set_exception` and `set_done`.
+        """
+        expiration = _timestamp() + timeout
+        self._reqs[xid] = (fut, expiration, timeout)
+
+    def untrack_xid(self, xid):
+        """Stop tracking replies for `xid`."""
+        self._reqs.pop(xid, None)
+
+    def add_send_hook(self, msg_type, callback):
+        """Register a callback for outgoing messages of a given type.
+
+        After a compiled message of type `msg_type` is written, the callback is
+        invoked as `callback(ofmsg, kwds, xid, datapath_id, conn_id)`, where
+        `ofmsg` is the CompiledMessage and `kwds` are its argument values.
+        Use `ofmsg.message(kwds)` to inspect the message that was sent.
+        """
+        self.send_hooks.setdefault(msg_type.upper(), []).append(callback)
+
+    def add_recv_hook(self, msg_type, callback):
+        """Register a callback for incoming messages of a given type.
+
+        The callback is invoked as `callback(message)` before the message is
+        delivered, even if it is a reply to a pending request.
+        """
+        self.recv_hooks.setdefault(msg_type.upper(), []).append(callback)
+
     def rpc_call(self, method, *, ignore_result=False, **params):
         """Send a RPC request and return a future for the reply.
 
@@ -308,6 +346,44 @@ class Controller(object):
             LOGGER.debug('rpc_call %r', _sanitize_rpc(event))
         return self.write(event, xid)
 
+    def rpc_batch(self, calls):
+        """Send a batch of RPC requests in a single write.
+
+        Each request is framed separately, but all frames are written to the
+        oftr connection at once.
+
+        Args:
+            calls (Seq[Tuple[str, dict]]): (method, params) for each request.
+        Returns:
+            _ReplyBatch: Sequence of reply futures. Await the batch to receive
+                a list of all results.
+        """
+        if self.conn.is_closed():
+            raise _exc.ClosedException(None, _XID_TIMEOUT)
+        if not calls:
+            return _ReplyBatch([])
+        events = []
+        futures = []
+        for method, params in calls:
+            xid = self.next_xid()
+            events.append(dict(id=xid, method=method, params=params))
+            fut = _ReplyFuture(xid)
+            self.track_xid(xid, fut)
+            futures.append(fut)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug('rpc_batch %r', [_sanitize_rpc(e) for e in events])
+        self.write_many(events)
+        return _ReplyBatch(futures)
+
+    def write_many(self, events):
+        """Write a sequence of events to the output stream in one write.
+
+        Each event is framed separately. No replies are tracked.
+        """
+        if events:
+            self.conn.write(b'\x00'.join(
+                dump_event(event) for event in events))
+
     def _handle_xid(self, event, xid, except_class=None):
         """Lookup future associated with given xid and give it the event.
 
@@ -380,7 +456,15 @@ class Controller(object):
             self._handle_channel(message)
             return
         if msg_type == 'PACKET_IN' or msg_type == 'PACKET_OUT':
-            _convert_pkt(message['msg'])
+            _convert_pkt(message['msg'], self.pkt_decode, self.pkt_memview)
+        hooks = self.recv_hooks.get(msg_type)
+        if hooks:
+            for hook in hooks:
+                try:
+                    hook(message)
+                except Exception:  # pylint: disable=broad-except
+                    LOGGER.exception('Exception in recv hook for %s',
+                                     msg_type)
         except_class = _exc.ErrorException if msg_type == 'ERROR' else None
         # If the message does not have a datapath_id, don't attempt to handle
         # replies based on xid.
@@ -490,6 +574,18 @@ class Controller(object):
         self._xid += 1
         return self._xid
 
+    def next_xids(self, count):
+        """Return a range of `count` consecutive xids to use.
+
+        The block of xids never wraps around; if there is not enough room left,
+        the block starts again at the lowest xid.
+        """
+        if self._xid + count > _MAX_XID:
+            self._xid = _MIN_XID - 1
+        start = self._xid + 1
+        self._xid += count
+        return range(start, start + count)
+
     def ensure_future(self, coroutine, *, app=None, datapath_id, conn_id):
         """Run an async coroutine, within the scope of a specific scope_key.
 
@@ -648,6 +744,41 @@ class _ReplyFuture:
         return await self
 
 
+class _ReplyBatch:
+    """
+    Represents the sequence of _ReplyFuture objects returned from rpc_batch.
+
+    Await the batch to receive a list of results in request order:
+
+      results = await controller.rpc_batch(calls)
+
+    Or await each reply individually:
+
+      for reply in controller.rpc_batch(calls):
+          result = await reply
+    """
+
+    def __init__(self, futures):
+        self._futures = futures
+
+    def __len__(self):
+        return len(self._futures)
+
+    def __getitem__(self, index):
+        return self._futures[index]
+
+    def __iter__(self):
+        return iter(self._futures)
+
+    def gather(self, *, return_exceptions=False):
+        """Return future for the list of all results."""
+        return asyncio.gather(
+            *self._futures, return_exceptions=return_exceptions)
+
+    def __await__(self):
+        return self.gather().__await__()
+
+
 async def _immediate_result(result):
     if isinstance(result, Exception):
         raise result
@@ -691,22 +822,30 @@ def _negative_signal_number(signame):
         return -99
 
 
-def _convert_pkt(msg):
+def _convert_pkt(msg, pkt_decode='oftr', memview=False):
     """Convert (data, _pkt) to (payload, pkt).
 
-    We also convert msg['data'] from hex string to bytes.
+    We also convert msg['data'] from hex string to bytes. The pkt payload is
+    a bytes slice of msg['data'], or a memoryview into it if `memview` is
+    true.
 
     This method is needed because there's a mismatch between the oftr schema
-    and the desired zof schema.
+    and the desired zof schema. The pkt fields and payload are converted
+    lazily, on first access, since many handlers never look at them.
+
+    If `pkt_decode` is 'python', the `_pkt` field list from oftr is ignored
+    and the headers are decoded from the packet data in Python instead.
     """
     try:
         # If there's no `data` key, the rest of this is skipped.
         data = bytes.fromhex(msg['data'])
         msg['data'] = data
+        if pkt_decode == 'python':
+            msg.pop('_pkt', None)
+            msg['pkt'] = lazy_pktview_from_data(data, memview=memview)
+            return
         # If there's no `_pkt` key, the rest is skipped.
-        pkt = pktview_from_list(msg.pop('_pkt'), multiple_value=True)
-        msg['pkt'] = pkt
-        # If there's no 'x_pkt_pos' key in pkt, the rest is skipped.
-        pkt.payload = data[pkt['x_pkt_pos']:]
+        msg['pkt'] = lazy_pktview_from_list(
+            msg.pop('_pkt'), data, memview=memview)
     except KeyError:
         pass
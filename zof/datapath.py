@@ -1,14 +1,47 @@
+import logging
+import sys
 from collections import OrderedDict
 from .controller import Controller
+from .batch import Batch
+from .bundle import Bundle
 
 import zof
 
+LOGGER = logging.getLogger(__package__)
+
+# Port states and configuration flags, using OpenFlow 1.3+ bit values.
+PORT_STATE_FLAGS = {'LINK_DOWN': 1 << 0, 'BLOCKED': 1 << 1, 'LIVE': 1 << 2}
+PORT_CONFIG_FLAGS = {
+    'PORT_DOWN': 1 << 0,
+    'NO_STP': 1 << 1,
+    'NO_RECV': 1 << 2,
+    'NO_RECV_STP': 1 << 3,
+    'NO_FLOOD': 1 << 4,
+    'NO_FWD': 1 << 5,
+    'NO_PACKET_IN': 1 << 6
+}
+
+# Unknown flag names that have been logged.
+_UNKNOWN_FLAGS = set()
+
+# Plain dicts preserve insertion order in CPython 3.6+ and are smaller than
+# an OrderedDict.
+_PortDict = dict if sys.version_info >= (3, 6) else OrderedDict
+
 
 class DatapathList:
-    """Represents a collection of datapaths."""
+    """Represents a collection of datapaths.
+
+    The list maintains indexes of its ready datapaths and of datapaths by
+    conn_id, so per-message lookups and fleet iteration do not scan every
+    datapath.
+    """
 
     def __init__(self):
         self._datapaths = OrderedDict()
+        self._ready = OrderedDict()
+        self._ready_list = ()
+        self._conn_ids = {}
 
     def add_datapath(self, *, datapath_id, conn_id):
         """Add datapath to list.
@@ -22,7 +55,9 @@ class DatapathList:
         datapath = self._datapaths.get(dpid_key)
         if datapath is None:
             datapath = Datapath(datapath_id, conn_id)
+            datapath._owner = self  # pylint: disable=protected-access
             self._datapaths[dpid_key] = datapath
+            self._conn_ids[conn_id] = datapath
         elif datapath.conn_id != conn_id:
             raise ValueError('Datapath already exists: %r' % datapath)
         return datapath
@@ -37,8 +72,39 @@ class DatapathList:
         """
         dpid_key = normalize_datapath_id(datapath_id)
         datapath = self._datapaths.pop(dpid_key, None)
+        if datapath is not None:
+            datapath._owner = None  # pylint: disable=protected-access
+            self._set_ready(datapath, False)
+            if self._conn_ids.get(datapath.conn_id) is datapath:
+                del self._conn_ids[datapath.conn_id]
         return datapath
 
+    def get(self, datapath_id, default=None):
+        """Return datapath with given datapath_id, or `default`."""
+        return self._datapaths.get(normalize_datapath_id(datapath_id), default)
+
+    def find_conn_id(self, conn_id):
+        """Return datapath with given conn_id, or None."""
+        return self._conn_ids.get(conn_id)
+
+    def ready_datapaths(self):
+        """Return tuple of datapaths that are ready.
+
+        The tuple is only rebuilt after a datapath's ready state changes.
+        """
+        if self._ready_list is None:
+            self._ready_list = tuple(self._ready.values())
+        return self._ready_list
+
+    def _set_ready(self, datapath, ready):
+        """Update index of ready datapaths."""
+        if ready:
+            if datapath.id not in self._ready:
+                self._ready[datapath.id] = datapath
+                self._ready_list = None
+        elif self._ready.pop(datapath.id, None) is not None:
+            self._ready_list = None
+
     def __len__(self):
         return len(self._datapaths)
 
@@ -51,18 +117,52 @@ class DatapathList:
 
 
 class Datapath:
-    """Represents a datapath."""
+    """Represents a datapath.
+
+    Datapaths use __slots__ to keep memory use low in large deployments. The
+    `user_data` dict is only allocated when it is first accessed.
+    """
+
+    __slots__ = ('datapath_id', 'id', 'conn_id', 'ports', 'up', '_ready',
+                 'closed', 'features', '_user_data', '_owner', '_port_names',
+                 '_port_hw_addrs')
 
     def __init__(self, datapath_id, conn_id):
         self.datapath_id = datapath_id
         self.id = normalize_datapath_id(datapath_id)
         self.conn_id = conn_id
-        self.ports = OrderedDict()
+        self.ports = _PortDict()
         self.up = True
-        self.ready = False
+        self._ready = False
         self.closed = False
         self.features = None
-        self.user_data = {}
+        self._user_data = None
+        self._owner = None
+        self._port_names = None
+        self._port_hw_addrs = None
+
+    @property
+    def ready(self):
+        """True when the datapath's ports are known."""
+        return self._ready
+
+    @ready.setter
+    def ready(self, value):
+        self._ready = value
+        # pylint: disable=protected-access
+        if self._owner is not None:
+            self._owner._set_ready(self, value)
+
+    @property
+    def user_data(self):
+        """Dict for apps to store their own per-datapath data."""
+        if self._user_data is None:
+            self._user_data = {}
+        return self._user_data
+
+    @user_data.setter
+    def user_data(self, value):
+        self._user_data = value
 
     def add_port(self, *, port_no):
         """Add port to datapath.
@@ -89,25 +189,58 @@ class Datapath:
         """
         port_no = normalize_port_no(port_no)
         port = self.ports.pop(port_no, None)
+        if port is not None:
+            # pylint: disable=protected-access
+            _update_index(self._port_names, port._name, None, port)
+            _update_index(self._port_hw_addrs, _hw_key(port._hw_addr), None,
+                          port)
         return port
 
     def add_ports(self, port_descs):
         """Add ports from OpenFlow Port descs.
 
         This is an idempotent operation; it can be used to update existing
-        ports from a port_status message.
+        ports from a port_status message. Only attributes whose values differ
+        are updated.
 
         Arguments:
             port_descs (List[ObjectView]): list of OpenFlow port desc's.
+
+        Returns:
+            List[Tuple[Port, dict]]: ports that were added or changed, each
+                with a dict of the changed attributes' previous values.
         """
+        result = []
         for port_desc in port_descs:
             port = self.add_port(port_no=port_desc['port_no'])
-            port.hw_addr = port_desc['hw_addr']
-            port.name = port_desc['name']
-            port.state = port_desc['state']
-            port.config = port_desc['config']
-            port.curr_speed = port_desc['curr_speed']
-            port.max_speed = port_desc['max_speed']
+            previous = port.update(port_desc)
+            if previous:
+                result.append((port, previous))
+        return result
+
+    def find_port_by_name(self, name):
+        """Return port with given interface name, or None.
+
+        The name index is built on first use and then kept up to date.
+        """
+        if self._port_names is None:
+            self._port_names = {
+                port.name: port
+                for port in self.ports.values() if port.name is not None
+            }
+        return self._port_names.get(name)
+
+    def find_port_by_hw_addr(self, hw_addr):
+        """Return port with given hardware address, or None.
+
+        The hw_addr index is built on first use and then kept up to date.
+        """
+        if self._port_hw_addrs is None:
+            self._port_hw_addrs = {
+                _hw_key(port.hw_addr): port
+                for port in self.ports.values() if port.hw_addr is not None
+            }
+        return self._port_hw_addrs.get(_hw_key(hw_addr))
 
     def close(self):
         """Close connection to datapath; i.e. hang up.
@@ -124,6 +257,25 @@ class Datapath:
         """Send an OpenFlow message to the datapath."""
         zof.compile(ofmsg).send(datapath_id=hex(self.id))
 
+    def send_many(self, ofmsg, rows, **common):
+        """Send a compiled message to the datapath once for each set of
+        argument values.
+
+        See `CompiledMessage.send_many`.
+        """
+        return ofmsg.send_many(rows, datapath_id=hex(self.id), **common)
+
+    def batch(self):
+        """Return a Batch for sending messages to the datapath."""
+        return Batch(datapath_id=hex(self.id))
+
+    def bundle(self, **kwds):
+        """Return a Bundle for applying messages atomically to the datapath.
+
+        Keyword arguments are passed to the Bundle constructor.
+        """
+        return Bundle(datapath_id=hex(self.id), **kwds)
+
     def __getstate__(self):
         return str(self)
 
@@ -150,18 +302,103 @@ class Datapath:
 
 
 class Port:
-    """Represents a datapath port."""
+    """Represents a datapath port.
+
+    Ports use __slots__. The `state` and `config` lists are stored as bit
+    flags in `state_flags` and `config_flags`; names we don't recognize (e.g.
+    OF1.0's STP_* states) are kept in `_state_extra` and `_config_extra`.
+    Setting `name` or `hw_addr` updates the datapath's port indexes.
+    """
+
+    __slots__ = ('datapath', 'port_no', '_hw_addr', '_name', 'state_flags',
+                 'config_flags', '_state_extra', '_config_extra',
+                 'curr_speed', 'max_speed')
 
     def __init__(self, port_no, datapath):
         self.datapath = datapath
         self.port_no = port_no
-        self.hw_addr = None
-        self.name = None
-        self.state = []
-        self.config = []
+        self._hw_addr = None
+        self._name = None
+        self.state_flags = 0
+        self.config_flags = 0
+        self._state_extra = ()
+        self._config_extra = ()
         self.curr_speed = 0
         self.max_speed = 0
 
+    @property
+    def hw_addr(self):
+        "Return port's hardware address."
+        return self._hw_addr
+
+    @hw_addr.setter
+    def hw_addr(self, value):
+        if self._is_indexed():
+            # pylint: disable=protected-access
+            _update_index(self.datapath._port_hw_addrs, _hw_key(self._hw_addr),
+                          _hw_key(value), self)
+        self._hw_addr = value
+
+    @property
+    def name(self):
+        "Return port's interface name."
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if self._is_indexed():
+            # pylint: disable=protected-access
+            _update_index(self.datapath._port_names, self._name, value, self)
+        self._name = value
+
+    def update(self, port_desc):
+        """Update attributes from an OpenFlow port desc.
+
+        Returns:
+            dict: previous values of the attributes that changed.
+        """
+        previous = {}
+        value = port_desc['hw_addr']
+        if value != self._hw_addr:
+            previous['hw_addr'] = self._hw_addr
+            self.hw_addr = value
+        value = port_desc['name']
+        if value != self._name:
+            previous['name'] = self._name
+            self.name = value
+        value = port_desc['curr_speed']
+        if value != self.curr_speed:
+            previous['curr_speed'] = self.curr_speed
+            self.curr_speed = value
+        value = port_desc['max_speed']
+        if value != self.max_speed:
+            previous['max_speed'] = self.max_speed
+            self.max_speed = value
+        state = _list_to_flags(port_desc['state'], PORT_STATE_FLAGS)
+        if state != (self.state_flags, self._state_extra):
+            previous['state'] = self.state
+            self.state_flags, self._state_extra = state
+        config = _list_to_flags(port_desc['config'], PORT_CONFIG_FLAGS)
+        if config != (self.config_flags, self._config_extra):
+            previous['config'] = self.config
+            self.config_flags, self._config_extra = config
+        return previous
+
+    def desc(self):
+        """Return port attributes as an OpenFlow port desc dict."""
+        return {
+            'port_no': self.port_no,
+            'hw_addr': self._hw_addr,
+            'name': self._name,
+            'state': self.state,
+            'config': self.config,
+            'curr_speed': self.curr_speed,
+            'max_speed': self.max_speed
+        }
+
+    def _is_indexed(self):
+        return self.datapath.ports.get(self.port_no) is self
+
     def __getstate__(self):
         return str(self)
 
@@ -169,15 +406,37 @@ class Port:
     def datapath_id(self):
         return self.datapath.datapath_id
 
+    @property
+    def state(self):
+        "Return list of port state names."
+        return _flags_to_list(self.state_flags, PORT_STATE_FLAGS,
+                              self._state_extra)
+
+    @state.setter
+    def state(self, value):
+        self.state_flags, self._state_extra = _list_to_flags(
+            value, PORT_STATE_FLAGS)
+
+    @property
+    def config(self):
+        "Return list of port config names."
+        return _flags_to_list(self.config_flags, PORT_CONFIG_FLAGS,
+                              self._config_extra)
+
+    @config.setter
+    def config(self, value):
+        self.config_flags, self._config_extra = _list_to_flags(
+            value, PORT_CONFIG_FLAGS)
+
     @property
     def up(self):
         "Return true if port is up."
-        return 'LINK_DOWN' not in self.state
+        return not self.state_flags & PORT_STATE_FLAGS['LINK_DOWN']
 
     @property
     def admin_down(self):
         "Return true if port is administratively configured down."
-        return 'PORT_DOWN' in self.config
+        return bool(self.config_flags & PORT_CONFIG_FLAGS['PORT_DOWN'])
 
     def __repr__(self):
         # Include single quotes; repr(self) should be valid YAML scalar.
@@ -187,15 +446,90 @@ class Port:
         return "<zof.Port %s>" % self.port_no
 
 
+def _hw_key(hw_addr):
+    """Return key for hw_addr index."""
+    return hw_addr.lower() if isinstance(hw_addr, str) else hw_addr
+
+
+def _update_index(index, old_key, new_key, port):
+    """Move port to a new key in a lazily built index."""
+    if index is None:
+        return
+    if old_key is not None and index.get(old_key) is port:
+        del index[old_key]
+    if new_key is not None:
+        index[new_key] = port
+
+
+def _list_to_flags(values, flag_names):
+    """Convert list of flag names to (int, extra names).
+
+    Unrecognized bits may be given as int or hexadecimal string. Unknown
+    flag names (e.g. OF1.0's STP_* port states) are returned in a tuple, so
+    they survive a round trip. Each unknown name is logged once.
+    """
+    if isinstance(values, int):
+        return values, ()
+    flags = 0
+    extra = ()
+    for value in values:
+        if isinstance(value, int):
+            flags |= value
+        elif value in flag_names:
+            flags |= flag_names[value]
+        else:
+            try:
+                flags |= int(value, 0)
+            except ValueError:
+                if value not in extra:
+                    extra += (value,)
+                if value not in _UNKNOWN_FLAGS:
+                    _UNKNOWN_FLAGS.add(value)
+                    LOGGER.info('Unknown port flag: %r', value)
+    return flags, extra
+
+
+def _flags_to_list(flags, flag_names, extra=()):
+    """Convert int flags and extra names to list of flag names.
+
+    Unrecognized bits are returned as a hexadecimal string.
+    """
+    result = []
+    for name, bit in flag_names.items():
+        if flags & bit:
+            result.append(name)
+            flags &= ~bit
+    if flags:
+        result.append('0x%08x' % flags)
+    result.extend(extra)
+    return result
+
+
+
 def normalize_datapath_id(datapath_id):
-    """Normalize datapath_id value."""
+    """Normalize datapath_id value.
+
+    Results for string values are cached.
+    """
     if isinstance(datapath_id, int):
         return datapath_id
     if isinstance(datapath_id, str) and datapath_id:
-        return int(datapath_id.replace(':', ''), 16)
+        result = _DPID_CACHE.get(datapath_id)
+        if result is not None:
+            return result
+        result = int(datapath_id.replace(':', ''), 16)
+        if len(_DPID_CACHE) >= _DPID_CACHE_SIZE:
+            _DPID_CACHE.clear()
+        _DPID_CACHE[datapath_id] = result
+        return result
     raise ValueError('Invalid datapath_id: %r' % datapath_id)
 
 
+# Cache of datapath_id strings to int. When full, the cache is emptied.
+_DPID_CACHE = {}
+_DPID_CACHE_SIZE = 65536
+
+
 def normalize_port_no(port_no):
     """Normalize port number value to int or string."""
     if isinstance(port_no, int):
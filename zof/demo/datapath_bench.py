@@ -0,0 +1,81 @@
+"""Benchmark memory use of Datapath and Port objects.
+
+Builds a simulated fleet of datapaths, each with the same number of ports,
+from FEATURES_REPLY-style port descriptions and reports the memory used per
+datapath and per port:
+
+    python -m zof.demo.datapath_bench --datapaths 10000 --ports 48
+"""
+
+import argparse
+import tracemalloc
+from timeit import default_timer as timer
+from zof.datapath import DatapathList
+
+
+def make_port_descs(dp_index, count):
+    """Return list of port descriptions for one datapath."""
+    return [{
+        'port_no': port_no,
+        'hw_addr': '00:%02x:%02x:%02x:00:%02x' %
+        ((dp_index >> 16) & 0xFF, (dp_index >> 8) & 0xFF, dp_index & 0xFF,
+         port_no),
+        'name': 'eth%d' % port_no,
+        'state': ['LIVE'],
+        'config': [],
+        'curr_speed': 10000000,
+        'max_speed': 10000000
+    } for port_no in range(1, count + 1)]
+
+
+def build(datapaths, ports):
+    """Return DatapathList with simulated datapaths and ports."""
+    result = DatapathList()
+    for i in range(datapaths):
+        datapath = result.add_datapath(datapath_id=i + 1, conn_id=i + 1)
+        datapath.add_ports(make_port_descs(i, ports))
+        datapath.ready = True
+    return result
+
+
+def measure(datapaths, ports):
+    """Return bytes allocated for a fleet (excluding port descriptions)."""
+    descs = [make_port_descs(i, ports) for i in range(datapaths)]
+    tracemalloc.start()
+    fleet = DatapathList()
+    for i in range(datapaths):
+        datapath = fleet.add_datapath(datapath_id=i + 1, conn_id=i + 1)
+        datapath.add_ports(descs[i])
+        datapath.ready = True
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del fleet
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='datapath_bench', description='Datapath Memory Benchmark')
+    parser.add_argument(
+        '--datapaths', type=int, default=10000, help='number of datapaths')
+    parser.add_argument(
+        '--ports', type=int, default=48, help='number of ports per datapath')
+    args = parser.parse_args()
+
+    start_time = timer()
+    build(args.datapaths, args.ports)
+    elapsed = timer() - start_time
+
+    # Port names and hw_addr strings are shared with the descriptions, so
+    # only the Datapath and Port objects and their containers are counted.
+    empty = measure(args.datapaths, 0)
+    total = measure(args.datapaths, args.ports)
+    port_count = args.datapaths * args.ports
+    print('%d datapaths, %d ports: build %.3f sec, %.1f MB' %
+          (args.datapaths, port_count, elapsed, total / 1e6))
+    print('%.0f bytes/datapath, %.0f bytes/port' %
+          (empty / args.datapaths, (total - empty) / max(port_count, 1)))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,13 +3,39 @@
 - Implements reactive forwarding for a vlan-aware layer 2 switch.
 - Ignores LLDP packets.
 - Does not support loops.
+- Saves its forwarding table in snapshots (see zof.service.snapshot).
 
 """
 
+import argparse
 import zof
+from zof.packetout import buffer_id, is_complete, packet_out
 from zof.pktview import pktview_from_list
+from zof.service.reconciler import APP as RECONCILER
+from zof.snapshot import register_state
 
-APP = zof.Application('layer2', exception_fatal=True)
+
+def _max_len(value):
+    if value.upper() == 'NO_BUFFER':
+        return 'NO_BUFFER'
+    return int(value, 0)
+
+
+def _arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='layer2', description='Layer2 Demo', add_help=False)
+    parser.add_argument(
+        '--table-miss-max-len',
+        type=_max_len,
+        default='NO_BUFFER',
+        metavar='BYTES',
+        help='bytes of each table miss packet sent to the controller; the '
+        'switch buffers the rest (default: NO_BUFFER)')
+    return parser
+
+
+APP = zof.Application(
+    'layer2', exception_fatal=True, arg_parser=_arg_parser())
 
 # The forwarding table is a dictionary that maps:
 #   datapath_id -> { (eth_dst, vlan_vid) -> (out_port, time) }
@@ -17,17 +43,53 @@ APP = zof.Application('layer2', exception_fatal=True)
 APP.forwarding_table = {}
 
 
+def _save_forwarding_table():
+    """Return forwarding table as JSON-serializable lists."""
+    return {
+        datapath_id: [[eth_dst, vlan_vid, out_port, time]
+                      for (eth_dst, vlan_vid), (out_port, time) in
+                      fwd_table.items()]
+        for datapath_id, fwd_table in APP.forwarding_table.items()
+    }
+
+
+def _restore_forwarding_table(state):
+    """Restore forwarding table saved by `_save_forwarding_table`."""
+    APP.forwarding_table = {
+        datapath_id: {(eth_dst, vlan_vid): (out_port, time)
+                      for eth_dst, vlan_vid, out_port, time in rows}
+        for datapath_id, rows in state.items()
+    }
+
+
+register_state(
+    'layer2',
+    save=_save_forwarding_table,
+    restore=_restore_forwarding_table)
+
+
+@APP.event('start')
+def start(_event):
+    """Install the table miss flow on every switch.
+
+    When a switch connects, the reconciler service removes stale priority 0
+    flows in table 0 and adds the table miss flow if it is missing. Learned
+    flows (priority 10) are left in place; they expire on their own.
+    """
+    if APP.args is not None:
+        actions = TABLE_MISS_FLOW['instructions'][0]['actions']
+        actions[0]['max_len'] = APP.args.table_miss_max_len
+    RECONCILER.reconciler.tables = {0}
+    RECONCILER.reconciler.priorities = {TABLE_MISS_FLOW['priority']}
+    RECONCILER.reconciler.set_default_flows([TABLE_MISS_FLOW])
+
+
 @APP.message('channel_up')
 def channel_up(event):
-    """Set up datapath when switch connects."""
+    """Log when switch connects."""
     APP.logger.info('%s Connected from %s (%d ports, version %d)',
                     event['datapath_id'], event['msg']['endpoint'],
                     len(event['datapath']), event['version'])
-    APP.logger.info('%s Remove all flows', event['datapath_id'])
-
-    DELETE_FLOWS.send()
-    BARRIER.send()
-    TABLE_MISS_FLOW.send()
 
 
 @APP.message('channel_down')
@@ -50,10 +112,9 @@ def packet_in(event):
     datapath_id = event['datapath_id']
     msg = event['msg']
     time = event['time']
-    data = msg['data']
 
-    # Check for incomplete packet data.
-    if len(data) < msg['total_len']:
+    # Check for incomplete packet data that the switch did not buffer.
+    if not is_complete(msg):
         APP.logger.warning('Incomplete packet data: %r', event)
         return
 
@@ -76,15 +137,21 @@ def packet_in(event):
     if out_port != 'ALL':
         APP.logger.info('%s Forward %s vlan %s to port %s', datapath_id,
                         pkt.eth_dst, vlan_vid, out_port)
+        # If the packet is buffered, the FLOW_MOD forwards it.
+        buf_id = buffer_id(msg)
         LEARN_MAC_FLOW.send(
-            vlan_vid=vlan_vid, eth_dst=pkt.eth_dst, out_port=out_port)
-        PACKET_OUT.send(out_port=out_port, data=data)
+            vlan_vid=vlan_vid,
+            eth_dst=pkt.eth_dst,
+            out_port=out_port,
+            buffer_id=buf_id if buf_id is not None else 'NO_BUFFER')
+        if buf_id is None:
+            packet_out(msg, out_port)
 
     else:
         # Send packet back out all ports (except the one it came in).
         APP.logger.info('%s Flood %s to %s vlan %s', datapath_id,
                         pkt.get_description(), pkt.eth_dst, vlan_vid)
-        PACKET_FLOOD.send(in_port=in_port, data=data)
+        packet_out(msg, 'ALL')
 
 
 @APP.message('flow_removed')
@@ -110,32 +177,19 @@ def other_message(event):
     APP.logger.debug('Ignored message: %r', event)
 
 
-DELETE_FLOWS = zof.compile('''
-  # Delete flows in table 0.
-  type: FLOW_MOD
-  msg:
-    command: DELETE
-    table_id: 0
-''')
-
-BARRIER = zof.compile('''
-  type: BARRIER_REQUEST
-''')
-
-TABLE_MISS_FLOW = zof.compile('''
-  # Add permanent table miss flow entry to table 0
-  type: FLOW_MOD
-  msg:
-    command: ADD
-    table_id: 0
-    priority: 0
-    instructions:
-      - instruction: APPLY_ACTIONS
-        actions:
-          - action: OUTPUT
-            port_no: CONTROLLER
-            max_len: NO_BUFFER
-''')
+# Permanent table miss flow entry for table 0.
+TABLE_MISS_FLOW = {
+    'table_id': 0,
+    'priority': 0,
+    'instructions': [{
+        'instruction': 'APPLY_ACTIONS',
+        'actions': [{
+            'action': 'OUTPUT',
+            'port_no': 'CONTROLLER',
+            'max_len': 'NO_BUFFER'
+        }]
+    }]
+}
 
 LEARN_MAC_FLOW = zof.compile('''
   type: FLOW_MOD
@@ -145,7 +199,7 @@ LEARN_MAC_FLOW = zof.compile('''
     idle_timeout: 60
     hard_timeout: 120
     priority: 10
-    buffer_id: NO_BUFFER
+    buffer_id: $buffer_id
     flags: [ SEND_FLOW_REM ]
     match:
       - field: ETH_DST
@@ -160,26 +214,5 @@ LEARN_MAC_FLOW = zof.compile('''
             max_len: MAX
 ''')
 
-PACKET_OUT = zof.compile('''
-  type: PACKET_OUT
-  msg:
-    actions:
-      - action: OUTPUT
-        port_no: $out_port
-        max_len: MAX
-    data: $data
-''')
-
-PACKET_FLOOD = zof.compile('''
-  type: PACKET_OUT
-  msg:
-    in_port: $in_port
-    actions:
-      - action: OUTPUT
-        port_no: ALL
-        max_len: MAX
-    data: $data
-''')
-
 if __name__ == '__main__':
     zof.run()
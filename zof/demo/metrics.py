@@ -4,6 +4,7 @@ from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
 import zof
 from zof import exception as _exc
 from zof.http import HttpServer
+from zof.service.statscache import cached
 
 
 def arg_parser():
@@ -57,11 +58,11 @@ async def ports(target):
     return _dump_prometheus(met)
 
 
-PORT_STATS = zof.compile('''
+PORT_STATS = cached(zof.compile('''
 type: REQUEST.PORT_STATS
 msg:
   port_no: ANY
-''')
+'''))
 
 
 def _supported_counter(value):
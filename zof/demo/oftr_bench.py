@@ -1,21 +1,78 @@
+import argparse
 from timeit import default_timer as timer
 import zof
 from zof.controller import Controller
 
-APP = zof.Application('oftr_bench')
+
+def arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='oftr_bench', description='oftr RPC Benchmark', add_help=False)
+    parser.add_argument(
+        '--bench-mode',
+        choices=['sequential', 'pipelined', 'batched', 'all'],
+        default='all',
+        help='how RPC requests are sent')
+    parser.add_argument(
+        '--bench-count',
+        type=int,
+        default=10000,
+        help='number of RPC requests per round')
+    parser.add_argument(
+        '--bench-window',
+        type=int,
+        default=100,
+        help='requests in flight (pipelined) or per write (batched)')
+    parser.add_argument(
+        '--bench-rounds', type=int, default=5, help='number of rounds')
+    return parser
+
+
+APP = zof.Application('oftr_bench', arg_parser=arg_parser())
 CONTROLLER = Controller.singleton()
-N = 10000
+
+
+async def sequential(count, _window):
+    """Send one request and wait for its reply before sending the next."""
+    for _ in range(count):
+        await CONTROLLER.rpc_call('OFP.DESCRIPTION')
+
+
+async def pipelined(count, window):
+    """Send `window` requests, each in its own write, then wait for all."""
+    for i in range(0, count, window):
+        replies = [
+            CONTROLLER.rpc_call('OFP.DESCRIPTION')
+            for _ in range(min(window, count - i))
+        ]
+        for reply in replies:
+            await reply
+
+
+async def batched(count, window):
+    """Send `window` requests in a single write, then wait for all."""
+    for i in range(0, count, window):
+        calls = [('OFP.DESCRIPTION', {})] * min(window, count - i)
+        await CONTROLLER.rpc_batch(calls)
+
+
+MODES = {'sequential': sequential, 'pipelined': pipelined, 'batched': batched}
 
 
 @APP.event('start')
-async def start(event):
-    for i in range(5):
-        start_time = timer()
-        for _ in range(N):
-            await CONTROLLER.rpc_call('OFP.DESCRIPTION')
-        end_time = timer()
-        elapsed = end_time - start_time
-        APP.logger.info('Elapsed %r', elapsed)
+async def start(_):
+    args = APP.args
+    if args.bench_mode == 'all':
+        modes = ['sequential', 'pipelined', 'batched']
+    else:
+        modes = [args.bench_mode]
+    for mode in modes:
+        for _ in range(args.bench_rounds):
+            start_time = timer()
+            await MODES[mode](args.bench_count, args.bench_window)
+            elapsed = timer() - start_time
+            APP.logger.info('%s: %d requests in %.3f sec (%.0f/sec)', mode,
+                            args.bench_count, elapsed,
+                            args.bench_count / elapsed)
     zof.post_event({'event': 'EXIT'})
 
 
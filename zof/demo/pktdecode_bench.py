@@ -0,0 +1,83 @@
+"""Benchmark PACKET_IN header decoding by oftr versus Python.
+
+Measures the controller-side cost per PACKET_IN: parsing the event JSON,
+converting the packet, and reading a few header fields. With oftr decoding,
+the event carries the `_pkt` field list; with Python decoding, it carries
+only the packet data:
+
+    python -m zof.demo.pktdecode_bench --count 100000
+"""
+
+import argparse
+from timeit import default_timer as timer
+from zof.controller import _convert_pkt
+from zof.event import load_event
+from zof.objectview import to_json
+from zof.pktdecode import decode_packet
+
+# TCP/IPv4 packet with a 64 byte payload.
+DATA = bytes.fromhex(
+    '000000000002000000000001080045000068000000004006000'
+    '00a0000010a000002c00000500000000100000000501200000000'
+    '0000') + bytes(64)
+
+
+def make_event(with_fields):
+    """Return PACKET_IN event as oftr would send it."""
+    msg = {
+        'buffer_id': 'NO_BUFFER',
+        'total_len': len(DATA),
+        'in_port': 2,
+        'reason': 'APPLY_ACTION',
+        'data': DATA.hex()
+    }
+    if with_fields:
+        fields = decode_packet(DATA)
+        fields['in_port'] = 2
+        msg['_pkt'] = [{
+            'field': key.upper(),
+            'value': value
+        } for key, value in fields.items()]
+    return to_json({
+        'method': 'OFP.MESSAGE',
+        'params': {
+            'type': 'PACKET_IN',
+            'xid': 0,
+            'datapath_id': '00:00:00:00:00:00:00:01',
+            'msg': msg
+        }
+    }).encode('utf-8')
+
+
+def run(pkt_decode, count, access):
+    """Return seconds to process `count` PACKET_IN events."""
+    event = make_event(pkt_decode == 'oftr')
+    start_time = timer()
+    for _ in range(count):
+        msg = load_event(event)['params']['msg']
+        _convert_pkt(msg, pkt_decode)
+        if access:
+            pkt = msg['pkt']
+            _ = (pkt.eth_type, pkt.ipv4_dst, pkt('tcp_dst'))
+    return timer() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='pktdecode_bench', description='Packet Decode Benchmark')
+    parser.add_argument(
+        '--count', type=int, default=100000, help='number of packets')
+    args = parser.parse_args()
+
+    print('event size: oftr %d bytes, python %d bytes' %
+          (len(make_event(True)), len(make_event(False))))
+    for access in (False, True):
+        for pkt_decode in ('oftr', 'python'):
+            elapsed = run(pkt_decode, args.count, access)
+            print('%-6s %-9s %.3f sec (%.0f/sec)' %
+                  (pkt_decode, 'access' if access else 'no access', elapsed,
+                   args.count / elapsed))
+
+
+if __name__ == '__main__':
+    main()
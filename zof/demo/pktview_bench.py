@@ -0,0 +1,142 @@
+"""Benchmark memory use and speed of PktView.
+
+Compares ways of building a PktView from a typical PACKET_IN field list.
+`baseline` is the original per-field conversion; the total column is the
+end-to-end cost of converting a packet and reading a few fields:
+
+    python -m zof.demo.pktview_bench --count 1000000
+"""
+
+import argparse
+import tracemalloc
+from timeit import default_timer as timer
+from zof.objectview import ObjectView
+from zof.pktview import make_pktview, pktview_from_list, lazy_pktview_from_list
+
+# Fields oftr reports for a TCP/IPv4 packet.
+FIELDS = [
+    {'field': 'IN_PORT', 'value': 2},
+    {'field': 'ETH_DST', 'value': '00:00:00:00:00:02'},
+    {'field': 'ETH_SRC', 'value': '00:00:00:00:00:01'},
+    {'field': 'ETH_TYPE', 'value': 0x0800},
+    {'field': 'IP_DSCP', 'value': 0},
+    {'field': 'IP_ECN', 'value': 0},
+    {'field': 'IP_PROTO', 'value': 6},
+    {'field': 'IPV4_SRC', 'value': '10.0.0.1'},
+    {'field': 'IPV4_DST', 'value': '10.0.0.2'},
+    {'field': 'TCP_SRC', 'value': 49152},
+    {'field': 'TCP_DST', 'value': 80},
+    {'field': 'NX_IP_TTL', 'value': 64},
+    {'field': 'X_PKT_POS', 'value': 54}
+]
+
+DATA = bytes(64)
+
+
+def baseline_pktview(fields, data):
+    """Construct a PktView one field at a time, like the original code."""
+    pkt = make_pktview()
+    for field in fields:
+        key = field['field'].lower()
+        value = field['value']
+        if key in pkt:
+            orig_value = pkt[key]
+            if not isinstance(orig_value, list):
+                orig_value = [orig_value]
+                pkt[key] = orig_value
+            orig_value.append(value)
+        else:
+            pkt[key] = value
+    pkt.payload = data[pkt['x_pkt_pos']:]
+    return pkt
+
+
+def dict_pktview(fields, data):
+    """Construct a plain ObjectView from a dict."""
+    values = {}
+    for field in fields:
+        values[field['field'].lower()] = field['value']
+    values['payload'] = data[values['x_pkt_pos']:]
+    return ObjectView(values)
+
+
+def eager_pktview(fields, data):
+    """Construct a PktView with `pktview_from_list`."""
+    pkt = pktview_from_list(fields, multiple_value=True)
+    pkt.payload = data[pkt.x_pkt_pos:]
+    return pkt
+
+
+def lazy_pktview(fields, data):
+    """Construct a PktView that is converted on first access."""
+    return lazy_pktview_from_list(fields, data)
+
+
+def access(pkt):
+    """Read the fields a typical handler looks at."""
+    return (pkt.eth_type, pkt.ipv4_src, pkt('tcp_dst'), pkt('vlan_vid'),
+            pkt.payload)
+
+
+VARIANTS = {
+    'baseline': baseline_pktview,
+    'dict': dict_pktview,
+    'eager': eager_pktview,
+    'lazy': lazy_pktview
+}
+
+
+def run(name, count):
+    """Return (construct sec, access sec, total sec, bytes per packet).
+
+    The total is the end-to-end time to construct a packet and read its
+    fields, one packet at a time, as a PACKET_IN handler would.
+    """
+    make = VARIANTS[name]
+    fields = [dict(field) for field in FIELDS]
+
+    start_time = timer()
+    for _ in range(count):
+        access(make(fields, DATA))
+    total = timer() - start_time
+
+    start_time = timer()
+    pkts = [make(fields, DATA) for _ in range(count)]
+    construct = timer() - start_time
+    start_time = timer()
+    for pkt in pkts:
+        access(pkt)
+    accessed = timer() - start_time
+    del pkts
+
+    # Measure memory separately, since tracing slows down allocation.
+    tracemalloc.start()
+    pkts = [make(fields, DATA) for _ in range(count)]
+    for pkt in pkts:
+        access(pkt)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return construct, accessed, total, size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='pktview_bench', description='PktView Benchmark')
+    parser.add_argument(
+        '--count', type=int, default=1000000, help='number of packets')
+    parser.add_argument(
+        '--variant',
+        choices=sorted(VARIANTS) + ['all'],
+        default='all',
+        help='PktView variant')
+    args = parser.parse_args()
+
+    variants = sorted(VARIANTS) if args.variant == 'all' else [args.variant]
+    for name in variants:
+        construct, accessed, total, size = run(name, args.count)
+        print('%-8s construct %.3f sec, access %.3f sec, total %.3f sec, '
+              '%.0f bytes/packet' % (name, construct, accessed, total, size))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,7 @@
 import zof
 from ..http import HttpServer
 from ..pktview import pktview_from_list, pktview_to_list
+from ..service.statscache import cached
 
 APP = zof.Application('rest_api')
 APP.http_endpoint = '127.0.0.1:8080'
@@ -28,8 +29,7 @@ def get_switches():
 async def get_flows(dpid):
     result = []
     async for ofmsg in FLOWDESC_REQ.request(datapath_id=_parse_dpid(dpid)):
-        _translate_flows(ofmsg['msg'])
-        result.extend(ofmsg['msg'])
+        result.extend(_translate_flows(ofmsg['msg']))
     return {dpid: result}
 
 
@@ -49,16 +49,14 @@ async def post_flows(dpid, post_data):
     })
     result = []
     async for ofmsg in flow_req.request(datapath_id=_parse_dpid(dpid)):
-        _translate_flows(ofmsg['msg'])
-        result.extend(ofmsg['msg'])
+        result.extend(_translate_flows(ofmsg['msg']))
     return {dpid: result}
 
 
 @WEB.get('/stats/groupdesc/{dpid}', 'json')
 async def get_groupdesc(dpid):
     result = await GROUPDESC_REQ.request(datapath_id=_parse_dpid(dpid))
-    _translate_groups(result['msg'])
-    return {dpid: result['msg']}
+    return {dpid: _translate_groups(result['msg'])}
 
 
 @WEB.get('/stats/port/{dpid}/{port_no}', 'json')
@@ -105,7 +103,7 @@ async def get_portdesc(dpid):
     return {dpid: result['msg']}
 
 
-FLOWDESC_REQ = zof.compile('''
+FLOWDESC_REQ = cached(zof.compile('''
     type: REQUEST.FLOW_DESC
     msg:
         table_id: ALL
@@ -114,21 +112,21 @@ FLOWDESC_REQ = zof.compile('''
         cookie: 0
         cookie_mask: 0
         match: []
-''')
+'''))
 
-GROUPDESC_REQ = zof.compile('''
+GROUPDESC_REQ = cached(zof.compile('''
     type: REQUEST.GROUP_DESC
-''')
+'''))
 
-PORTSTATS_REQ = zof.compile('''
+PORTSTATS_REQ = cached(zof.compile('''
     type: REQUEST.PORT_STATS
     msg:
         port_no: $port_no
-''')
+'''))
 
-PORTDESC_REQ = zof.compile('''
+PORTDESC_REQ = cached(zof.compile('''
     type: REQUEST.PORT_DESC
-''')
+'''))
 
 PORTMOD_REQ = zof.compile('''
     type: PORT_MOD
@@ -165,18 +163,34 @@ def _parse_port(port_no):
 
 
 def _translate_flows(msgs):
+    # Translate copies; cached replies must not be modified.
+    result = []
     for msg in msgs:
+        flow = dict(msg)
         if 'match' in msg:
-            msg['match'] = pktview_from_list(msg['match'], slash_notation=True)
+            flow['match'] = pktview_from_list(
+                msg['match'], slash_notation=True)
         if 'instructions' in msg:
-            msg['actions'] = _translate_instructions(msg['instructions'])
+            flow['actions'] = _translate_instructions(msg['instructions'])
+        result.append(flow)
+    return result
 
 
 def _translate_groups(msgs):
+    # Translate copies; cached replies must not be modified.
+    result = []
     for msg in msgs:
-        for bkt in msg['buckets']:
-            if 'actions' in bkt:
-                bkt['actions'] = _translate_actions(bkt['actions'])
+        group = dict(msg)
+        group['buckets'] = [_translate_bucket(bkt) for bkt in msg['buckets']]
+        result.append(group)
+    return result
+
+
+def _translate_bucket(bkt):
+    bkt = dict(bkt)
+    if 'actions' in bkt:
+        bkt['actions'] = _translate_actions(bkt['actions'])
+    return bkt
 
 
 def _translate_instructions(instrs):
@@ -7,6 +7,7 @@
 #       |     +-- zof.RPCException
 #       |     +-- zof.ErrorException
 #       |     +-- zof.DeliveryException
+#       |     +-- zof.BatchException
 #       +-- zof.ControlFlowException
 #             +-- zof.StopPropagationException
 #             +-- zof.ExitException
@@ -81,6 +82,24 @@ class DeliveryException(ControllerException):
         return '[DeliveryException xid=%s event=%s]' % (self.xid, self.event)
 
 
+class BatchException(ControllerException):
+    """Exception that indicates messages in a batch elicited errors.
+
+    Attributes:
+        errors (List[Tuple[int, ControllerException]]): (index, exception) for
+            each failed message, where index is the message's position in the
+            batch.
+    """
+
+    def __init__(self, xid, errors):
+        super().__init__(xid)
+        self.errors = errors
+
+    def __str__(self):
+        return '[BatchException xid=%s errors=%s]' % (self.xid, ', '.join(
+            '%d:%s' % (idx, exc) for idx, exc in self.errors))
+
+
 class ControlFlowException(Exception):
     """Base class for control flow exceptions used in zof."""
 
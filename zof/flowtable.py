@@ -0,0 +1,231 @@
+"""Implements FlowTable class.
+
+A FlowTable is an in-memory copy of the flows installed on one datapath. It
+is updated by applying FLOW_MOD and FLOW_REMOVED messages, and indexes its
+entries by table, cookie and output port. Applying a FLOW_MOD returns an undo
+list, so a FLOW_MOD that the switch rejects can be rolled back.
+"""
+
+from .datapath import normalize_port_no
+from .objectview import from_json, to_json
+from .reconcile import flow_key
+
+_ALL_TABLES = ('ALL', 0xFF)
+_ANY_PORT = ('ANY', 0xFFFFFFFF)
+
+
+class FlowEntry:
+    """Concrete class representing one installed flow.
+
+    Entries use __slots__ and store instructions as compact JSON text to
+    keep memory use low.
+    """
+
+    __slots__ = ('table_id', 'priority', 'match', 'cookie', 'idle_timeout',
+                 'hard_timeout', 'flags', 'out_ports', '_instructions')
+
+    def __init__(self, key, msg):
+        self.table_id, self.priority, self.match = key
+        self.cookie = msg.get('cookie', 0)
+        self.idle_timeout = msg.get('idle_timeout', 0)
+        self.hard_timeout = msg.get('hard_timeout', 0)
+        self.flags = tuple(msg.get('flags') or ())
+        self.set_instructions(msg.get('instructions') or [])
+
+    @property
+    def key(self):
+        """(table_id, priority, match) that identifies the flow."""
+        return (self.table_id, self.priority, self.match)
+
+    @property
+    def instructions(self):
+        """Flow instructions."""
+        return from_json(self._instructions)
+
+    def set_instructions(self, instructions):
+        """Replace flow instructions."""
+        self._instructions = to_json(instructions)
+        self.out_ports = frozenset(_out_ports(instructions))
+
+    def copy(self):
+        """Return a copy of the entry."""
+        result = FlowEntry.__new__(FlowEntry)
+        for name in FlowEntry.__slots__:
+            setattr(result, name, getattr(self, name))
+        return result
+
+    def __repr__(self):
+        return '<FlowEntry table_id=%r priority=%r match=%r cookie=%r>' % (
+            self.table_id, self.priority, self.match, self.cookie)
+
+
+class FlowTable:
+    """Concrete class representing the flows installed on a datapath."""
+
+    def __init__(self):
+        self._entries = {}
+        self._by_table = {}
+        self._by_cookie = {}
+        self._by_port = {}
+
+    def get(self, flow):
+        """Return entry with the same (table_id, priority, match) as `flow`,
+        or None."""
+        return self._entries.get(flow_key(flow))
+
+    def find(self, *, table_id=None, cookie=None, out_port=None, match=None):
+        """Return list of entries that satisfy all of the given conditions.
+
+        Args:
+            table_id (int): Table that contains the flow.
+            cookie (int): Flow cookie.
+            out_port (int|str): Port that the flow outputs to.
+            match (list|dict): Match fields that the flow's match must
+                include.
+        """
+        candidates = None
+        if out_port is not None:
+            out_port = normalize_port_no(out_port)
+        for index, value in ((self._by_table, table_id),
+                             (self._by_cookie, cookie),
+                             (self._by_port, out_port)):
+            if value is None:
+                continue
+            keys = index.get(value, frozenset())
+            candidates = keys if candidates is None else candidates & keys
+        if candidates is None:
+            candidates = self._entries.keys()
+        entries = [self._entries[key] for key in candidates]
+        if match is not None:
+            fields = set(flow_key({'match': match})[2])
+            entries = [
+                entry for entry in entries if fields <= set(entry.match)
+            ]
+        return entries
+
+    def apply_flow_mod(self, msg):
+        """Update the table from a FLOW_MOD message.
+
+        Returns:
+            List[Tuple[tuple, FlowEntry]]: Undo list of (key, previous entry)
+                pairs, where the previous entry is None if there was none.
+                Pass it to `undo` to roll the FLOW_MOD back.
+        """
+        command = str(msg.get('command', 'ADD')).upper()
+        undo = []
+        if command == 'ADD':
+            entry = FlowEntry(flow_key(msg), msg)
+            undo.append((entry.key, self._entries.get(entry.key)))
+            self._add(entry)
+        elif command == 'MODIFY_STRICT':
+            entry = self._entries.get(flow_key(msg))
+            if entry is not None:
+                undo.append((entry.key, entry.copy()))
+                self._modify(entry, msg)
+        elif command == 'MODIFY':
+            for entry in self._select(msg, strict=False):
+                undo.append((entry.key, entry.copy()))
+                self._modify(entry, msg)
+        elif command in ('DELETE_STRICT', 'DELETE'):
+            for entry in self._select(msg, strict=command == 'DELETE_STRICT'):
+                undo.append((entry.key, entry))
+                self._remove(entry.key)
+        return undo
+
+    def undo(self, undo):
+        """Roll back a FLOW_MOD using the undo list from `apply_flow_mod`."""
+        for key, entry in reversed(undo):
+            if entry is None:
+                self._remove(key)
+            else:
+                self._add(entry)
+
+    def apply_flow_removed(self, msg):
+        """Update the table from a FLOW_REMOVED message."""
+        self._remove(flow_key(msg))
+
+    def add_flows(self, flows):
+        """Add flows reported by REQUEST.FLOW_DESC."""
+        for flow in flows:
+            self._add(FlowEntry(flow_key(flow), flow))
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+        self._by_table.clear()
+        self._by_cookie.clear()
+        self._by_port.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries.values())
+
+    def _select(self, msg, strict):
+        """Return entries selected by a modify or delete FLOW_MOD."""
+        key = flow_key(msg)
+        if strict:
+            entry = self._entries.get(key)
+            entries = [] if entry is None else [entry]
+        else:
+            table_id = msg.get('table_id', 0)
+            if table_id in _ALL_TABLES:
+                table_id = None
+            entries = self.find(
+                table_id=table_id, match=msg.get('match') or [])
+        cookie_mask = msg.get('cookie_mask', 0)
+        if cookie_mask:
+            cookie = msg.get('cookie', 0) & cookie_mask
+            entries = [
+                entry for entry in entries
+                if entry.cookie & cookie_mask == cookie
+            ]
+        out_port = msg.get('out_port')
+        if out_port is not None and out_port not in _ANY_PORT:
+            out_port = normalize_port_no(out_port)
+            entries = [
+                entry for entry in entries if out_port in entry.out_ports
+            ]
+        return entries
+
+    def _add(self, entry):
+        key = entry.key
+        self._remove(key)
+        self._entries[key] = entry
+        self._index(entry, True)
+
+    def _modify(self, entry, msg):
+        self._index(entry, False)
+        entry.set_instructions(msg.get('instructions') or [])
+        self._index(entry, True)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._index(entry, False)
+
+    def _index(self, entry, add):
+        key = entry.key
+        _update(self._by_table, entry.table_id, key, add)
+        _update(self._by_cookie, entry.cookie, key, add)
+        for port in entry.out_ports:
+            _update(self._by_port, port, key, add)
+
+
+def _update(index, value, key, add):
+    if add:
+        index.setdefault(value, set()).add(key)
+    else:
+        keys = index.get(value)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[value]
+
+
+def _out_ports(instructions):
+    for instruction in instructions:
+        for action in instruction.get('actions') or ():
+            if str(action.get('action', '')).upper() == 'OUTPUT':
+                yield normalize_port_no(action['port_no'])
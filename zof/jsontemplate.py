@@ -0,0 +1,248 @@
+"""Implements JsonTemplate class.
+
+A JsonTemplate is a YAML message template that has been translated once into
+a compact JSON skeleton. Sending a message only splices JSON-encoded argument
+values into the skeleton, so neither the controller nor oftr has to deal with
+YAML after the template is compiled.
+"""
+
+import functools
+import json
+import re
+import string
+from .objectview import ObjectView, to_json
+
+# Plain YAML scalars that can be emitted as JSON literals unchanged.
+_JSON_NUMBER = re.compile(
+    r'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?\Z')
+_JSON_LITERALS = {'true', 'false'}
+_YAML_NULLS = {'', '~', 'null', 'Null', 'NULL'}
+
+# Types that are passed through `to_json` unchanged.
+_JSON_TYPES = (str, bytes, bytearray, memoryview, dict, list, tuple, int,
+               float, ObjectView)
+
+_TEMPLATE_PATTERN = string.Template.pattern
+
+
+class JsonTemplate:
+    """Concrete class representing a message template compiled to JSON.
+
+    The skeleton is stored as a list of literal JSON fragments. Each argument
+    occupies its own slot in the list and is filled in by `substitute`.
+
+    Attributes:
+        args (Set[str]): Names of template arguments.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._slots = []
+        self.args = set()
+
+    def substitute(self, kwds):
+        """Return JSON text with argument values substituted.
+
+        Raises:
+            KeyError: if an argument is missing from `kwds`.
+        """
+        parts = self._parts[:]
+        for index, name, encode in self._slots:
+            parts[index] = encode(kwds[name])
+        return ''.join(parts)
+
+    def literal(self, text):
+        """Append literal JSON text to the skeleton."""
+        if self._parts and self._parts[-1] is not None:
+            self._parts[-1] += text
+        else:
+            self._parts.append(text)
+
+    def arg(self, name, encode):
+        """Append a slot for argument `name` encoded by `encode`."""
+        self._slots.append((len(self._parts), name, encode))
+        self._parts.append(None)
+        self.args.add(name)
+
+
+def compile_template(source, envelope='%s', prefix=()):
+    """Translate a YAML message template into a JsonTemplate.
+
+    Args:
+        source (str): YAML message template.
+        envelope (str): JSON text that surrounds the message object, with
+            `%s` in place of the message.
+        prefix (Seq[Tuple[str, str]]): Leading (key, argument) pairs to
+            place in front of the message's top-level keys.
+    Returns:
+        JsonTemplate|None: Compiled template, or None if the template can't
+            be translated (e.g. PyYAML isn't installed, or a `$var` is used
+            to splice YAML structure rather than a value).
+    """
+    try:
+        import yaml
+    except ImportError:  # pragma: no cover
+        return None
+
+    try:
+        node = yaml.compose(source, Loader=yaml.SafeLoader)
+    except yaml.YAMLError:
+        return None
+    if not isinstance(node, yaml.MappingNode):
+        return None
+
+    head, tail = envelope.split('%s')
+    template = JsonTemplate()
+    template.literal(head + '{')
+    for i, (key, arg) in enumerate(prefix):
+        if i:
+            template.literal(',')
+        template.literal('%s:' % json.dumps(key))
+        template.arg(arg, _encode_value)
+    try:
+        for i, (key, value) in enumerate(node.value):
+            if i or prefix:
+                template.literal(',')
+            _compile_key(template, key, yaml)
+            _compile_node(template, value, yaml)
+    except ValueError:
+        return None
+    template.literal('}' + tail)
+    return template
+
+
+def _compile_node(template, node, yaml):
+    if isinstance(node, yaml.MappingNode):
+        template.literal('{')
+        for i, (key, value) in enumerate(node.value):
+            if i:
+                template.literal(',')
+            _compile_key(template, key, yaml)
+            _compile_node(template, value, yaml)
+        template.literal('}')
+    elif isinstance(node, yaml.SequenceNode):
+        template.literal('[')
+        for i, value in enumerate(node.value):
+            if i:
+                template.literal(',')
+            _compile_node(template, value, yaml)
+        template.literal(']')
+    else:
+        _compile_scalar(template, node)
+
+
+def _compile_key(template, node, yaml):
+    if not isinstance(node, yaml.ScalarNode) or '$' in node.value:
+        raise ValueError('Unsupported key')
+    template.literal('%s:' % json.dumps(node.value, ensure_ascii=False))
+
+
+def _compile_scalar(template, node):
+    value = node.value
+    if node.style is None:
+        # Plain scalar.
+        match = _TEMPLATE_PATTERN.fullmatch(value)
+        if match:
+            name = match.group('named') or match.group('braced')
+            if name:
+                template.arg(name, _encode_value)
+                return
+        if value in _YAML_NULLS:
+            template.literal('null')
+            return
+        if value in _JSON_LITERALS or _JSON_NUMBER.match(value):
+            template.literal(value)
+            return
+
+    # Any other scalar is a string which may embed template arguments.
+    template.literal('"')
+    pos = 0
+    for match in _TEMPLATE_PATTERN.finditer(value):
+        template.literal(_escape(value[pos:match.start()]))
+        pos = match.end()
+        if match.group('escaped') is not None:
+            template.literal('$')
+        elif match.group('invalid') is not None:
+            raise ValueError('Invalid placeholder')
+        else:
+            name = match.group('named') or match.group('braced')
+            template.arg(name, _encode_text)
+    template.literal(_escape(value[pos:]))
+    template.literal('"')
+
+
+def _escape(text):
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+def _encode_value(value):
+    """Encode argument value that replaces an entire YAML scalar."""
+    if value is None or isinstance(value, _JSON_TYPES):
+        return to_json(value)
+    return to_json(str(value))
+
+
+def _encode_text(value):
+    """Encode argument value that is embedded in a string."""
+    if isinstance(value, str):
+        return _escape(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return value.hex()
+    if value is None:
+        return 'null'
+    if isinstance(value, (dict, list, tuple, ObjectView)):
+        return _escape(to_json(value))
+    return _escape(str(value))
+
+
+@functools.lru_cache(maxsize=None)
+def yaml_loader():
+    """Return function that loads YAML text as JSON-compatible values.
+
+    Returns None if PyYAML isn't installed.
+    """
+    try:
+        import yaml
+    except ImportError:  # pragma: no cover
+        return None
+
+    class _Loader(yaml.SafeLoader):  # pylint: disable=too-many-ancestors
+        """SafeLoader that only resolves JSON-style scalars.
+
+        YAML 1.1 reads a MAC address like 12:34:56:12:34:56 as a base 60
+        int, and yes/no/on/off as bools. Here, only the numbers (including
+        oftr's 0x hex), booleans and nulls that JSON has are resolved.
+        """
+
+        def construct_mapping(self, node, deep=False):
+            # Packet data is hex; keep it a string even if it looks like a
+            # number.
+            for key_node, value_node in node.value:
+                if key_node.value == 'data' and isinstance(
+                        value_node, yaml.ScalarNode):
+                    value_node.tag = _YAML_STR
+            return super().construct_mapping(node, deep)
+
+    _Loader.yaml_implicit_resolvers = {}
+    for tag, regexp, first in _YAML_RESOLVERS:
+        _Loader.add_implicit_resolver(tag, regexp, first)
+
+    def _load(text):
+        return yaml.load(text, Loader=_Loader)
+
+    return _load
+
+
+_YAML_STR = 'tag:yaml.org,2002:str'
+_YAML_RESOLVERS = (
+    ('tag:yaml.org,2002:null', re.compile(r'^(?:~|null|Null|NULL|)$'),
+     ['~', 'n', 'N', '']),
+    ('tag:yaml.org,2002:bool',
+     re.compile(r'^(?:true|True|TRUE|false|False|FALSE)$'), list('tTfF')),
+    ('tag:yaml.org,2002:int',
+     re.compile(r'^(?:[-+]?(?:0|[1-9][0-9]*)|0x[0-9a-fA-F]+)$'),
+     list('-+0123456789')),
+    ('tag:yaml.org,2002:float',
+     re.compile(r'^[-+]?(?:0|[1-9][0-9]*)'
+                r'(?:\.[0-9]+(?:[eE][-+]?[0-9]+)?|[eE][-+]?[0-9]+)$'),
+     list('-+0123456789')))
@@ -147,7 +147,7 @@ def to_json_pretty(obj, indent=4):
 
 
 def _json_serialize(obj):
-    if isinstance(obj, bytes):
+    if isinstance(obj, (bytes, bytearray, memoryview)):
         return obj.hex()
     if isinstance(obj, (ObjectView, argparse.Namespace)):
         return vars(obj)
@@ -0,0 +1,75 @@
+"""Implements helpers that reply to a PACKET_IN.
+
+If the switch buffered the packet, a PACKET_OUT (or FLOW_MOD) can refer to
+it by `buffer_id` instead of sending the packet data back to the switch.
+These helpers pick the right form automatically.
+"""
+
+import zof
+
+NO_BUFFER = 0xFFFFFFFF
+
+
+def buffer_id(msg):
+    """Return buffer_id of a PACKET_IN message, or None if the packet is not
+    buffered by the switch."""
+    value = msg.get('buffer_id')
+    if value is None or value == NO_BUFFER or value == 'NO_BUFFER':
+        return None
+    return value
+
+
+def is_complete(msg):
+    """Return true if a PACKET_IN message can be forwarded by a PACKET_OUT.
+
+    Either the switch has buffered the packet, or the message contains all
+    of the packet data.
+    """
+    return buffer_id(msg) is not None or len(msg['data']) >= msg['total_len']
+
+
+def packet_out(msg, out_port, **kwds):
+    """Send a PACKET_OUT that outputs the packet from a PACKET_IN message.
+
+    If the packet is buffered by the switch, refer to it by buffer_id.
+    Otherwise, send the packet data.
+
+    Args:
+        msg (dict): PACKET_IN `msg`.
+        out_port (int|str): Output port, e.g. 'ALL' to flood.
+        kwds (dict): Extra template arguments, e.g. `datapath_id`.
+    """
+    buf_id = buffer_id(msg)
+    if buf_id is not None:
+        PACKET_OUT_BUFFERED.send(
+            buffer_id=buf_id,
+            in_port=msg['in_port'],
+            out_port=out_port,
+            **kwds)
+    else:
+        PACKET_OUT_DATA.send(
+            in_port=msg['in_port'], out_port=out_port, data=msg['data'], **kwds)
+
+
+PACKET_OUT_BUFFERED = zof.compile('''
+  type: PACKET_OUT
+  msg:
+    buffer_id: $buffer_id
+    in_port: $in_port
+    actions:
+      - action: OUTPUT
+        port_no: $out_port
+        max_len: MAX
+''')
+
+PACKET_OUT_DATA = zof.compile('''
+  type: PACKET_OUT
+  msg:
+    buffer_id: NO_BUFFER
+    in_port: $in_port
+    actions:
+      - action: OUTPUT
+        port_no: $out_port
+        max_len: MAX
+    data: $data
+''')
@@ -0,0 +1,248 @@
+"""Implements packet header decoding in Python.
+
+`decode_packet` parses Ethernet, VLAN, ARP, IPv4, IPv6, TCP, UDP, ICMPv4,
+ICMPv6 (including neighbor discovery) and LLDP headers from raw packet data.
+Field names and value formats match the `_pkt` field list produced by oftr,
+so the result can back the same PktView interface.
+"""
+
+import socket
+import struct
+
+_OFPVID_PRESENT = 0x1000
+
+_ETH_TYPE_VLAN = (0x8100, 0x88A8)
+_ETH_TYPE_ARP = 0x0806
+_ETH_TYPE_IPV4 = 0x0800
+_ETH_TYPE_IPV6 = 0x86DD
+_ETH_TYPE_LLDP = 0x88CC
+
+_IP_PROTO_TCP = 6
+_IP_PROTO_UDP = 17
+_IP_PROTO_ICMPV4 = 1
+_IP_PROTO_ICMPV6 = 58
+
+# IPv6 extension headers and their OFPIEH_* flags.
+_IPV6_EXTHDR = {0: 0x40, 43: 0x20, 44: 0x10, 60: 0x08}
+_IPV6_FRAGMENT = 44
+
+_ICMPV6_ND_SOLICIT = 135
+_ICMPV6_ND_ADVERT = 136
+
+_LLDP_CHASSIS_SUBTYPE = {
+    1: 'chassis',
+    2: 'ifalias',
+    3: 'portcomp',
+    4: 'mac',
+    5: 'net',
+    6: 'ifname',
+    7: 'local'
+}
+_LLDP_PORT_SUBTYPE = {
+    1: 'ifalias',
+    2: 'portcomp',
+    3: 'mac',
+    4: 'net',
+    5: 'ifname',
+    6: 'circuit',
+    7: 'local'
+}
+
+_HALF = struct.Struct('!H')
+_ARP = struct.Struct('!HHBBH6s4s6s4s')
+_IPV4 = struct.Struct('!BBHHHBBH4s4s')
+_IPV6 = struct.Struct('!LHBB16s16s')
+_PORTS = struct.Struct('!HH')
+_TCP = struct.Struct('!HHLLBB')
+
+
+def decode_packet(data):
+    """Decode packet headers.
+
+    Args:
+        data (bytes): Ethernet frame.
+    Returns:
+        dict: Header fields, including `x_pkt_pos`, the offset of the data
+            that follows the last decoded header.
+    """
+    fields = {}
+    try:
+        _decode_ethernet(memoryview(data), fields)
+    except (struct.error, IndexError):
+        # Packet is truncated; keep the fields decoded so far.
+        pass
+    return fields
+
+
+def _decode_ethernet(data, fields):
+    fields['eth_dst'] = _mac(data[0:6])
+    fields['eth_src'] = _mac(data[6:12])
+    eth_type = _HALF.unpack_from(data, 12)[0]
+    offset = 14
+    if eth_type in _ETH_TYPE_VLAN:
+        tci = _HALF.unpack_from(data, offset)[0]
+        fields['vlan_vid'] = (tci & 0x0FFF) | _OFPVID_PRESENT
+        fields['vlan_pcp'] = tci >> 13
+        eth_type = _HALF.unpack_from(data, offset + 2)[0]
+        offset += 4
+    fields['eth_type'] = eth_type
+    fields['x_pkt_pos'] = offset
+
+    decoder = _DECODERS.get(eth_type)
+    if decoder is not None:
+        decoder(data, offset, fields)
+
+
+def _decode_arp(data, offset, fields):
+    (_, _, _, _, arp_op, sha, spa, tha, tpa) = _ARP.unpack_from(data, offset)
+    fields['arp_op'] = arp_op
+    fields['arp_spa'] = socket.inet_ntoa(spa)
+    fields['arp_tpa'] = socket.inet_ntoa(tpa)
+    fields['arp_sha'] = _mac(sha)
+    fields['arp_tha'] = _mac(tha)
+    fields['x_pkt_pos'] = offset + _ARP.size
+
+
+def _decode_ipv4(data, offset, fields):
+    (ver_ihl, tos, _, _, frag, ttl, proto, _, src,
+     dst) = _IPV4.unpack_from(data, offset)
+    fields['ip_dscp'] = tos >> 2
+    fields['ip_ecn'] = tos & 0x03
+    fields['ip_proto'] = proto
+    fields['ipv4_src'] = socket.inet_ntoa(src)
+    fields['ipv4_dst'] = socket.inet_ntoa(dst)
+    fields['nx_ip_ttl'] = ttl
+    offset += (ver_ihl & 0x0F) * 4
+    fields['x_pkt_pos'] = offset
+    if frag & 0x1FFF:
+        # Not the first fragment; there is no transport header.
+        return
+    _decode_transport(data, offset, proto, fields)
+
+
+def _decode_ipv6(data, offset, fields):
+    (ver_tc_flow, _, proto, hop_limit, src,
+     dst) = _IPV6.unpack_from(data, offset)
+    traffic_class = (ver_tc_flow >> 20) & 0xFF
+    fields['ip_dscp'] = traffic_class >> 2
+    fields['ip_ecn'] = traffic_class & 0x03
+    fields['ipv6_flabel'] = ver_tc_flow & 0x000FFFFF
+    fields['ipv6_src'] = socket.inet_ntop(socket.AF_INET6, bytes(src))
+    fields['ipv6_dst'] = socket.inet_ntop(socket.AF_INET6, bytes(dst))
+    fields['nx_ip_ttl'] = hop_limit
+    offset += _IPV6.size
+
+    exthdr = 0
+    fragment = False
+    while proto in _IPV6_EXTHDR:
+        exthdr |= _IPV6_EXTHDR[proto]
+        next_proto = data[offset]
+        if proto == _IPV6_FRAGMENT:
+            fragment = _HALF.unpack_from(data, offset + 2)[0] & 0xFFF8 != 0
+            offset += 8
+        else:
+            offset += (data[offset + 1] + 1) * 8
+        proto = next_proto
+    if exthdr:
+        fields['ipv6_exthdr'] = exthdr
+    fields['ip_proto'] = proto
+    fields['x_pkt_pos'] = offset
+    if not fragment:
+        _decode_transport(data, offset, proto, fields)
+
+
+def _decode_transport(data, offset, proto, fields):
+    if proto == _IP_PROTO_TCP:
+        src, dst, _, _, data_offset, flags = _TCP.unpack_from(data, offset)
+        fields['tcp_src'] = src
+        fields['tcp_dst'] = dst
+        fields['tcp_flags'] = ((data_offset & 0x01) << 8) | flags
+        fields['x_pkt_pos'] = offset + (data_offset >> 4) * 4
+    elif proto == _IP_PROTO_UDP:
+        src, dst = _PORTS.unpack_from(data, offset)
+        fields['udp_src'] = src
+        fields['udp_dst'] = dst
+        fields['x_pkt_pos'] = offset + 8
+    elif proto == _IP_PROTO_ICMPV4:
+        fields['icmpv4_type'] = data[offset]
+        fields['icmpv4_code'] = data[offset + 1]
+        fields['x_pkt_pos'] = offset + 4
+    elif proto == _IP_PROTO_ICMPV6:
+        _decode_icmpv6(data, offset, fields)
+
+
+def _decode_icmpv6(data, offset, fields):
+    icmp_type = data[offset]
+    fields['icmpv6_type'] = icmp_type
+    fields['icmpv6_code'] = data[offset + 1]
+    fields['x_pkt_pos'] = offset + 4
+    if icmp_type not in (_ICMPV6_ND_SOLICIT, _ICMPV6_ND_ADVERT):
+        return
+
+    target = bytes(data[offset + 8:offset + 24])
+    if len(target) < 16:
+        return
+    fields['ipv6_nd_target'] = socket.inet_ntop(socket.AF_INET6, target)
+    if icmp_type == _ICMPV6_ND_ADVERT:
+        fields['x_ipv6_nd_res'] = data[offset + 4] << 24
+    offset += 24
+    fields['x_pkt_pos'] = offset
+
+    # Source/target link-layer address options.
+    while offset + 8 <= len(data):
+        opt_type, opt_len = data[offset], data[offset + 1]
+        if opt_len == 0:
+            break
+        if opt_type == 1 and icmp_type == _ICMPV6_ND_SOLICIT:
+            fields['ipv6_nd_sll'] = _mac(data[offset + 2:offset + 8])
+        elif opt_type == 2 and icmp_type == _ICMPV6_ND_ADVERT:
+            fields['ipv6_nd_tll'] = _mac(data[offset + 2:offset + 8])
+        offset += opt_len * 8
+    fields['x_pkt_pos'] = min(offset, len(data))
+
+
+def _decode_lldp(data, offset, fields):
+    end = len(data)
+    while offset + 2 <= end:
+        header = _HALF.unpack_from(data, offset)[0]
+        tlv_type, tlv_len = header >> 9, header & 0x01FF
+        value = data[offset + 2:offset + 2 + tlv_len]
+        offset += 2 + tlv_len
+        if tlv_type == 0:
+            break
+        if tlv_type == 1 and value:
+            fields['x_lldp_chassis_id'] = _lldp_id(value,
+                                                   _LLDP_CHASSIS_SUBTYPE)
+        elif tlv_type == 2 and value:
+            fields['x_lldp_port_id'] = _lldp_id(value, _LLDP_PORT_SUBTYPE)
+        elif tlv_type == 3 and len(value) >= 2:
+            fields['x_lldp_ttl'] = _HALF.unpack_from(value)[0]
+    fields['x_pkt_pos'] = min(offset, end)
+
+
+def _lldp_id(value, subtypes):
+    """Return LLDP chassis or port ID as '<subtype> <value>'."""
+    subtype = subtypes.get(value[0], str(value[0]))
+    ident = value[1:]
+    if subtype == 'mac' and len(ident) == 6:
+        return 'mac %s' % _mac(ident)
+    if subtype in ('ifname', 'ifalias', 'local'):
+        try:
+            return '%s %s' % (subtype, bytes(ident).decode('utf-8'))
+        except UnicodeDecodeError:
+            pass
+    return '%s %s' % (subtype, bytes(ident).hex())
+
+
+def _mac(value):
+    if len(value) < 6:
+        raise struct.error('MAC address is truncated')
+    return '%02x:%02x:%02x:%02x:%02x:%02x' % tuple(value)
+
+
+_DECODERS = {
+    _ETH_TYPE_ARP: _decode_arp,
+    _ETH_TYPE_IPV4: _decode_ipv4,
+    _ETH_TYPE_IPV6: _decode_ipv6,
+    _ETH_TYPE_LLDP: _decode_lldp
+}
@@ -0,0 +1,234 @@
+"""Implements PacketRing class.
+
+A PacketRing records header fields of PACKET_IN messages in preallocated
+NumPy column arrays. When the ring is full, the oldest rows are overwritten,
+so memory use is fixed regardless of traffic. Queries run vectorized over
+the columns.
+
+This module requires numpy.
+"""
+
+import socket
+import struct
+import time as _time
+import numpy as np
+
+# Default number of rows (about 1.4MB with all columns). The pktring service
+# raises it with `--pktring-capacity`.
+DEFAULT_CAPACITY = 2**14
+
+# Column name -> (dtype, shape of each row). Missing values are recorded as
+# zero. MAC addresses are stored as uint64, IPv4 addresses as uint32 and
+# IPv6 addresses as a pair of uint64 (high, low). `tp_src` and `tp_dst` hold
+# TCP or UDP ports.
+COLUMNS = {
+    'time': (np.float64, ()),
+    'datapath_id': (np.uint64, ()),
+    'in_port': (np.uint32, ()),
+    'total_len': (np.uint32, ()),
+    'eth_src': (np.uint64, ()),
+    'eth_dst': (np.uint64, ()),
+    'eth_type': (np.uint16, ()),
+    'vlan_vid': (np.uint16, ()),
+    'ip_proto': (np.uint8, ()),
+    'ipv4_src': (np.uint32, ()),
+    'ipv4_dst': (np.uint32, ()),
+    'ipv6_src': (np.uint64, (2, )),
+    'ipv6_dst': (np.uint64, (2, )),
+    'tp_src': (np.uint16, ()),
+    'tp_dst': (np.uint16, ()),
+}
+
+_IPV4 = struct.Struct('!L')
+_IPV6 = struct.Struct('!QQ')
+
+
+class PacketRing:
+    """Concrete class that records PACKET_IN header fields in a ring buffer.
+
+    Args:
+        capacity (int): Number of rows.
+        columns (Seq[str]): Names of columns to record (default=all).
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, *, columns=None):
+        if capacity <= 0:
+            raise ValueError('capacity must be positive')
+        if columns is None:
+            columns = COLUMNS.keys()
+        self.capacity = capacity
+        self.columns = {}
+        for name in columns:
+            dtype, shape = COLUMNS[name]
+            self.columns[name] = np.zeros((capacity, ) + shape, dtype=dtype)
+        self.count = 0
+        self._datapath_ids = {}
+
+    def __len__(self):
+        """Return number of rows recorded (at most `capacity`)."""
+        return min(self.count, self.capacity)
+
+    def append(self, datapath_id, msg, time=None):
+        """Record a PACKET_IN message.
+
+        Args:
+            datapath_id (str): Datapath ID of the message.
+            msg (dict): PACKET_IN `msg`.
+            time (float|str): Time the message was received (default=now).
+        """
+        row = self.count % self.capacity
+        self.count += 1
+        pkt = msg.get('pkt')
+        if pkt is None:
+            pkt = {}
+        values = {
+            'time': _time.time() if time is None else float(time),
+            'datapath_id': self._datapath_id(datapath_id),
+            'in_port': msg.get('in_port'),
+            'total_len': msg.get('total_len'),
+            'eth_src': _mac(pkt.get('eth_src')),
+            'eth_dst': _mac(pkt.get('eth_dst')),
+            'eth_type': pkt.get('eth_type'),
+            'vlan_vid': pkt.get('vlan_vid'),
+            'ip_proto': pkt.get('ip_proto'),
+            'ipv4_src': _ipv4(pkt.get('ipv4_src')),
+            'ipv4_dst': _ipv4(pkt.get('ipv4_dst')),
+            'ipv6_src': _ipv6(pkt.get('ipv6_src')),
+            'ipv6_dst': _ipv6(pkt.get('ipv6_dst')),
+            'tp_src': pkt.get('tcp_src') or pkt.get('udp_src'),
+            'tp_dst': pkt.get('tcp_dst') or pkt.get('udp_dst'),
+        }
+        for name, column in self.columns.items():
+            value = values[name]
+            column[row] = value if isinstance(value, (int, float,
+                                                      tuple)) else 0
+
+    def clear(self):
+        """Remove all rows."""
+        self.count = 0
+
+    def snapshot(self, *, since=None):
+        """Return copy of the recorded rows, oldest first.
+
+        Args:
+            since (float): Only include rows recorded at or after this time.
+        Returns:
+            Dict[str, numpy.ndarray]: Column arrays.
+        """
+        size = len(self)
+        start = self.count % self.capacity if self.count > size else 0
+        result = {}
+        for name, column in self.columns.items():
+            if start:
+                result[name] = np.concatenate((column[start:], column[:start]))
+            else:
+                result[name] = column[:size].copy()
+        if since is not None:
+            mask = result['time'] >= since
+            result = {name: array[mask] for name, array in result.items()}
+        return result
+
+    def export(self, file, **kwds):
+        """Write a snapshot to a compressed .npz file.
+
+        Args:
+            file (str|BinaryIO): File name or file object.
+            kwds (dict): Passed to `snapshot`.
+        """
+        np.savez_compressed(file, **self.snapshot(**kwds))
+
+    def top_talkers(self, count=10, *, column='eth_src', since=None):
+        """Return most frequent values of a column.
+
+        Returns:
+            List[Tuple[str|int, int]]: (value, packets) pairs, most frequent
+                first.
+        """
+        values = self.snapshot(since=since)[column]
+        if values.ndim > 1:
+            uniques, counts = np.unique(values, axis=0, return_counts=True)
+        else:
+            uniques, counts = np.unique(values, return_counts=True)
+        order = np.argsort(counts, kind='stable')[::-1][:count]
+        return [(_format(column, uniques[i]), int(counts[i])) for i in order]
+
+    def port_rates(self, *, since=None):
+        """Return packet and byte rates for each (datapath_id, in_port).
+
+        Rates are averaged over the time span of the selected rows.
+
+        Returns:
+            Dict[Tuple[str, int], Tuple[float, float]]: Packets per second and
+                bytes per second, keyed by (datapath_id, in_port).
+        """
+        snap = self.snapshot(since=since)
+        times = snap['time']
+        if not times.size:
+            return {}
+        span = max(float(times.max() - (times.min() if since is None else
+                                         since)), 1e-9)
+        keys = np.stack((snap['datapath_id'], snap['in_port'].astype(
+            np.uint64)), axis=1)
+        uniques, inverse, counts = np.unique(
+            keys, axis=0, return_inverse=True, return_counts=True)
+        octets = np.bincount(
+            inverse.reshape(-1),
+            weights=snap['total_len'],
+            minlength=len(uniques))
+        return {(_dpid_str(int(dpid)), int(port)):
+                (counts[i] / span, octets[i] / span)
+                for i, (dpid, port) in enumerate(uniques)}
+
+    def eth_type_histogram(self, *, since=None):
+        """Return packet counts by eth_type."""
+        values = self.snapshot(since=since)['eth_type']
+        counts = np.bincount(values, minlength=0)
+        return {
+            int(eth_type): int(counts[eth_type])
+            for eth_type in np.flatnonzero(counts)
+        }
+
+    def _datapath_id(self, datapath_id):
+        result = self._datapath_ids.get(datapath_id)
+        if result is None:
+            result = int(datapath_id.replace(':', ''), 16)
+            self._datapath_ids[datapath_id] = result
+        return result
+
+
+def _mac(value):
+    if isinstance(value, str):
+        return int(value.replace(':', ''), 16)
+    return None
+
+
+def _ipv4(value):
+    if isinstance(value, str):
+        return _IPV4.unpack(socket.inet_aton(value))[0]
+    return None
+
+
+def _ipv6(value):
+    if isinstance(value, str):
+        return _IPV6.unpack(socket.inet_pton(socket.AF_INET6, value))
+    return None
+
+
+def _dpid_str(value):
+    hexstr = '%016x' % value
+    return ':'.join(hexstr[i:i + 2] for i in range(0, 16, 2))
+
+
+def _format(column, value):
+    """Return readable form of a column value."""
+    if column in ('eth_src', 'eth_dst'):
+        hexstr = '%012x' % int(value)
+        return ':'.join(hexstr[i:i + 2] for i in range(0, 12, 2))
+    if column in ('ipv4_src', 'ipv4_dst'):
+        return socket.inet_ntoa(_IPV4.pack(int(value)))
+    if column in ('ipv6_src', 'ipv6_dst'):
+        return socket.inet_ntop(socket.AF_INET6,
+                                _IPV6.pack(int(value[0]), int(value[1])))
+    if column == 'datapath_id':
+        return _dpid_str(int(value))
+    return int(value)
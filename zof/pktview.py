@@ -1,11 +1,24 @@
 import ipaddress
+import sys
+from collections import OrderedDict
 from .objectview import ObjectView
 from .ofctl import convert_from_ofctl
+from .pktdecode import decode_packet
 
 # Reserved payload field.
 PAYLOAD = 'payload'
 
 
+_MISSING = object()
+
+# Map of oftr field names to interned attribute names. Sharing the key
+# strings keeps each packet's dict as small as one built with setattr.
+_FIELD_KEYS = {}
+
+# Maximum number of entries in the match conversion cache.
+MATCH_CACHE_SIZE = 1024
+
+
 def pktview_alias(name, converter=(lambda x: x)):
     """Construct property that aliases specified attribute.
 
@@ -13,11 +26,11 @@ def pktview_alias(name, converter=(lambda x: x)):
     """
 
     def _fget(self):
-        try:
-            return converter(self.__dict__[name])
-        except KeyError:
+        value = self.__dict__.get(name, _MISSING)
+        if value is _MISSING:
             raise AttributeError(
-                'PktView object has no attribute "%s": %r' % (name, self)) from None
+                'PktView object has no attribute "%s": %r' % (name, self))
+        return converter(value)
 
     def _fset(self, value):
         self.__dict__[name] = value
@@ -81,16 +94,36 @@ class PktView(ObjectView):
     ipv6_nd_res = pktview_alias('x_ipv6_nd_res')
     nxt = pktview_alias('ip_proto')
 
+    def __init__(self, d=None):  # pylint: disable=super-init-not-called
+        self.__dict__ = {} if d is None else d
+
+    def __call__(self, key, *, default=None):
+        return getattr(self, key, default)
+
+    def __getstate__(self):
+        state = self.__dict__
+        payload = state.get(PAYLOAD)
+        if isinstance(payload, memoryview):
+            # A memoryview can't be pickled; store a copy.
+            state = dict(state)
+            state[PAYLOAD] = payload.tobytes()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__ = state
+
     @property
     def src(self):
-        result = self('ipv4_src') or self('ipv6_src')
+        values = self.__dict__
+        result = values.get('ipv4_src') or values.get('ipv6_src')
         if not result:
             raise AttributeError('src')
         return result
 
     @property
     def dst(self):
-        result = self('ipv4_dst') or self('ipv6_dst')
+        values = self.__dict__
+        result = values.get('ipv4_dst') or values.get('ipv6_dst')
         if not result:
             raise AttributeError('dst')
         return result
@@ -133,6 +166,71 @@ class PktView(ObjectView):
         return self if PktView.PROTO_FIELD[protocol.upper()] in self else None
 
 
+# Descriptor for the instance dictionary of an ObjectView.
+_INSTANCE_DICT = ObjectView.__dict__['__dict__']
+
+
+# Reserved key for the unconverted state of a lazy PktView. It is not a
+# valid attribute name, so it can't collide with a packet field.
+_PENDING = '<pending>'
+
+
+class _LazyPktView(PktView):
+    """PktView that converts its field list on first access.
+
+    Until then, the instance dict holds only the pending state. The first
+    attribute access, assignment, deletion, copy or pickle converts the
+    fields and changes the object's class to PktView, so later reads are
+    plain dict lookups.
+    """
+
+    def __init__(self, fields, data, memview=False):  # pylint: disable=super-init-not-called
+        _INSTANCE_DICT.__set__(self, {_PENDING: (fields, data, memview)})
+
+    def __getattribute__(self, name):
+        _LazyPktView._load(self)
+        return getattr(self, name)
+
+    def __setattr__(self, name, value):
+        _LazyPktView._load(self)
+        setattr(self, name, value)
+
+    def __delattr__(self, name):
+        _LazyPktView._load(self)
+        delattr(self, name)
+
+    def __reduce_ex__(self, protocol):
+        # Copies and pickles are plain PktView objects.
+        _LazyPktView._load(self)
+        return self.__reduce_ex__(protocol)
+
+    def _load(self):
+        # Attribute access on `self` would recurse, so use the type. The
+        # fields are converted into the instance dict itself.
+        values = _INSTANCE_DICT.__get__(self)
+        fields, data, memview = values.pop(_PENDING)
+        type(self)._convert(fields, data, values)
+        pos = values.get('x_pkt_pos')
+        if pos is not None and data is not None:
+            if memview:
+                values[PAYLOAD] = memoryview(data)[pos:]
+            else:
+                values[PAYLOAD] = data[pos:]
+        object.__setattr__(self, '__class__', PktView)
+
+    @staticmethod
+    def _convert(fields, _data, values):
+        _fields_to_dict(fields, False, True, values)
+
+
+class _DecodedPktView(_LazyPktView):
+    """PktView that decodes the packet data on first access."""
+
+    @staticmethod
+    def _convert(_fields, data, values):
+        values.update(decode_packet(data))
+
+
 def make_pktview(**kwds):
     """Construct a new PktView object."""
     return PktView(kwds)
@@ -151,9 +249,23 @@ def pktview_from_list(fields, *, slash_notation=False, multiple_value=False):
     if not isinstance(fields, (list, tuple)):
         raise ValueError('Expected list or tuple')
 
-    pkt = make_pktview()
+    return PktView(_fields_to_dict(fields, slash_notation, multiple_value))
+
+
+def _fields_to_dict(fields, slash_notation, multiple_value, result=None):
+    """Return dict of values from a list of field objects.
+
+    If `result` is given, the values are added to it.
+    """
+    if result is None:
+        result = {}
     for field in fields:
-        key = field['field'].lower()
+        name = field['field']
+        key = _FIELD_KEYS.get(name)
+        if key is None:
+            key = sys.intern(name.lower())
+            if len(_FIELD_KEYS) < MATCH_CACHE_SIZE:
+                _FIELD_KEYS[name] = key
         if key == PAYLOAD:
             raise ValueError('Field "payload" is reserved')
         if 'mask' in field:
@@ -162,32 +274,63 @@ def pktview_from_list(fields, *, slash_notation=False, multiple_value=False):
                 value = '%s/%s' % value
         else:
             value = field['value']
-        if key in pkt:
+        if key in result:
             if not multiple_value:
                 raise ValueError('Multiple value for key "%s"' % key)
-            orig_value = pkt[key]
+            orig_value = result[key]
             if not isinstance(orig_value, list):
                 orig_value = [orig_value]
-                pkt[key] = orig_value
+                result[key] = orig_value
             orig_value.append(value)
         else:
-            pkt[key] = value
-    return pkt
+            result[key] = value
+    return result
+
+
+def lazy_pktview_from_list(fields, data=None, *, memview=False):
+    """Construct a PktView object that converts `fields` on first access.
+
+    Multiple values are allowed. If `data` is present, the payload is sliced
+    from it at the `x_pkt_pos` offset. If `memview` is true, the payload is a
+    memoryview of `data` instead, so no bytes are copied. A memoryview
+    compares equal to bytes, but has no `decode` method, is not hashable
+    and does not support `in`; use `bytes(pkt.payload)` for those.
+
+    Args:
+        fields (Seq[ObjectView|dict]): Sequence of fields.
+        data (bytes): Packet data.
+        memview (bool): If true, the payload is a memoryview.
+    """
+    if not isinstance(fields, (list, tuple)):
+        raise ValueError('Expected list or tuple')
+    return _LazyPktView(fields, data, memview)
+
+
+def lazy_pktview_from_data(data, *, memview=False):
+    """Construct a PktView object that decodes `data` on first access.
+
+    Headers are decoded in Python by `zof.pktdecode.decode_packet`. The
+    payload is handled as in `lazy_pktview_from_list`.
+
+    Args:
+        data (bytes): Packet data.
+        memview (bool): If true, the payload is a memoryview.
+    """
+    return _DecodedPktView(None, data, memview)
 
 
 def pktview_to_list(pkt):
-    """Convert a PktView object (or dict) into a list of fields."""
+    """Convert a PktView object (or dict) into a list of fields.
+
+    Conversions are memoized in an LRU cache keyed on the match's fields and
+    values. Each call returns a new list of new dicts.
+    """
     if not isinstance(pkt, (dict, ObjectView)):
         raise ValueError('Expected a dict or ObjectView')
 
-    result = []
-    for key, value in _iter_items(pkt):
-        if key != PAYLOAD:
-            if isinstance(value, list):
-                result.extend(_make_field(key, item) for item in value)
-            else:
-                result.append(_make_field(key, value))
-    return result
+    items = [(key, value) for key, value in _iter_items(pkt) if key != PAYLOAD]
+    specs = _LIST_CACHE.get(_cache_key(items), lambda: _compile_match(items))
+    return [_field_from_spec(spec) for spec in specs]
 
 
 def pktview_from_ofctl(ofctl, *, validate=False):
@@ -203,7 +346,74 @@ def pktview_from_ofctl(ofctl, *, validate=False):
     return PktView(convert_from_ofctl(ofctl, validate=validate))
 
 
-def _make_field(name, value):
+def match_cache_clear():
+    """Empty the cache used by `pktview_to_list`."""
+    _LIST_CACHE.clear()
+
+
+class _LRUCache:
+    """Bounded mapping that evicts the least recently used entry.
+
+    Values must not be mutated by callers.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, compute):
+        """Return cached value for `key`, or store the result of `compute()`.
+
+        If `key` is unhashable, return `compute()` without caching it.
+        """
+        try:
+            value = self._entries[key]
+            self._entries.move_to_end(key)
+            return value
+        except KeyError:
+            pass
+        except TypeError:
+            return compute()
+        value = compute()
+        self._entries[key] = value
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self._entries.clear()
+
+
+_LIST_CACHE = _LRUCache(MATCH_CACHE_SIZE)
+
+
+def _cache_key(items):
+    # Include each value's type so that equal values of different types,
+    # like 1 and True, do not share an entry.
+    return tuple((key, _typed_value(value)) for key, value in items)
+
+
+def _typed_value(value):
+    if isinstance(value, (list, tuple)):
+        return (value.__class__, tuple(_typed_value(item) for item in value))
+    return (value.__class__, value)
+
+
+def _compile_match(items):
+    """Return tuple of (field, value[, mask]) specs for (key, value) items."""
+    specs = []
+    for key, value in items:
+        if isinstance(value, list):
+            specs.extend(_make_spec(key, item) for item in value)
+        else:
+            specs.append(_make_spec(key, value))
+    return tuple(specs)
+
+
+def _make_spec(name, value):
     assert not isinstance(value, list)
 
     fname = name.upper()
@@ -212,9 +422,15 @@ def _make_field(name, value):
     if isinstance(value, tuple):
         if len(value) != 2:
             raise ValueError('len(tuple) != 2')
-        return dict(field=fname, value=value[0], mask=value[1])
+        return (fname, value[0], value[1])
+
+    return (fname, value)
+
 
-    return dict(field=fname, value=value)
+def _field_from_spec(spec):
+    if len(spec) == 3:
+        return dict(field=spec[0], value=spec[1], mask=spec[2])
+    return dict(field=spec[0], value=spec[1])
 
 
 def _iter_items(obj):
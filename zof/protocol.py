@@ -11,24 +11,33 @@ class Protocol(asyncio.SubprocessProtocol):
 
     def __init__(self, post_event):
         self.post_event = post_event
-        self.buf = b''
+        self.buf = bytearray()
         self.exit_future = asyncio.Future()
 
     def pipe_data_received(self, fd, data):
         LOGGER.debug('zof.Protocol.pipe_data_received: %d bytes, fd=%d',
                      len(data), fd)
         begin = 0
-        offset = len(self.buf)
-        self.buf += data
+        if self.buf:
+            # Complete the partial event left over from the last call.
+            begin = data.find(b'\x00')
+            if begin < 0:
+                self.buf += data
+                return
+            self.buf += data[:begin]
+            event = bytes(self.buf)
+            self.buf.clear()
+            self.post_event(load_event(event))
+            begin += 1
+        # Parse events directly from `data`, without copying it to `buf`.
         while True:
-            offset = self.buf.find(b'\x00', offset)
+            offset = data.find(b'\x00', begin)
             if offset < 0:
-                self.buf = self.buf[begin:]
+                self.buf += data[begin:]
                 return
             if begin != offset:
-                self.post_event(load_event(self.buf[begin:offset]))
-            offset += 1
-            begin = offset
+                self.post_event(load_event(data[begin:offset]))
+            begin = offset + 1
 
     def pipe_connection_lost(self, fd, exc):
         if exc is not None:
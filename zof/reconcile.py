@@ -0,0 +1,269 @@
+"""Implements desired-state flow reconciliation.
+
+A datapath's desired flows are compared with the flows actually installed,
+as reported by REQUEST.FLOW_DESC. Flows are identified by (table_id,
+priority, match). The difference is applied with the smallest set of
+FLOW_MODs:
+
+- a desired flow that is missing is added,
+- a flow whose instructions differ is changed with MODIFY_STRICT,
+- a flow whose cookie, timeouts or flags differ is replaced using ADD,
+- an installed flow that is not desired is removed with DELETE_STRICT.
+
+Flows are written in the same format as a FLOW_MOD `msg`. The match may be a
+list of fields or a PktView-style dict.
+"""
+
+from collections import namedtuple
+from .api_compile import CompiledObject
+from .batch import Batch
+from .controller import Controller
+from .datapath import normalize_datapath_id
+from .objectview import ObjectView
+from .pktview import pktview_to_list
+
+# Default values of the flow attributes that are compared.
+_DEFAULTS = {
+    'cookie': 0,
+    'idle_timeout': 0,
+    'hard_timeout': 0,
+    'flags': (),
+    'instructions': ()
+}
+
+# Flow attributes that can't be changed with MODIFY_STRICT.
+_REPLACED = ('cookie', 'idle_timeout', 'hard_timeout', 'flags')
+
+# Number of FLOW_MODs sent between barriers.
+DEFAULT_BATCH_SIZE = 500
+
+FlowDiff = namedtuple('FlowDiff', 'adds modifies deletes')
+
+
+def flow_key(flow):
+    """Return key that identifies a flow: (table_id, priority, match)."""
+    match = flow.get('match') or ()
+    if isinstance(match, (dict, ObjectView)):
+        match = pktview_to_list(match)
+    fields = []
+    for field in match:
+        mask = field.get('mask')
+        fields.append((str(field['field']).upper(), _normalize(
+            field['value']), None if mask is None else _normalize(mask)))
+    return (flow.get('table_id', 0), flow.get('priority', 0x8000),
+            tuple(sorted(fields, key=repr)))
+
+
+def diff_flows(desired, actual):
+    """Compare desired flows with actual flows.
+
+    Args:
+        desired (Iterable[dict]): Desired flows.
+        actual (Iterable[dict]): Installed flows.
+    Returns:
+        FlowDiff: Lists of flows to add, modify and delete.
+    """
+    installed = {flow_key(flow): flow for flow in actual}
+    adds = []
+    modifies = []
+    for key, flow in _index(desired).items():
+        current = installed.pop(key, None)
+        if current is None:
+            adds.append(flow)
+        elif any(_differs(flow, current, attr) for attr in _REPLACED):
+            adds.append(flow)
+        elif _differs(flow, current, 'instructions'):
+            modifies.append(flow)
+    return FlowDiff(adds, modifies, list(installed.values()))
+
+
+async def fetch_flows(datapath_id, *, controller=None):
+    """Return the flows installed on a datapath, using REQUEST.FLOW_DESC.
+    """
+    flows = []
+    request = _flow_desc(controller or Controller.singleton())
+    async for reply in request.request(datapath_id=datapath_id):
+        flows.extend(reply['msg'])
+    return flows
+
+
+class FlowReconciler:
+    """Concrete class that holds each datapath's desired flows and brings
+    the datapath's flow tables in line with them.
+
+    Args:
+        tables (Set[int]|None): Flow tables to manage. Installed flows in
+            other tables are left alone. If None, manage all tables.
+        priorities (Set[int]|None): Flow priorities to manage. Installed
+            flows with other priorities are left alone. If None, manage all
+            priorities.
+        batch_size (int): Number of FLOW_MODs sent between barriers.
+    """
+
+    def __init__(self,
+                 *,
+                 tables=None,
+                 priorities=None,
+                 batch_size=DEFAULT_BATCH_SIZE,
+                 controller=None):
+        self._controller = controller or Controller.singleton()
+        # int datapath_id -> {flow_key: flow}
+        self._desired = {}
+        self._default = {}
+        self.tables = tables
+        self.priorities = priorities
+        self.batch_size = batch_size
+
+    def set_default_flows(self, flows):
+        """Set the flows desired on every datapath."""
+        self._default = _index(flows)
+
+    def set_flows(self, datapath_id, flows):
+        """Replace the flows desired on a datapath (in addition to the
+        default flows)."""
+        self._desired[normalize_datapath_id(datapath_id)] = _index(flows)
+
+    def add_flow(self, datapath_id, flow):
+        """Add a flow to the desired state of a datapath."""
+        self._desired.setdefault(normalize_datapath_id(datapath_id),
+                                 {})[flow_key(flow)] = flow
+
+    def remove_flow(self, datapath_id, flow):
+        """Remove a flow from the desired state of a datapath."""
+        self._desired.get(normalize_datapath_id(datapath_id), {}).pop(
+            flow_key(flow), None)
+
+    def forget(self, datapath_id):
+        """Forget the desired state of a datapath."""
+        self._desired.pop(normalize_datapath_id(datapath_id), None)
+
+    def desired_flows(self, datapath_id):
+        """Return list of flows desired on a datapath."""
+        flows = dict(self._default)
+        flows.update(
+            self._desired.get(normalize_datapath_id(datapath_id), {}))
+        return list(flows.values())
+
+    def diff(self, datapath_id, actual, *, keep=None):
+        """Compare the desired state of a datapath with its installed flows.
+
+        Installed flows that match a flow in `keep` by (table_id, priority,
+        match) are not deleted, even if they are not desired.
+        """
+        if self.tables is not None:
+            actual = [
+                flow for flow in actual if flow['table_id'] in self.tables
+            ]
+        if self.priorities is not None:
+            actual = [
+                flow for flow in actual
+                if flow.get('priority', 0x8000) in self.priorities
+            ]
+        diff = diff_flows(self.desired_flows(datapath_id), actual)
+        if keep:
+            kept = set(_index(keep))
+            diff = diff._replace(deletes=[
+                flow for flow in diff.deletes if flow_key(flow) not in kept
+            ])
+        return diff
+
+    async def fetch(self, datapath_id):
+        """Return the flows installed on a datapath."""
+        return await fetch_flows(datapath_id, controller=self._controller)
+
+    async def reconcile(self, datapath_id, *, keep=None):
+        """Fetch a datapath's flows and apply the difference.
+
+        Deletes are sent first, so they free table space for adds. A barrier
+        follows every `batch_size` FLOW_MODs.
+
+        Args:
+            datapath_id (str): Datapath ID.
+            keep (Iterable[dict]): Installed flows to leave in place; see
+                `diff`.
+        Returns:
+            FlowDiff: The changes applied.
+        Raises:
+            BatchException: if any FLOW_MOD failed.
+        """
+        diff = self.diff(
+            datapath_id, await self.fetch(datapath_id), keep=keep)
+        mods = [('DELETE_STRICT', flow) for flow in diff.deletes]
+        mods.extend(('MODIFY_STRICT', flow) for flow in diff.modifies)
+        mods.extend(('ADD', flow) for flow in diff.adds)
+
+        for i in range(0, len(mods), self.batch_size):
+            batch = Batch(datapath_id=datapath_id, controller=self._controller)
+            for command, flow in mods[i:i + self.batch_size]:
+                batch.add(self._flow_mod(command, flow))
+            await batch.barrier()
+        return diff
+
+    def _flow_mod(self, command, flow):
+        msg = {
+            'command': command,
+            'table_id': flow.get('table_id', 0),
+            'priority': flow.get('priority', 0x8000),
+            'match': _match_list(flow.get('match'))
+        }
+        if command == 'DELETE_STRICT':
+            msg['out_port'] = 'ANY'
+            msg['out_group'] = 'ANY'
+        else:
+            for attr in _DEFAULTS:
+                if attr in flow:
+                    msg[attr] = flow[attr]
+        return CompiledObject(self._controller, {
+            'type': 'FLOW_MOD',
+            'msg': msg
+        })
+
+
+def _index(flows):
+    return {flow_key(flow): flow for flow in flows}
+
+
+def _differs(flow, current, attr):
+    default = _DEFAULTS[attr]
+    return _normalize(flow.get(attr, default)) != _normalize(
+        current.get(attr, default))
+
+
+def _normalize(value):
+    """Return comparable form of a flow attribute value."""
+    if isinstance(value, (dict, ObjectView)):
+        return tuple(
+            sorted((key, _normalize(value[key])) for key in value))
+    if isinstance(value, (list, tuple)):
+        return tuple(_normalize(item) for item in value)
+    if isinstance(value, str):
+        return value.lower()
+    return value
+
+
+def _match_list(match):
+    if isinstance(match, (dict, ObjectView)):
+        return pktview_to_list(match)
+    return list(match or ())
+
+
+_FLOW_DESC = {}
+
+
+def _flow_desc(controller):
+    """Return compiled flow desc request for the given controller."""
+    request = _FLOW_DESC.get(controller)
+    if request is None:
+        request = CompiledObject(controller, {
+            'type': 'REQUEST.FLOW_DESC',
+            'msg': {
+                'table_id': 'ALL',
+                'out_port': 'ANY',
+                'out_group': 'ANY',
+                'cookie': 0,
+                'cookie_mask': 0,
+                'match': []
+            }
+        })
+        _FLOW_DESC[controller] = request
+    return request
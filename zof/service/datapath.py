@@ -5,10 +5,27 @@ This is a guard app with high precedence. This app blocks other apps from
 receiving channel_up messages until all of the datapath's ports are discovered.
 
 This app modifies message events to include the source `datapath` object.
+
+When a port_status message adds, deletes or changes a port of a ready
+datapath, this app posts a PORT_CHANGED event:
+
+    {
+        'event': 'PORT_CHANGED',
+        'datapath_id': '00:00:00:00:00:00:00:01',
+        'datapath': <zof.Datapath>,
+        'port_no': 1,
+        'port': <zof.Port>,
+        'reason': 'MODIFY',
+        'changes': {'state': ['LINK_DOWN']},
+        'previous': {'state': []}
+    }
+
+`changes` and `previous` only hold the attributes that changed. A
+port_status message that repeats the current port desc posts no event.
 """
 
 import zof
-from zof.datapath import DatapathList
+from zof.datapath import DatapathList, normalize_datapath_id
 import zof.exception as _exc
 
 
@@ -18,15 +35,12 @@ class DatapathApp(zof.Application):
         self.datapaths = DatapathList()
 
     def get_datapaths(self):
-        return [datapath for datapath in self.datapaths if datapath.ready]
+        return list(self.datapaths.ready_datapaths())
 
     def find_datapath(self, datapath_id):
-        try:
-            datapath = self.datapaths[datapath_id]
-            if datapath.ready:
-                return datapath
-        except KeyError:
-            pass
+        datapath = self.datapaths.get(datapath_id)
+        if datapath is not None and datapath.ready:
+            return datapath
         return None
 
     def find_port(self, datapath_id, port_no):
@@ -36,6 +50,17 @@ class DatapathApp(zof.Application):
         except KeyError:
             return None
 
+    def datapath_key(self, datapath_id, conn_id):
+        """Return int datapath_id of a message's target (or None if unknown).
+        """
+        if datapath_id:
+            return normalize_datapath_id(datapath_id)
+        if conn_id:
+            datapath = self.datapaths.find_conn_id(conn_id)
+            if datapath is not None:
+                return datapath.id
+        return None
+
 
 APP = DatapathApp()
 
@@ -69,19 +94,45 @@ def port_status(event):
     if datapath is not None:
         msg = event['msg']
         reason = msg['reason']
+        changed = []
         if reason == 'DELETE':
-            datapath.delete_port(port_no=msg['port_no'])
+            port = datapath.delete_port(port_no=msg['port_no'])
+            if port is not None:
+                changed.append((port, {}))
         elif reason in ('ADD', 'MODIFY'):
-            datapath.add_ports([msg])
+            changed = datapath.add_ports([msg])
         else:
             APP.logger.warning('Unknown port_status reason: %r', event)
         if datapath.ready:
+            for port, previous in changed:
+                post_port_changed(datapath, port, reason, previous)
             event['datapath'] = datapath
             return
 
     raise _exc.StopPropagationException()
 
 
+def post_port_changed(datapath, port, reason, previous):
+    """Post a PORT_CHANGED event.
+
+    Args:
+        datapath (Datapath): Datapath of the port.
+        port (Port): Port that changed.
+        reason (str): 'ADD', 'MODIFY' or 'DELETE'.
+        previous (dict): Previous values of the attributes that changed.
+    """
+    zof.post_event({
+        'event': 'PORT_CHANGED',
+        'datapath_id': datapath.datapath_id,
+        'datapath': datapath,
+        'port_no': port.port_no,
+        'port': port,
+        'reason': reason,
+        'changes': {attr: getattr(port, attr) for attr in previous},
+        'previous': previous
+    })
+
+
 @APP.message(any)
 def other_message(event):
     datapath = APP.find_datapath(event['datapath_id'])
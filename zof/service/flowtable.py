@@ -0,0 +1,181 @@
+"""
+This app maintains a shadow copy of each datapath's flow tables.
+
+Import this module to enable it. Look up the flows installed on a datapath
+with:
+
+    from zof.service.flowtable import APP as FLOWTABLE
+    entries = FLOWTABLE.flow_table(dpid).find(out_port=3)
+
+When a datapath connects, the app fetches its flows with REQUEST.FLOW_DESC.
+FLOW_MODs sent while the fetch is in progress are applied after the fetched
+flows. Afterwards, each outgoing FLOW_MOD is applied to the table as it is
+sent. A
+FLOW_MOD that elicits an ERROR is rolled back, until a later barrier reply
+confirms it. Without a barrier, only the last `MAX_UNCONFIRMED` FLOW_MODs of
+a datapath can be rolled back. The table is also updated from FLOW_REMOVED
+messages.
+"""
+
+from collections import deque
+
+import zof
+from zof.controller import Controller
+from zof.datapath import normalize_datapath_id
+from zof.exception import ControllerException
+from zof.flowtable import FlowTable
+from zof.reconcile import fetch_flows
+from zof.service.datapath import APP as DATAPATH_APP
+
+# Maximum number of unconfirmed FLOW_MODs per datapath that can be rolled
+# back if the switch rejects them.
+MAX_UNCONFIRMED = 1000
+
+
+class FlowTableApp(zof.Application):
+    def __init__(self):
+        super().__init__('service.flowtable', precedence=999998000)
+        # datapath_id -> FlowTable
+        self.tables = {}
+        # datapath_id -> deque of (xid, undo) sent since the last barrier
+        self._pending = {}
+        # barrier xid -> (datapath_id, deque of (xid, undo))
+        self._barriers = {}
+        # datapath_id -> list of (xid, msg) sent while fetching flows
+        self._fetching = {}
+        controller = Controller.singleton()
+        controller.add_send_hook('FLOW_MOD', self._sent_flow_mod)
+        controller.add_send_hook('BARRIER_REQUEST', self._sent_barrier)
+        controller.add_recv_hook('BARRIER_REPLY', self._barrier_reply)
+        controller.add_recv_hook('ERROR', self._error)
+
+    def flow_table(self, datapath_id):
+        """Return FlowTable for a datapath (or None if unknown)."""
+        return self.tables.get(normalize_datapath_id(datapath_id))
+
+    def new_table(self, key):
+        """Create an empty flow table for a datapath.
+
+        FLOW_MODs sent before `fetched` is called are held back, so they
+        are applied on top of the flows fetched from the switch.
+        """
+        table = FlowTable()
+        self.tables[key] = table
+        self._fetching[key] = []
+        return table
+
+    def fetched(self, key, table, flows):
+        """Add the flows fetched from a datapath to its table.
+
+        FLOW_MODs sent since `new_table` are applied afterwards.
+        """
+        if self.tables.get(key) is not table:
+            # The datapath disconnected (or reconnected) during the fetch.
+            return
+        if flows:
+            table.add_flows(flows)
+        for xid, msg in self._fetching.pop(key, ()):
+            self._apply(key, table, xid, msg)
+
+    def forget(self, key):
+        """Drop the flow table and pending FLOW_MODs of a datapath."""
+        self.tables.pop(key, None)
+        self._pending.pop(key, None)
+        self._fetching.pop(key, None)
+        for xid, (barrier_key, _) in list(self._barriers.items()):
+            if barrier_key == key:
+                del self._barriers[xid]
+
+    def _sent_flow_mod(self, ofmsg, kwds, xid, datapath_id, conn_id):
+        key = DATAPATH_APP.datapath_key(datapath_id, conn_id)
+        table = self.tables.get(key)
+        if table is None:
+            return
+        try:
+            msg = ofmsg.message(kwds)['msg']
+        except Exception:  # pylint: disable=broad-except
+            self.logger.exception('Unable to track FLOW_MOD: %r', ofmsg)
+            return
+        fetching = self._fetching.get(key)
+        if fetching is not None:
+            fetching.append((xid, msg))
+        else:
+            self._apply(key, table, xid, msg)
+
+    def _apply(self, key, table, xid, msg):
+        undo = table.apply_flow_mod(msg)
+        if undo:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = deque(maxlen=MAX_UNCONFIRMED)
+                self._pending[key] = pending
+            pending.append((xid, undo))
+
+    def _sent_barrier(self, _ofmsg, _kwds, xid, datapath_id, conn_id):
+        key = DATAPATH_APP.datapath_key(datapath_id, conn_id)
+        pending = self._pending.pop(key, None)
+        if pending:
+            self._barriers[xid] = (key, pending)
+
+    def _barrier_reply(self, message):
+        # The FLOW_MODs before the barrier are confirmed.
+        self._barriers.pop(message['xid'], None)
+
+    def _error(self, message):
+        key = normalize_datapath_id(message['datapath_id'])
+        table = self.tables.get(key)
+        if table is None:
+            return
+        xid = message['xid']
+        fetching = self._fetching.get(key)
+        if fetching:
+            # A rejected FLOW_MOD that is held back is never applied.
+            fetching[:] = [item for item in fetching if item[0] != xid]
+        undo = _discard(self._pending.get(key, ()), xid)
+        if undo is None:
+            for barrier_key, pending in self._barriers.values():
+                if barrier_key == key:
+                    undo = _discard(pending, xid)
+                    if undo is not None:
+                        break
+        if undo is not None:
+            table.undo(undo)
+
+
+APP = FlowTableApp()
+
+
+@APP.message('channel_up')
+async def channel_up(event):
+    datapath_id = event['datapath_id']
+    key = normalize_datapath_id(datapath_id)
+    table = APP.new_table(key)
+    flows = None
+    try:
+        flows = await fetch_flows(datapath_id)
+    except ControllerException as ex:
+        APP.logger.warning('%s Unable to fetch flows: %s', datapath_id, ex)
+    APP.fetched(key, table, flows)
+
+
+@APP.message('channel_down')
+def channel_down(event):
+    key = normalize_datapath_id(event['datapath_id'])
+    APP.forget(key)
+
+
+@APP.message('flow_removed')
+def flow_removed(event):
+    table = APP.flow_table(event['datapath_id'])
+    if table is not None:
+        table.apply_flow_removed(event['msg'])
+
+
+def _discard(pending, xid):
+    """Remove FLOW_MOD with given xid from pending and return its undo list.
+    """
+    for i, (msg_xid, undo) in enumerate(pending):
+        if msg_xid == xid:
+            del pending[i]
+            return undo
+    return None
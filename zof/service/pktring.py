@@ -0,0 +1,51 @@
+"""
+This app records the header fields of every PACKET_IN in a PacketRing.
+
+Import this module to enable it. It requires numpy. The ring keeps the most
+recent 16384 packets by default; use `--pktring-capacity` to keep more. Query
+the recorded packets with:
+
+    from zof.service.pktring import APP as PKTRING
+    talkers = PKTRING.ring.top_talkers(10)
+    rates = PKTRING.ring.port_rates(since=time.time() - 60)
+    PKTRING.ring.export('packets.npz')
+"""
+
+import argparse
+import zof
+from zof.pktring import PacketRing, DEFAULT_CAPACITY
+
+
+def _arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='pktring', description='Packet Ring', add_help=False)
+    parser.add_argument(
+        '--pktring-capacity',
+        type=int,
+        metavar='ROWS',
+        default=DEFAULT_CAPACITY,
+        help='number of PACKET_IN messages recorded')
+    return parser
+
+
+class PacketRingApp(zof.Application):
+    def __init__(self):
+        super().__init__(
+            'service.pktring', precedence=999997000, arg_parser=_arg_parser())
+        self.ring = None
+
+
+APP = PacketRingApp()
+
+
+@APP.event('preflight')
+def preflight(_):
+    args = APP.args
+    capacity = args.pktring_capacity if args is not None else DEFAULT_CAPACITY
+    APP.ring = PacketRing(capacity)
+
+
+@APP.message('packet_in')
+def packet_in(event):
+    if APP.ring is not None:
+        APP.ring.append(event['datapath_id'], event['msg'], event.get('time'))
@@ -0,0 +1,58 @@
+"""
+This app keeps each datapath's flow tables in line with a desired state.
+
+Set the flows that every datapath should have, and optionally the flows for a
+specific datapath:
+
+    from zof.service.reconciler import APP as RECONCILER
+    RECONCILER.reconciler.set_default_flows([TABLE_MISS_FLOW])
+
+When a datapath connects, this app fetches its flows with REQUEST.FLOW_DESC
+and applies only the difference. Flows that are already correct are left in
+place. Installed flows that are not desired are deleted, unless they are
+outside the reconciler's `tables` or `priorities`:
+
+    RECONCILER.reconciler.tables = {0}
+    RECONCILER.reconciler.priorities = {0}
+
+After a warm start from a snapshot (see zof.service.snapshot), flows that
+were installed before the restart are left in place, even if they are not
+desired.
+
+When the flows are in place, this app posts a FLOWS_RECONCILED event with the
+`datapath_id` and the `diff` that was applied.
+"""
+
+import zof
+from zof.exception import ControllerException
+from zof.reconcile import FlowReconciler
+from zof.snapshot import restored_snapshot
+
+
+class ReconcilerApp(zof.Application):
+    def __init__(self):
+        super().__init__('service.reconciler')
+        self.reconciler = FlowReconciler()
+
+
+APP = ReconcilerApp()
+
+
+@APP.message('channel_up')
+async def channel_up(event):
+    datapath_id = event['datapath_id']
+    snapshot = restored_snapshot()
+    keep = snapshot.take_flows(datapath_id) if snapshot is not None else None
+    try:
+        diff = await APP.reconciler.reconcile(datapath_id, keep=keep)
+    except ControllerException as ex:
+        APP.logger.error('%s Unable to reconcile flows: %s', datapath_id, ex)
+        return
+    APP.logger.info('%s Reconciled flows: %d added, %d modified, %d deleted',
+                    datapath_id, len(diff.adds), len(diff.modifies),
+                    len(diff.deletes))
+    zof.post_event({
+        'event': 'FLOWS_RECONCILED',
+        'datapath_id': datapath_id,
+        'diff': diff
+    })
@@ -0,0 +1,144 @@
+"""
+This app saves controller state to a snapshot file and restores it when the
+controller restarts.
+
+Import this module and set `--snapshot-file` to enable it. The snapshot is
+saved every `--snapshot-interval` seconds and when the controller stops. It
+records each datapath's ports, the shadow flow tables of the flowtable
+service, and the state of apps that opt in with
+`zof.snapshot.register_state`.
+
+At startup, this app loads the snapshot and restores the apps' state. As
+each datapath reconnects:
+
+- its ports are compared with the saved ports, and a PORT_CHANGED event is
+  posted for each port that was added, deleted or changed while the
+  controller was down;
+- the reconciler service leaves the flows that were installed before the
+  restart in place, instead of deleting flows it does not know about.
+"""
+
+import argparse
+import asyncio
+
+import zof
+import zof.exception as _exc
+from zof.datapath import Datapath
+from zof.service.datapath import APP as DATAPATH_APP, post_port_changed
+from zof.service.flowtable import APP as FLOWTABLE_APP
+from zof.snapshot import Snapshot, restored_snapshot, set_restored_snapshot
+
+
+def _arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='snapshot', description='Snapshot', add_help=False)
+    parser.add_argument(
+        '--snapshot-file', metavar='PATH', help='path of snapshot file')
+    parser.add_argument(
+        '--snapshot-interval',
+        type=float,
+        metavar='SECONDS',
+        default=60.0,
+        help='seconds between snapshots (default: 60)')
+    return parser
+
+
+class SnapshotApp(zof.Application):
+    def __init__(self):
+        super().__init__(
+            'service.snapshot', precedence=999995000, arg_parser=_arg_parser())
+        self.path = None
+        self.interval = 60.0
+
+    def save(self):
+        """Save a snapshot of the current state."""
+        snapshot = Snapshot.capture(DATAPATH_APP.get_datapaths(),
+                                    FLOWTABLE_APP.tables)
+        snapshot.save(self.path)
+        return snapshot
+
+    def load(self):
+        """Load the snapshot and restore the state of apps.
+
+        Returns None if there is no usable snapshot.
+        """
+        try:
+            snapshot = Snapshot.load(self.path)
+        except FileNotFoundError:
+            self.logger.info('No snapshot found: %s', self.path)
+            return None
+        except (OSError, ValueError) as ex:
+            self.logger.warning('Unable to load snapshot %s: %s', self.path,
+                                ex)
+            return None
+        set_restored_snapshot(snapshot)
+        names = snapshot.restore_apps()
+        self.logger.info('Loaded snapshot %s: %d datapaths, restored %s',
+                         self.path, len(snapshot.datapaths), names)
+        return snapshot
+
+
+APP = SnapshotApp()
+
+
+@APP.event('preflight')
+def preflight(_):
+    args = APP.args
+    if args is None or not args.snapshot_file:
+        raise _exc.PreflightUnloadException()
+    APP.path = args.snapshot_file
+    APP.interval = args.snapshot_interval
+    APP.load()
+
+
+@APP.event('start')
+def start(_):
+    zof.ensure_future(_save_loop())
+
+
+@APP.event('stop')
+def stop(_):
+    _save()
+
+
+async def _save_loop():
+    while True:
+        await asyncio.sleep(APP.interval)
+        _save()
+
+
+def _save():
+    try:
+        APP.save()
+    except OSError as ex:
+        APP.logger.warning('Unable to save snapshot %s: %s', APP.path, ex)
+    except Exception:  # pylint: disable=broad-except
+        # e.g. app state that is not JSON serializable. Keep saving later
+        # snapshots.
+        APP.logger.exception('Unable to save snapshot %s', APP.path)
+
+
+@APP.message('channel_up')
+def channel_up(event):
+    snapshot = restored_snapshot()
+    if snapshot is None:
+        return
+    descs = snapshot.take_ports(event['datapath_id'])
+    if descs is None:
+        return
+    datapath = event['datapath']
+    saved = Datapath(datapath.datapath_id, datapath.conn_id)
+    saved.add_ports(descs)
+    for port in datapath:
+        old_port = saved.ports.pop(port.port_no, None)
+        if old_port is None:
+            reason = 'ADD'
+            old_port = Datapath(datapath.datapath_id, None).add_port(
+                port_no=port.port_no)
+        else:
+            reason = 'MODIFY'
+        previous = old_port.update(port.desc())
+        if previous:
+            post_port_changed(datapath, port, reason, previous)
+    for old_port in saved.ports.values():
+        post_port_changed(datapath, old_port, 'DELETE', {})
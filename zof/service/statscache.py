@@ -0,0 +1,202 @@
+"""
+This app caches replies to OpenFlow stats requests.
+
+Wrap a compiled request with `cached()` to serve its replies from the cache:
+
+    PORT_STATS = cached(zof.compile('type: REQUEST.PORT_STATS ...'))
+    reply = await PORT_STATS.request(datapath_id=dpid)
+
+Cached entries expire after a TTL that depends on the request type. Entries are
+invalidated by related events: FLOW_REMOVED and our own FLOW_MODs invalidate
+flow data, PORT_STATUS invalidates port data, and CHANNEL_DOWN invalidates
+everything for the datapath.
+
+Cached replies are shared; treat them as read-only.
+"""
+
+import argparse
+import functools
+import zof
+from zof.api_compile import _task_locals
+from zof.asyncmap import asyncmap
+from zof.controller import Controller, _ReplyFuture
+from zof.datapath import normalize_datapath_id
+from zof.service.datapath import APP as DATAPATH_APP
+from zof.statscache import StatsCache, INVALIDATED_BY, make_args_key
+
+
+def _arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='statscache', description='Stats Cache', add_help=False)
+    parser.add_argument(
+        '--stats-cache-ttl',
+        type=float,
+        metavar='SECONDS',
+        help='override TTL for all cached stats replies (0=disable)')
+    parser.add_argument(
+        '--stats-cache-size',
+        type=int,
+        metavar='BYTES',
+        help='max memory used by cached stats replies')
+    return parser
+
+
+class StatsCacheApp(zof.Application):
+    def __init__(self):
+        super().__init__(
+            'service.statscache',
+            precedence=999999000,
+            arg_parser=_arg_parser())
+        self.cache = StatsCache()
+        self._hooked = False
+
+    def install_hooks(self):
+        """Watch our own sent messages for ones that invalidate the cache.
+
+        Hooks are only installed when some request type is cacheable, so a
+        disabled cache adds no cost to sending FLOW_MODs.
+        """
+        if self._hooked or not any(self.cache.ttl.values()):
+            return
+        for msg_type in INVALIDATED_BY:
+            Controller.singleton().add_send_hook(
+                msg_type, functools.partial(self._sent, msg_type))
+        self._hooked = True
+
+    def request(self, ofmsg, **kwds):
+        """Send a request, or return replies from the cache.
+
+        The result supports `await` and `async for`, like the result of
+        `CompiledMessage.request`.
+        """
+        req_type = ofmsg.msg_type
+        if not self.cache.is_cacheable(req_type):
+            return ofmsg.request(**kwds)
+        task_locals = _task_locals()
+        key = DATAPATH_APP.datapath_key(
+            kwds.get('datapath_id', task_locals.get('datapath_id')),
+            kwds.get('conn_id', task_locals.get('conn_id')))
+        if key is None:
+            return ofmsg.request(**kwds)
+
+        args = make_args_key(kwds)
+        replies = self.cache.get(key, req_type, args)
+        if replies is not None:
+            return _cached_reply(replies)
+
+        generation = self.cache.generation(key)
+
+        def _store(replies):
+            self.cache.put(key, req_type, args, replies, generation)
+
+        return _CachingReply(ofmsg.request(**kwds), _store)
+
+    def _sent(self, msg_type, _ofmsg, _kwds, _xid, datapath_id, conn_id):
+        """Called when we send a message that may invalidate cached stats."""
+        key = DATAPATH_APP.datapath_key(datapath_id, conn_id)
+        if key is not None:
+            self.cache.invalidate(key, msg_type)
+
+
+APP = StatsCacheApp()
+
+
+@APP.event('preflight')
+def preflight(_):
+    args = APP.args
+    if args is not None:
+        _apply_args(args)
+    APP.install_hooks()
+
+
+def _apply_args(args):
+    if args.stats_cache_ttl is not None:
+        for req_type in APP.cache.ttl:
+            APP.cache.ttl[req_type] = args.stats_cache_ttl
+    if args.stats_cache_size is not None:
+        APP.cache.max_size = args.stats_cache_size
+
+
+@APP.message('channel_down')
+def channel_down(event):
+    APP.cache.invalidate(normalize_datapath_id(event['datapath_id']))
+
+
+@APP.message('flow_removed')
+@APP.message('port_status')
+def invalidate(event):
+    APP.cache.invalidate(
+        normalize_datapath_id(event['datapath_id']), event['type'])
+
+
+class CachedMessage:
+    """Wraps a compiled request so its replies are served from the cache."""
+
+    def __init__(self, ofmsg):
+        self.ofmsg = ofmsg
+        self.msg_type = ofmsg.msg_type
+
+    def send(self, **kwds):
+        """Send the request (fire and forget)."""
+        self.ofmsg.send(**kwds)
+
+    def request(self, **kwds):
+        """Send the request and receive a response, using the cache."""
+        return APP.request(self.ofmsg, **kwds)
+
+    def request_all(self, *, parallelism=1, **kwds):
+        """Send request to all datapaths and receive responses."""
+
+        def _req(conn_id):
+            return self.request(conn_id=conn_id, **kwds)
+
+        conn_ids = [dp.conn_id for dp in zof.get_datapaths()]
+        return asyncmap(_req, conn_ids, parallelism=parallelism)
+
+    def __repr__(self):
+        return '<zof.CachedMessage>\n%r\n</zof.CachedMessage>' % self.ofmsg
+
+
+def cached(ofmsg):
+    """Return wrapper for compiled request that serves replies from cache."""
+    return CachedMessage(ofmsg)
+
+
+class _CachingReply:
+    """Wraps a _ReplyFuture and stores all of its replies when done."""
+
+    def __init__(self, reply, store):
+        self._reply = reply
+        self._store = store
+        self._replies = []
+
+    def done(self):
+        return self._reply.done()
+
+    def __await__(self):
+        return self._next().__await__()
+
+    async def _next(self):
+        result = await self._reply
+        self._replies.append(result)
+        if self._reply.done():
+            self._store(self._replies)
+        return result
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.done():
+            raise StopAsyncIteration
+        return await self
+
+
+def _cached_reply(replies):
+    """Return _ReplyFuture that yields a list of cached replies."""
+    reply = _ReplyFuture(replies[0]['xid'])
+    for result in replies:
+        reply.set_result(result)
+    reply.set_done()
+    return reply
+
@@ -0,0 +1,204 @@
+"""
+This app discovers links between datapaths using LLDP.
+
+Import this module to enable it. The app sends an LLDP PACKET_OUT from each
+port that is up, and learns a link when the probe arrives as a PACKET_IN on
+another datapath. A flow must send LLDP packets (eth_type 0x88cc) to the
+controller; the table miss flow of the layer2 demo does this.
+
+Probes are spread evenly over `--topology-interval` seconds, and never
+exceed `--topology-max-rate` probes per second. Probes due at the same time
+are sent to each datapath in a single write. A link that is not seen for
+three rounds expires. Links on a port are removed immediately when the port
+goes down or its datapath disconnects.
+
+Look up links and paths with:
+
+    from zof.service.topology import APP as TOPOLOGY
+    out_port = TOPOLOGY.topology.next_hop(src_dpid, dst_dpid)
+    hops = TOPOLOGY.topology.path(src_dpid, dst_dpid)
+
+When links are added or removed, this app posts a TOPOLOGY_CHANGED event
+with lists of `added` and `removed` links, each a tuple of
+(src, src_port, dst, dst_port) with int datapath ID's. The app consumes the
+PACKET_IN's of its own probes; other apps do not receive them.
+
+Links are saved in snapshots (see zof.service.snapshot). Restored links
+expire unless probes confirm them.
+"""
+
+import argparse
+import asyncio
+import time
+
+import zof
+import zof.exception as _exc
+from zof.datapath import normalize_datapath_id
+from zof.service.datapath import APP as DATAPATH_APP
+from zof.snapshot import register_state
+from zof.topology import Topology, ProbeScheduler, make_lldp, parse_lldp
+
+# Port numbers at or above this value are reserved ports.
+_MAX_PORT_NO = 0xFFFFFF00
+
+# Links expire after this many probe rounds without being seen.
+_EXPIRE_ROUNDS = 3
+
+
+def _arg_parser():
+    parser = argparse.ArgumentParser(
+        prog='topology', description='Topology Discovery', add_help=False)
+    parser.add_argument(
+        '--topology-interval',
+        type=float,
+        metavar='SECONDS',
+        default=10.0,
+        help='seconds between LLDP probes of each port (default: 10)')
+    parser.add_argument(
+        '--topology-max-rate',
+        type=float,
+        metavar='PROBES',
+        default=1000.0,
+        help='maximum LLDP probes sent per second (default: 1000)')
+    return parser
+
+
+class TopologyApp(zof.Application):
+    def __init__(self):
+        super().__init__(
+            'service.topology', precedence=999996000, arg_parser=_arg_parser())
+        self.topology = Topology()
+        self.scheduler = ProbeScheduler(interval=10.0, max_rate=1000.0)
+        self.tick = 0.1
+
+    def probe(self, now):
+        """Send the LLDP probes that are due."""
+        for dpid, ports in self.scheduler.poll(now).items():
+            datapath = DATAPATH_APP.find_datapath(dpid)
+            if datapath is None:
+                self.scheduler.remove_datapath(dpid)
+                continue
+            rows = []
+            for port_no in ports:
+                port = datapath.ports.get(port_no)
+                if port is not None and port.hw_addr:
+                    rows.append({
+                        'port_no': port_no,
+                        'data': make_lldp(dpid, port_no, port.hw_addr)
+                    })
+            if rows:
+                datapath.send_many(LLDP_PACKET_OUT, rows)
+
+    def expire(self, now):
+        """Remove links that have not been seen recently."""
+        timeout = _EXPIRE_ROUNDS * self.scheduler.round_time
+        removed = self.topology.expire(now - timeout)
+        if removed:
+            _post_changed([], removed)
+
+
+APP = TopologyApp()
+
+
+def _save_links():
+    return [list(src + dst) for src, dst in APP.topology.links.items()]
+
+
+def _restore_links(links):
+    now = time.monotonic()
+    for src, src_port, dst, dst_port in links:
+        APP.topology.add_link(src, src_port, dst, dst_port, now)
+
+
+register_state('service.topology', save=_save_links, restore=_restore_links)
+
+
+LLDP_PACKET_OUT = zof.compile('''
+  type: PACKET_OUT
+  msg:
+    buffer_id: NO_BUFFER
+    in_port: CONTROLLER
+    actions:
+      - action: OUTPUT
+        port_no: $port_no
+    data: $data
+''')
+
+
+@APP.event('preflight')
+def preflight(_):
+    args = APP.args
+    if args is not None:
+        APP.scheduler.interval = args.topology_interval
+        APP.scheduler.max_rate = args.topology_max_rate
+
+
+@APP.event('start')
+def start(_):
+    zof.ensure_future(_probe_loop())
+
+
+async def _probe_loop():
+    while True:
+        now = time.monotonic()
+        APP.probe(now)
+        APP.expire(now)
+        await asyncio.sleep(APP.tick)
+
+
+@APP.message('channel_up')
+def channel_up(event):
+    datapath = event['datapath']
+    APP.scheduler.set_ports(
+        datapath.id, [port.port_no for port in datapath if _probed(port)])
+
+
+@APP.message('channel_down')
+def channel_down(event):
+    dpid = normalize_datapath_id(event['datapath_id'])
+    APP.scheduler.remove_datapath(dpid)
+    removed = APP.topology.remove_datapath(dpid)
+    if removed:
+        _post_changed([], removed)
+
+
+@APP.event('port_changed')
+def port_changed(event):
+    dpid = normalize_datapath_id(event['datapath_id'])
+    port = event['port']
+    if event['reason'] != 'DELETE' and _probed(port):
+        APP.scheduler.add_port(dpid, port.port_no)
+    else:
+        APP.scheduler.remove_port(dpid, port.port_no)
+        removed = APP.topology.remove_port(dpid, port.port_no)
+        if removed:
+            _post_changed([], removed)
+
+
+@APP.message('packet_in', eth_type=0x88cc)
+def packet_in(event):
+    msg = event['msg']
+    sender = parse_lldp(msg['data'])
+    if sender is None:
+        return
+    dpid = normalize_datapath_id(event['datapath_id'])
+    in_port = msg['in_port']
+    if APP.topology.add_link(sender[0], sender[1], dpid, in_port,
+                             time.monotonic()):
+        _post_changed([sender + (dpid, in_port)], [])
+    raise _exc.StopPropagationException()
+
+
+def _probed(port):
+    """Return true if LLDP probes are sent from the port."""
+    port_no = port.port_no
+    return (isinstance(port_no, int) and port_no < _MAX_PORT_NO and port.up
+            and not port.admin_down)
+
+
+def _post_changed(added, removed):
+    zof.post_event({
+        'event': 'TOPOLOGY_CHANGED',
+        'added': added,
+        'removed': removed
+    })
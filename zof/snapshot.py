@@ -0,0 +1,182 @@
+"""Implements Snapshot class.
+
+A Snapshot records controller state so a restarted controller can resume
+where it left off: each datapath's ports, the flows in its shadow flow table,
+and the state of apps that opt in. Snapshots are saved as gzip-compressed
+JSON.
+
+An app opts in by registering functions that save and restore its state.
+The saved state must be JSON serializable:
+
+    from zof.snapshot import register_state
+    register_state('myapp', save=lambda: APP.table, restore=_restore_table)
+
+After a snapshot is loaded, its ports and flows are taken by the services
+that reconcile each datapath as it reconnects.
+"""
+
+import gzip
+import json
+import os
+import time as _time
+from .datapath import normalize_datapath_id
+from .objectview import to_json
+
+# Version of the snapshot file format.
+SNAPSHOT_VERSION = 1
+
+# name -> (save, restore)
+_STATE_FUNCS = {}
+
+# Snapshot loaded at startup (or None).
+_RESTORED = None
+
+
+def register_state(name, *, save, restore):
+    """Register functions that save and restore an app's state.
+
+    Args:
+        name (str): Unique name of the state, usually the app name.
+        save (Callable[[], Any]): Return JSON-serializable state.
+        restore (Callable[[Any], None]): Restore state returned by `save`.
+    """
+    _STATE_FUNCS[name] = (save, restore)
+
+
+def unregister_state(name):
+    """Remove functions registered by `register_state`."""
+    _STATE_FUNCS.pop(name, None)
+
+
+def restored_snapshot():
+    """Return the snapshot loaded at startup, or None."""
+    return _RESTORED
+
+
+def set_restored_snapshot(snapshot):
+    """Set the snapshot loaded at startup."""
+    global _RESTORED  # pylint: disable=global-statement
+    _RESTORED = snapshot
+
+
+class Snapshot:
+    """Concrete class representing saved controller state.
+
+    Args:
+        datapaths (Dict[int, dict]): Maps datapath ID to a dict with the
+            `datapath_id`, `ports` (list of port descs) and `flows`.
+        apps (Dict[str, Any]): Saved state of each registered app.
+        time (float): Time the snapshot was taken (seconds since epoch).
+    """
+
+    def __init__(self, *, datapaths=None, apps=None, time=None):
+        self.datapaths = datapaths or {}
+        self.apps = apps or {}
+        self.time = _time.time() if time is None else time
+
+    @classmethod
+    def capture(cls, datapaths, flow_tables=None):
+        """Take a snapshot of the current state.
+
+        Args:
+            datapaths (Iterable[Datapath]): Datapaths to record.
+            flow_tables (Dict[int, FlowTable]): Shadow flow tables, keyed
+                by datapath ID.
+        """
+        flow_tables = flow_tables or {}
+        records = {}
+        for datapath in datapaths:
+            table = flow_tables.get(datapath.id)
+            records[datapath.id] = {
+                'datapath_id': datapath.datapath_id,
+                'ports': [port.desc() for port in datapath],
+                'flows': [_entry_flow(entry) for entry in table or ()]
+            }
+        apps = {name: save() for name, (save, _) in _STATE_FUNCS.items()}
+        return cls(datapaths=records, apps=apps)
+
+    def save(self, path):
+        """Write the snapshot to a file.
+
+        The file is replaced atomically, so an interrupted save leaves the
+        previous snapshot in place.
+        """
+        data = to_json({
+            'version': SNAPSHOT_VERSION,
+            'time': self.time,
+            'datapaths': list(self.datapaths.values()),
+            'apps': self.apps
+        }).encode('utf-8')
+        tmp_path = '%s.tmp' % path
+        with gzip.open(tmp_path, 'wb') as snapshot_file:
+            snapshot_file.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a snapshot from a file.
+
+        Raises:
+            OSError: if the file can't be read.
+            ValueError: if the file is not a valid snapshot.
+        """
+        with gzip.open(path, 'rb') as snapshot_file:
+            try:
+                data = json.loads(snapshot_file.read().decode('utf-8'))
+            except (OSError, EOFError) as ex:
+                raise ValueError('Invalid snapshot: %s' % ex) from None
+        if not isinstance(data, dict) or data.get(
+                'version') != SNAPSHOT_VERSION:
+            raise ValueError('Unsupported snapshot version')
+        datapaths = {
+            normalize_datapath_id(record['datapath_id']): record
+            for record in data['datapaths']
+        }
+        return cls(datapaths=datapaths, apps=data['apps'], time=data['time'])
+
+    def restore_apps(self):
+        """Restore the state of each registered app found in the snapshot.
+
+        Returns:
+            List[str]: Names of the restored states.
+        """
+        restored = []
+        for name, (_, restore) in _STATE_FUNCS.items():
+            if name in self.apps:
+                restore(self.apps[name])
+                restored.append(name)
+        return restored
+
+    def take_ports(self, datapath_id):
+        """Remove and return the saved port descs of a datapath, or None."""
+        return self._take(datapath_id, 'ports')
+
+    def take_flows(self, datapath_id):
+        """Remove and return the saved flows of a datapath, or None."""
+        return self._take(datapath_id, 'flows')
+
+    def _take(self, datapath_id, key):
+        record = self.datapaths.get(normalize_datapath_id(datapath_id))
+        if record is None:
+            return None
+        return record.pop(key, None)
+
+
+def _entry_flow(entry):
+    """Return FlowEntry as a flow dict."""
+    match = []
+    for field, value, mask in entry.match:
+        item = {'field': field, 'value': value}
+        if mask is not None:
+            item['mask'] = mask
+        match.append(item)
+    return {
+        'table_id': entry.table_id,
+        'priority': entry.priority,
+        'match': match,
+        'cookie': entry.cookie,
+        'idle_timeout': entry.idle_timeout,
+        'hard_timeout': entry.hard_timeout,
+        'flags': list(entry.flags),
+        'instructions': entry.instructions
+    }
@@ -0,0 +1,186 @@
+"""Implements StatsCache class."""
+
+import sys
+import time
+from collections import OrderedDict
+from .objectview import ObjectView
+
+# Default time-to-live (in seconds) for cached replies, by request type. Only
+# request types listed here are cached.
+DEFAULT_TTL = {
+    'REQUEST.DESC': 300.0,
+    'REQUEST.FLOW_DESC': 5.0,
+    'REQUEST.AGGREGATE_STATS': 5.0,
+    'REQUEST.TABLE_STATS': 5.0,
+    'REQUEST.TABLE_DESC': 60.0,
+    'REQUEST.TABLE_FEATURES': 300.0,
+    'REQUEST.PORT_STATS': 5.0,
+    'REQUEST.PORT_DESC': 60.0,
+    'REQUEST.QUEUE_STATS': 5.0,
+    'REQUEST.QUEUE_DESC': 60.0,
+    'REQUEST.GROUP_STATS': 5.0,
+    'REQUEST.GROUP_DESC': 60.0,
+    'REQUEST.GROUP_FEATURES': 300.0,
+    'REQUEST.METER_STATS': 5.0,
+    'REQUEST.METER_CONFIG': 60.0,
+    'REQUEST.METER_FEATURES': 300.0,
+}
+
+# Default limit on the estimated memory used by cached replies (in bytes).
+DEFAULT_MAX_SIZE = 16 * 2**20
+
+_FLOW_REQUESTS = {
+    'REQUEST.FLOW_DESC', 'REQUEST.AGGREGATE_STATS', 'REQUEST.TABLE_STATS'
+}
+_PORT_REQUESTS = {
+    'REQUEST.PORT_STATS', 'REQUEST.PORT_DESC', 'REQUEST.QUEUE_STATS',
+    'REQUEST.QUEUE_DESC'
+}
+_GROUP_REQUESTS = {'REQUEST.GROUP_STATS', 'REQUEST.GROUP_DESC'}
+_METER_REQUESTS = {'REQUEST.METER_STATS', 'REQUEST.METER_CONFIG'}
+
+# Map of message types to the cached request types they invalidate. A message
+# type not listed here (e.g. CHANNEL_DOWN) invalidates everything.
+INVALIDATED_BY = {
+    'FLOW_MOD': _FLOW_REQUESTS,
+    'FLOW_REMOVED': _FLOW_REQUESTS,
+    'PORT_STATUS': _PORT_REQUESTS,
+    'PORT_MOD': _PORT_REQUESTS,
+    'GROUP_MOD': _GROUP_REQUESTS | _FLOW_REQUESTS,
+    'METER_MOD': _METER_REQUESTS | _FLOW_REQUESTS,
+    'TABLE_MOD': {'REQUEST.TABLE_DESC'},
+}
+
+
+class StatsCache:
+    """Concrete class that caches replies to OpenFlow stats requests.
+
+    Each entry is keyed by datapath, request type and request arguments. An
+    entry expires after the TTL for its request type. When the estimated size
+    of all entries exceeds `max_size`, the least recently used entries are
+    evicted.
+
+    Attributes:
+        ttl (Dict[str, float]): TTL in seconds for each cacheable request type.
+        max_size (int): Maximum estimated size of cached replies in bytes.
+        size (int): Current estimated size of cached replies in bytes.
+    """
+
+    def __init__(self, *, ttl=None, max_size=DEFAULT_MAX_SIZE, timer=None):
+        self.ttl = dict(DEFAULT_TTL)
+        if ttl:
+            self.ttl.update(ttl)
+        self.max_size = max_size
+        self.size = 0
+        self._timer = timer or time.monotonic
+        self._entries = OrderedDict()
+        self._by_datapath = {}
+        self._generation = {}
+
+    def is_cacheable(self, req_type):
+        """Return true if replies to the given request type are cached."""
+        return self.ttl.get(req_type, 0) > 0
+
+    def get(self, datapath_id, req_type, args=()):
+        """Return list of cached replies, or None if there is no entry."""
+        key = (datapath_id, req_type, args)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        replies, expiration, _ = entry
+        if expiration <= self._timer():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return replies
+
+    def generation(self, datapath_id):
+        """Return counter that changes when a datapath's entries are invalidated.
+
+        Pass this value to `put` to discard replies that were requested before
+        an invalidation took place.
+        """
+        return self._generation.get(datapath_id, 0)
+
+    def put(self, datapath_id, req_type, args, replies, generation=None):
+        """Store list of replies in the cache."""
+        if not self.is_cacheable(req_type):
+            return
+        if generation is not None and generation != self.generation(
+                datapath_id):
+            return
+        key = (datapath_id, req_type, args)
+        if key in self._entries:
+            self._remove(key)
+        entry_size = _estimate_size(replies)
+        if entry_size > self.max_size:
+            return
+        expiration = self._timer() + self.ttl[req_type]
+        self._entries[key] = (replies, expiration, entry_size)
+        self._by_datapath.setdefault(datapath_id, set()).add(key)
+        self.size += entry_size
+        while self.size > self.max_size:
+            self._remove(next(iter(self._entries)))
+
+    def invalidate(self, datapath_id, msg_type=None):
+        """Remove entries for a datapath affected by a given message type.
+
+        If `msg_type` is None, or not a known invalidating message type, remove
+        all entries for the datapath.
+        """
+        self._generation[datapath_id] = self.generation(datapath_id) + 1
+        keys = self._by_datapath.get(datapath_id)
+        if not keys:
+            return
+        req_types = INVALIDATED_BY.get(msg_type)
+        for key in list(keys):
+            if req_types is None or key[1] in req_types:
+                self._remove(key)
+
+    def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+        self._by_datapath.clear()
+        self._generation.clear()
+        self.size = 0
+
+    def _remove(self, key):
+        _, _, entry_size = self._entries.pop(key)
+        self.size -= entry_size
+        keys = self._by_datapath[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self._by_datapath[key[0]]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def make_args_key(kwds):
+    """Return hashable key for a dict of template arguments."""
+    return tuple(
+        sorted((key, _hashable(value)) for key, value in kwds.items()
+               if key not in ('xid', 'datapath_id', 'conn_id')))
+
+
+def _hashable(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def _estimate_size(obj):
+    """Return rough estimate of memory used by a reply object in bytes."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, ObjectView):
+        obj = obj.__dict__
+        size += sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            size += sys.getsizeof(key) + _estimate_size(value)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            size += _estimate_size(value)
+    return size
@@ -0,0 +1,378 @@
+"""Implements Topology and ProbeScheduler classes.
+
+A Topology is a directed graph of links between datapath ports, learned from
+LLDP probes. It caches a shortest path tree for each source datapath, so
+next hop lookups are dictionary reads. A link change only discards the trees
+it affects.
+
+A ProbeScheduler decides which ports to probe next. It spreads the probes
+for every port evenly over an interval, and never exceeds a maximum probe
+rate.
+"""
+
+import struct
+from collections import OrderedDict, deque
+from .datapath import normalize_datapath_id
+from .pktdecode import decode_packet
+
+# Destination address of LLDP frames (nearest bridge).
+LLDP_DST = '01:80:c2:00:00:0e'
+
+LLDP_ETH_TYPE = 0x88CC
+
+# Prefix of the LLDP chassis ID sent in probes.
+_CHASSIS_PREFIX = 'dpid:'
+
+_HALF = struct.Struct('!H')
+
+# Subtype of "locally assigned" chassis ID and port ID TLVs.
+_LOCAL_SUBTYPE = 7
+
+
+def make_lldp(datapath_id, port_no, hw_addr, *, ttl=120):
+    """Return LLDP frame that identifies a datapath port.
+
+    The chassis ID is 'dpid:' followed by the datapath_id in hexadecimal, and
+    the port ID is the decimal port number. Both use the "locally assigned"
+    subtype.
+
+    Args:
+        datapath_id (str|int): Datapath ID.
+        port_no (int): Port number.
+        hw_addr (str): Source MAC address.
+        ttl (int): Time to live in seconds.
+    Returns:
+        bytes: Ethernet frame.
+    """
+    chassis_id = '%s%016x' % (_CHASSIS_PREFIX,
+                              normalize_datapath_id(datapath_id))
+    return b''.join(
+        (_mac_bytes(LLDP_DST), _mac_bytes(hw_addr),
+         _HALF.pack(LLDP_ETH_TYPE),
+         _tlv(1, bytes([_LOCAL_SUBTYPE]) + chassis_id.encode('ascii')),
+         _tlv(2, bytes([_LOCAL_SUBTYPE]) + str(port_no).encode('ascii')),
+         _tlv(3, _HALF.pack(ttl)), _tlv(0, b'')))
+
+
+def parse_lldp(data):
+    """Return (datapath_id, port_no) from an LLDP frame made by `make_lldp`.
+
+    Returns None if `data` is not one of our LLDP probes.
+
+    Args:
+        data (bytes): Ethernet frame.
+    Returns:
+        Tuple[int, int]: Datapath ID and port number of the sender.
+    """
+    fields = decode_packet(data)
+    chassis_id = fields.get('x_lldp_chassis_id', '')
+    port_id = fields.get('x_lldp_port_id', '')
+    if not chassis_id.startswith('local ' + _CHASSIS_PREFIX):
+        return None
+    if not port_id.startswith('local '):
+        return None
+    try:
+        datapath_id = int(chassis_id[6 + len(_CHASSIS_PREFIX):], 16)
+        port_no = int(port_id[6:])
+    except ValueError:
+        return None
+    return (datapath_id, port_no)
+
+
+def _tlv(tlv_type, value):
+    return _HALF.pack(tlv_type << 9 | len(value)) + value
+
+
+def _mac_bytes(value):
+    return bytes.fromhex(value.replace(':', ''))
+
+
+class Topology:
+    """Concrete class representing links between datapath ports.
+
+    Links are directed: a probe sent from (src, src_port) and received on
+    (dst, dst_port) adds one link. Datapath ID's are stored as int.
+
+    Attributes:
+        links (Dict[Tuple[int, int], Tuple[int, int]]): Maps
+            (src, src_port) -> (dst, dst_port).
+    """
+
+    def __init__(self):
+        self.links = OrderedDict()
+        self._last_seen = {}
+        # dst port -> set of src ports linked to it
+        self._sources = {}
+        # src datapath -> {src_port: dst datapath}
+        self._adjacency = {}
+        # src datapath -> (distance, parent, first hop) dicts of a BFS tree
+        self._trees = {}
+
+    def __len__(self):
+        return len(self.links)
+
+    def add_link(self, src, src_port, dst, dst_port, time):
+        """Add or refresh a link.
+
+        Returns:
+            bool: True if the link is new or changed.
+        """
+        src, dst = normalize_datapath_id(src), normalize_datapath_id(dst)
+        key = (src, src_port)
+        target = (dst, dst_port)
+        self._last_seen[key] = time
+        old_target = self.links.get(key)
+        if old_target == target:
+            return False
+        if old_target is not None:
+            self.remove_link(src, src_port)
+            self._last_seen[key] = time
+        self.links[key] = target
+        self._sources.setdefault(target, set()).add(key)
+        self._adjacency.setdefault(src, {})[src_port] = dst
+        self._invalidate_added(src, dst)
+        return True
+
+    def remove_link(self, src, src_port):
+        """Remove a link.
+
+        Returns:
+            Tuple[int, int, int, int]: (src, src_port, dst, dst_port) of the
+                removed link, or None if there was no link.
+        """
+        src = normalize_datapath_id(src)
+        key = (src, src_port)
+        target = self.links.pop(key, None)
+        if target is None:
+            return None
+        del self._last_seen[key]
+        sources = self._sources[target]
+        sources.discard(key)
+        if not sources:
+            del self._sources[target]
+        neighbors = self._adjacency[src]
+        del neighbors[src_port]
+        if not neighbors:
+            del self._adjacency[src]
+        self._invalidate_removed(src, src_port, target[0])
+        return key + target
+
+    def remove_port(self, datapath_id, port_no):
+        """Remove links to and from a port.
+
+        Returns:
+            List[Tuple[int, int, int, int]]: Removed links.
+        """
+        port = (normalize_datapath_id(datapath_id), port_no)
+        keys = [port] if port in self.links else []
+        keys.extend(self._sources.get(port, ()))
+        return [self.remove_link(*key) for key in keys]
+
+    def remove_datapath(self, datapath_id):
+        """Remove links to and from a datapath.
+
+        Returns:
+            List[Tuple[int, int, int, int]]: Removed links.
+        """
+        dpid = normalize_datapath_id(datapath_id)
+        keys = [(src, src_port)
+                for (src, src_port), (dst, _) in self.links.items()
+                if src == dpid or dst == dpid]
+        return [self.remove_link(*key) for key in keys]
+
+    def expire(self, before):
+        """Remove links last seen before the given time.
+
+        Returns:
+            List[Tuple[int, int, int, int]]: Removed links.
+        """
+        keys = [key for key, time in self._last_seen.items() if time < before]
+        return [self.remove_link(*key) for key in keys]
+
+    def neighbors(self, datapath_id):
+        """Return dict mapping each linked port to its (dst, dst_port)."""
+        dpid = normalize_datapath_id(datapath_id)
+        return {
+            src_port: self.links[(dpid, src_port)]
+            for src_port in self._adjacency.get(dpid, ())
+        }
+
+    def distance(self, src, dst):
+        """Return number of links on the shortest path, or None."""
+        dist, _, _ = self._tree(normalize_datapath_id(src))
+        return dist.get(normalize_datapath_id(dst))
+
+    def next_hop(self, src, dst):
+        """Return output port on `src` towards `dst`, or None.
+
+        Returns None if `dst` is unreachable or is `src` itself.
+        """
+        _, _, hop = self._tree(normalize_datapath_id(src))
+        return hop.get(normalize_datapath_id(dst))
+
+    def path(self, src, dst):
+        """Return shortest path as a list of (datapath_id, out_port) hops.
+
+        Returns an empty list if `src` and `dst` are the same, and None if
+        `dst` is unreachable.
+        """
+        src, dst = normalize_datapath_id(src), normalize_datapath_id(dst)
+        dist, parent, _ = self._tree(src)
+        if dst not in dist:
+            return None
+        hops = []
+        while dst != src:
+            dst, port_no = parent[dst]
+            hops.append((dst, port_no))
+        hops.reverse()
+        return hops
+
+    def _tree(self, src):
+        """Return cached BFS tree rooted at `src`."""
+        tree = self._trees.get(src)
+        if tree is None:
+            tree = self._build_tree(src)
+            self._trees[src] = tree
+        return tree
+
+    def _build_tree(self, src):
+        dist = {src: 0}
+        parent = {}
+        hop = {}
+        queue = deque([src])
+        while queue:
+            node = queue.popleft()
+            for port_no, neighbor in self._adjacency.get(node, {}).items():
+                if neighbor not in dist:
+                    dist[neighbor] = dist[node] + 1
+                    parent[neighbor] = (node, port_no)
+                    hop[neighbor] = hop[node] if node != src else port_no
+                    queue.append(neighbor)
+        return (dist, parent, hop)
+
+    def _invalidate_added(self, src, dst):
+        """Discard trees that a new link src -> dst makes shorter."""
+        for root, (dist, _, _) in list(self._trees.items()):
+            src_dist = dist.get(src)
+            if src_dist is not None and src_dist + 1 < dist.get(
+                    dst, src_dist + 2):
+                del self._trees[root]
+
+    def _invalidate_removed(self, src, src_port, dst):
+        """Discard trees that use the removed link."""
+        edge = (src, src_port)
+        for root, (_, parent, _) in list(self._trees.items()):
+            if parent.get(dst) == edge:
+                del self._trees[root]
+
+
+class ProbeScheduler:
+    """Concrete class that paces probes of every port.
+
+    Each round probes every port once. The probes are spread evenly over the
+    round, which lasts `interval` seconds, or longer if that would exceed
+    `max_rate`. Urgent probes (e.g. for a port that just came up) are sent
+    ahead of the round. All probes share a token bucket that refills at
+    `max_rate` per second and holds at most one second's worth.
+
+    Args:
+        interval (float): Seconds between probes of the same port.
+        max_rate (float): Maximum probes per second.
+    """
+
+    def __init__(self, interval, max_rate):
+        self.interval = interval
+        self.max_rate = max_rate
+        # datapath_id -> set of port_no
+        self._ports = OrderedDict()
+        self._urgent = deque()
+        self._queue = deque()
+        self._round_start = 0.0
+        self._round_end = 0.0
+        self._spacing = 0.0
+        self._index = 0
+        self._tokens = 0.0
+        self._last_poll = None
+
+    def __len__(self):
+        """Return number of ports scheduled."""
+        return sum(len(ports) for ports in self._ports.values())
+
+    @property
+    def round_time(self):
+        """Return seconds needed to probe every port once."""
+        return max(self.interval, len(self) / self.max_rate)
+
+    def set_ports(self, datapath_id, ports, *, urgent=True):
+        """Set the ports to probe on a datapath."""
+        ports = set(ports)
+        self._ports[datapath_id] = ports
+        if urgent:
+            self._urgent.extend((datapath_id, port_no) for port_no in ports)
+
+    def add_port(self, datapath_id, port_no, *, urgent=True):
+        """Add a port to probe."""
+        self._ports.setdefault(datapath_id, set()).add(port_no)
+        if urgent:
+            self._urgent.append((datapath_id, port_no))
+
+    def remove_port(self, datapath_id, port_no):
+        """Stop probing a port."""
+        ports = self._ports.get(datapath_id)
+        if ports is not None:
+            ports.discard(port_no)
+
+    def remove_datapath(self, datapath_id):
+        """Stop probing every port of a datapath."""
+        self._ports.pop(datapath_id, None)
+
+    def poll(self, now):
+        """Return the probes due at time `now`.
+
+        Returns:
+            Dict[Any, List[int]]: Ports to probe, grouped by datapath.
+        """
+        if self._last_poll is not None:
+            self._tokens = min(
+                self._tokens + (now - self._last_poll) * self.max_rate,
+                max(self.max_rate, 1.0))
+        else:
+            self._tokens = 1.0
+        self._last_poll = now
+
+        result = OrderedDict()
+        while self._tokens >= 1.0:
+            item = self._next_probe(now)
+            if item is None:
+                break
+            datapath_id, port_no = item
+            if port_no not in self._ports.get(datapath_id, ()):
+                # Port was removed after it was queued.
+                continue
+            self._tokens -= 1.0
+            result.setdefault(datapath_id, []).append(port_no)
+        return result
+
+    def _next_probe(self, now):
+        if self._urgent:
+            return self._urgent.popleft()
+        if not self._queue:
+            if now < self._round_end:
+                return None
+            self._start_round(now)
+            if not self._queue:
+                return None
+        if now < self._round_start + self._index * self._spacing:
+            return None
+        self._index += 1
+        return self._queue.popleft()
+
+    def _start_round(self, now):
+        self._queue.extend((datapath_id, port_no)
+                           for datapath_id, ports in self._ports.items()
+                           for port_no in sorted(ports, key=str))
+        round_time = self.round_time
+        self._round_start = now
+        self._round_end = now + round_time
+        self._spacing = round_time / max(len(self._queue), 1)
+        self._index = 0